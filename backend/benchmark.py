@@ -0,0 +1,427 @@
+import os
+import json
+import time
+import hashlib
+import argparse
+import itertools
+import platform
+import tracemalloc
+import numpy as np
+import cv2
+from getsequence import crop_connector_roi, get_single_sequence, request_params
+from compare import compare_single, compare_sequences
+from imagedecode import decode_image_file, decode_image_buffer, DECODE_POLICIES
+from synthetic import make_synthetic_connector, synthetic_set, synthetic_params
+
+RESOLUTIONS = {
+    "1080p": (1920, 1080),
+    "4K": (3840, 2160),
+}
+
+# Captures used for the decode benchmark, as the camera delivers them.
+DECODE_RESOLUTIONS = {
+    **RESOLUTIONS,
+    "12MP": (4000, 3000),
+}
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp")
+
+# Synthetic images tried by --phases until one is detected correctly.
+PHASE_CANDIDATES = 10
+
+# Relative p50 slowdown accepted by --check before it counts as a regression.
+DEFAULT_TOLERANCE = 0.2
+
+def time_call(function, repeat):
+    """
+    Calls function repeat times (after one warm-up call) and returns the
+    latency of each call in milliseconds.
+    """
+    function()
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+def time_images(function, images, repeat):
+    """
+    Like time_call, but each call gets the next image of images in turn.
+    """
+    images = itertools.cycle(images)
+    return time_call(lambda: function(next(images)), repeat)
+
+def bench_pyramid(levels, repeat, count=20):
+    """
+    Times connector segmentation (phases 1-3) and the full detection at each
+    pyramid level for every resolution in RESOLUTIONS, on the images of a
+    synthetic set that level 0 detects correctly, and reports how often each
+    level is right.
+
+    Only correctly detected images are timed, so a level is never credited
+    for the latency of a failed segmentation. A resolution where level 0
+    detects none of the set gets no latencies. Detection uses the default
+    parameters scaled to each resolution (see synthetic.synthetic_params).
+
+    Args:
+        levels (list): Pyramid levels to compare.
+        repeat (int): Timed runs per configuration.
+        count (int): Synthetic images per resolution.
+
+    Returns:
+        list: One dict per (resolution, level) with "timed" (the number of
+              images level 0 detects correctly), median latencies in
+              milliseconds over those images (None if there are none), the
+              fraction of the set with the true wire count ("correct") and
+              the fraction of the timed images whose sequence equals level
+              0's ("agreement", None if there are none).
+    """
+    rows = []
+    for name, (width, height) in RESOLUTIONS.items():
+        images = list(synthetic_set(count, width, height))
+        params = synthetic_params(height)
+        reference = [get_single_sequence(image, pyramid_level=0, params=params) for _, image, _ in images]
+        timed = [index for index, (_, _, colors) in enumerate(images) if reference[index][0] == len(colors)]
+        timed_images = [images[index][1] for index in timed]
+        for level in levels:
+            sequences = [get_single_sequence(image, pyramid_level=level, params=params) for _, image, _ in images]
+            row = {
+                "resolution": name,
+                "pyramid_level": level,
+                "timed": len(timed),
+                "segment_ms": None,
+                "total_ms": None,
+                "correct": sum(sequence[0] == len(colors) for sequence, (_, _, colors) in zip(sequences, images)) / max(1, count),
+                "agreement": None,
+            }
+            if timed_images:
+                segment = time_images(lambda image: crop_connector_roi(image, level, params=params), timed_images, repeat)
+                detect = time_images(lambda image: get_single_sequence(image, pyramid_level=level, params=params), timed_images, repeat)
+                row["segment_ms"] = float(np.median(segment))
+                row["total_ms"] = float(np.median(detect))
+                row["agreement"] = sum(sequences[index] == reference[index] for index in timed) / len(timed)
+            rows.append(row)
+    return rows
+
+def bench_phases(repeat, pyramid_level=0):
+    """
+    Collects per-phase timings of get_single_sequence for every resolution in
+    RESOLUTIONS, on the first image of a synthetic set that is detected
+    correctly at pyramid_level (with the parameters of synthetic_params).
+
+    Returns:
+        dict: Resolution name -> {phase: median milliseconds}, or None if no
+              image of the set is detected correctly.
+    """
+    results = {}
+    for name, (width, height) in RESOLUTIONS.items():
+        params = synthetic_params(height)
+        image = next((image for _, image, colors in synthetic_set(PHASE_CANDIDATES, width, height)
+                      if get_single_sequence(image, pyramid_level=pyramid_level, params=params)[0] == len(colors)), None)
+        if image is None:
+            results[name] = None
+            continue
+        runs = []
+        for _ in range(repeat):
+            timings = {}
+            get_single_sequence(image, pyramid_level=pyramid_level, timings=timings, params=params)
+            runs.append(timings)
+        phases = list(dict.fromkeys(phase for timings in runs for phase in timings))
+        results[name] = {phase: float(np.median([timings.get(phase, 0.0) for timings in runs])) for phase in phases}
+    return results
+
+def peak_memory(function):
+    """
+    Calls function once and returns the peak memory traced while it ran, in
+    megabytes. tracemalloc sees the arrays OpenCV allocates through numpy.
+    """
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1] / 2 ** 20
+    finally:
+        tracemalloc.stop()
+
+def bench_decode(repeat, pyramid_level=2, quality=90):
+    """
+    Compares decode policies on JPEG captures: decoding and detecting from the
+    encoded bytes, as a request does, for every resolution in
+    DECODE_RESOLUTIONS.
+
+    Returns:
+        list: One dict per (resolution, policy) with the median latency in
+              milliseconds, the peak traced memory in megabytes and the
+              detected wire count.
+    """
+    rows = []
+    for name, (width, height) in DECODE_RESOLUTIONS.items():
+        image = make_synthetic_connector(width, height)
+        encoded = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, quality])[1].tobytes()
+        del image
+        for policy in DECODE_POLICIES:
+            detect = lambda: get_single_sequence(decode_image_buffer(encoded, policy), pyramid_level=pyramid_level)
+            latencies = time_call(detect, repeat)
+            rows.append({
+                "resolution": name,
+                "policy": policy,
+                "total_ms": float(np.median(latencies)),
+                "peak_mb": peak_memory(detect),
+                "wires": detect()[0],
+            })
+    return rows
+
+def load_captures(folder):
+    """
+    Replays real captures from a folder, in file name order.
+
+    An optional labels.json in the folder maps file names to the expected BGR
+    colors of their wires, left to right (or to {"type": ..., "colors": [...]},
+    see tuner.py); unlabelled captures are only timed.
+
+    Yields:
+        tuple: (file name, BGR image, expected colors or None).
+    """
+    labels_path = os.path.join(folder, "labels.json")
+    labels = {}
+    if os.path.exists(labels_path):
+        with open(labels_path) as f:
+            labels = json.load(f)
+    for name in sorted(os.listdir(folder)):
+        if not name.lower().endswith(IMAGE_EXTENSIONS):
+            continue
+        image = decode_image_file(os.path.join(folder, name))
+        if image is None:
+            print(f"Skipping unreadable capture: {name}")
+            continue
+        label = labels.get(name)
+        yield name, image, label["colors"] if isinstance(label, dict) else label
+
+def latency_summary(latencies):
+    """
+    Returns the mean, p50, p95, p99 and max of a list of milliseconds.
+    """
+    values = np.asarray(latencies, dtype=np.float64)
+    if values.size == 0:
+        return {}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        "mean": round(float(values.mean()), 3),
+        "p50": round(float(p50), 3),
+        "p95": round(float(p95), 3),
+        "p99": round(float(p99), 3),
+        "max": round(float(values.max()), 3),
+    }
+
+def sequence_digest(sequence):
+    """
+    Returns a short hash of a detected (number of wires, colors) sequence, so
+    baselines can tell whether a change altered any result.
+    """
+    wire_count, colors = sequence
+    content = json.dumps([wire_count, [list(color) for color in colors]])
+    return hashlib.sha1(content.encode("utf-8")).hexdigest()[:16]
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+        "cpu_count": os.cpu_count(),
+        "platform": platform.platform(),
+    }
+
+def run_suite(images, repeat=3, **detect_options):
+    """
+    Times detection phase by phase and the comparison on every image.
+
+    For each image get_single_sequence runs repeat times with timings, then
+    compare_single runs against the image's expected colors (or, for an
+    unlabelled capture, against its own detection), and compare_sequences is
+    timed on its own as the "comparison" phase.
+
+    Args:
+        images (iterable): (name, BGR image, expected colors or None) tuples,
+                           e.g. from synthetic.synthetic_set or load_captures.
+        repeat (int): Timed detections per image.
+        **detect_options: Passed on to get_single_sequence.
+
+    Returns:
+        dict: "images", "runs", "throughput_per_s" (detections per second),
+              "latency_ms" (summaries for "detect", "compare", "comparison" and
+              every detection phase), "accuracy" over the labelled images and
+              per-image "results" with a digest of the detected sequence.
+    """
+    detect_latencies = []
+    compare_latencies = []
+    comparison_latencies = []
+    phase_latencies = {}
+    results = {}
+    labelled = count_correct = matched = 0
+
+    for name, image, expected_colors in images:
+        get_single_sequence(image, **detect_options)  # Warm-up
+        for _ in range(repeat):
+            timings = {}
+            start = time.perf_counter()
+            detected = get_single_sequence(image, timings=timings, **detect_options)
+            detect_latencies.append((time.perf_counter() - start) * 1000)
+            for phase, milliseconds in timings.items():
+                phase_latencies.setdefault(phase, []).append(milliseconds)
+
+        reference = (len(expected_colors), expected_colors) if expected_colors is not None else detected
+        start = time.perf_counter()
+        comparison = compare_single(reference, image, **detect_options)
+        compare_latencies.append((time.perf_counter() - start) * 1000)
+        start = time.perf_counter()
+        compare_sequences([("Front", reference, detected)])
+        comparison_latencies.append((time.perf_counter() - start) * 1000)
+
+        result = {"wires": detected[0], "digest": sequence_digest(detected), "match": comparison["match"]}
+        if expected_colors is not None:
+            labelled += 1
+            count_correct += detected[0] == len(expected_colors)
+            matched += comparison["match"]
+            result["expected_wires"] = len(expected_colors)
+        results[name] = result
+
+    latency_ms = {
+        "detect": latency_summary(detect_latencies),
+        "compare": latency_summary(compare_latencies),
+        "comparison": latency_summary(comparison_latencies),
+    }
+    latency_ms.update({phase: latency_summary(values) for phase, values in phase_latencies.items()})
+    total_seconds = sum(detect_latencies) / 1000
+    return {
+        "images": len(results),
+        "runs": len(detect_latencies),
+        "throughput_per_s": round(len(detect_latencies) / total_seconds, 2) if total_seconds else None,
+        "latency_ms": latency_ms,
+        "accuracy": {"labelled": labelled, "count_correct": count_correct, "match": matched},
+        "results": results,
+    }
+
+def check_against_baseline(report, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Compares a suite report with a saved baseline.
+
+    Returns:
+        list: One message per regression: an image whose detected sequence or
+              verdict changed (or that is missing), or a p50 latency of
+              "detect" or "compare" more than tolerance above the baseline.
+    """
+    problems = []
+    for name, expected in baseline["results"].items():
+        result = report["results"].get(name)
+        if result is None:
+            problems.append(f"{name}: missing from this run")
+        elif result["digest"] != expected["digest"] or result["match"] != expected["match"]:
+            problems.append(
+                f"{name}: result changed ({expected['wires']} wires, match={expected['match']} -> "
+                f"{result['wires']} wires, match={result['match']})"
+            )
+    for key in ("detect", "compare"):
+        before = baseline["latency_ms"].get(key, {}).get("p50")
+        after = report["latency_ms"].get(key, {}).get("p50")
+        if before and after and after > before * (1 + tolerance):
+            problems.append(f"{key}: p50 {after:.2f} ms vs baseline {before:.2f} ms")
+    return problems
+
+def print_suite_report(report):
+    print(f"{report['images']} images, {report['runs']} detections, {report['throughput_per_s']} detections/s")
+    accuracy = report["accuracy"]
+    if accuracy["labelled"]:
+        print(f"wire count correct {accuracy['count_correct']}/{accuracy['labelled']}, matches {accuracy['match']}/{accuracy['labelled']}")
+    print(f"{'phase':<12} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for phase, summary in report["latency_ms"].items():
+        if summary:
+            print(f"{phase:<12} {summary['p50']:>9.2f} {summary['p95']:>9.2f} {summary['p99']:>9.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the wire sequence detector on synthetic captures.")
+    parser.add_argument("--repeat", type=int, default=10, help="timed runs per configuration")
+    parser.add_argument("--levels", type=int, nargs="+", default=[0, 1, 2, 3], help="pyramid levels to compare")
+    parser.add_argument("--phases", action="store_true", help="print per-phase timings at pyramid level 0 instead")
+    parser.add_argument("--decode", action="store_true", help="compare decode policies on JPEG captures instead")
+    suite = parser.add_argument_group("suite", "time every phase and the comparison over a set of images")
+    suite.add_argument("--suite", action="store_true", help="run the suite (synthetic images unless --captures is given)")
+    suite.add_argument("--captures", metavar="DIR", help="replay the captures in DIR (optional labels.json)")
+    suite.add_argument("--count", type=int, default=20, help="synthetic images to generate (per resolution for the pyramid check)")
+    suite.add_argument("--resolution", default="1080p", choices=sorted(DECODE_RESOLUTIONS), help="synthetic image size")
+    suite.add_argument("--wires", type=int, help="wires per synthetic connector (default: random 2-8)")
+    suite.add_argument("--noise", type=float, default=4.0, help="sensor noise standard deviation")
+    suite.add_argument("--blur", type=int, default=3, help="blur kernel size (odd, 0 for none)")
+    suite.add_argument("--lighting", type=float, default=1.0, help="brightness gain")
+    suite.add_argument("--gradient", type=float, default=0.0, help="brightness falloff across the image")
+    suite.add_argument("--seed", type=int, default=0, help="seed for the synthetic set")
+    suite.add_argument("--scanlines", type=int, default=1, help="scanlines per image (see get-sequence)")
+    suite.add_argument("--pyramid-level", type=int, default=0, help="pyramid level (see get-sequence)")
+    suite.add_argument("--profile", help="connector type whose tuned detection parameters to use (see tuner.py)")
+    suite.add_argument("--save", metavar="FILE", help="write the report as a JSON baseline")
+    suite.add_argument("--check", metavar="FILE", help="compare with a saved baseline; exit with 1 on regressions")
+    suite.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="accepted relative p50 slowdown for --check")
+    args = parser.parse_args()
+
+    if args.suite:
+        if args.captures:
+            images = load_captures(args.captures)
+            config = {"captures": args.captures}
+        else:
+            width, height = DECODE_RESOLUTIONS[args.resolution]
+            config = {
+                "count": args.count, "resolution": args.resolution, "wires": args.wires, "seed": args.seed,
+                "noise": args.noise, "blur": args.blur, "lighting": args.lighting, "gradient": args.gradient,
+            }
+            images = synthetic_set(
+                args.count, width, height, args.wires, args.seed,
+                noise=args.noise, blur=args.blur, lighting=args.lighting, gradient=args.gradient,
+            )
+        config.update({"repeat": args.repeat, "scanlines": args.scanlines, "pyramid_level": args.pyramid_level, "profile": args.profile})
+        params = request_params({"profile": args.profile})
+        if not args.captures and not args.profile:
+            # The synthetic connector is drawn larger on larger images.
+            params = synthetic_params(height)
+        report = run_suite(images, args.repeat, num_scanlines=args.scanlines, pyramid_level=args.pyramid_level, params=params)
+        report = {"config": config, "environment": environment(), **report}
+        print_suite_report(report)
+
+        if args.save:
+            with open(args.save, "w") as f:
+                json.dump(report, f, indent=2)
+        if args.check:
+            with open(args.check) as f:
+                baseline = json.load(f)
+            problems = check_against_baseline(report, baseline, args.tolerance)
+            for problem in problems:
+                print(f"REGRESSION {problem}")
+            if problems:
+                raise SystemExit(1)
+            print("No regressions against the baseline.")
+        return
+
+    if args.decode:
+        print(f"{'resolution':<10} {'policy':>8} {'total ms':>9} {'peak MB':>8} {'wires':>5}")
+        for row in bench_decode(args.repeat):
+            print(f"{row['resolution']:<10} {row['policy']:>8} {row['total_ms']:>9.1f} {row['peak_mb']:>8.1f} {row['wires']:>5}")
+        return
+
+    if args.phases:
+        for name, phases in bench_phases(args.repeat).items():
+            print(name)
+            if phases is None:
+                print("  not timed: no synthetic image is detected correctly")
+                continue
+            for phase, milliseconds in phases.items():
+                print(f"  {phase:<12} {milliseconds:>8.2f} ms")
+        return
+
+    print(f"{'resolution':<10} {'level':>5} {'timed':>5} {'segment ms':>11} {'total ms':>9} {'correct':>7} {'agreement':>9}")
+    for row in bench_pyramid(args.levels, args.repeat, args.count):
+        if row["timed"]:
+            print(f"{row['resolution']:<10} {row['pyramid_level']:>5} {row['timed']:>5} {row['segment_ms']:>11.1f} {row['total_ms']:>9.1f}"
+                  f" {row['correct']:>7.0%} {row['agreement']:>9.0%}")
+        else:
+            print(f"{row['resolution']:<10} {row['pyramid_level']:>5} {0:>5} {'-':>11} {'-':>9} {row['correct']:>7.0%} {'-':>9}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+import numpy as np
+
+# Linear sRGB -> CIE XYZ (D65) and the D65 reference white.
+_RGB_TO_XYZ = np.array([
+    [0.4124564, 0.3575761, 0.1804375],
+    [0.2126729, 0.7151522, 0.0721750],
+    [0.0193339, 0.1191920, 0.9503041],
+])
+_D65_WHITE = np.array([0.95047, 1.0, 1.08883])
+
+def bgr_to_lab(colors):
+    """
+    Converts BGR colors (0-255, as sampled by the detector) to CIELAB under D65.
+
+    Args:
+        colors (np.array): (N, 3) BGR colors.
+
+    Returns:
+        np.array: (N, 3) L*, a*, b* values (L* in 0-100).
+    """
+    rgb = np.asarray(colors, dtype=np.float64)[:, ::-1] / 255.0
+    linear = np.where(rgb <= 0.04045, rgb / 12.92, ((rgb + 0.055) / 1.055) ** 2.4)
+    xyz = linear @ _RGB_TO_XYZ.T / _D65_WHITE
+
+    epsilon = (6 / 29) ** 3
+    f = np.where(xyz > epsilon, np.cbrt(xyz), xyz / (3 * (6 / 29) ** 2) + 4 / 29)
+    lab = np.empty_like(f)
+    lab[:, 0] = 116 * f[:, 1] - 16
+    lab[:, 1] = 500 * (f[:, 0] - f[:, 1])
+    lab[:, 2] = 200 * (f[:, 1] - f[:, 2])
+    return lab
+
+def bgr_euclidean(desired_colors, detected_colors):
+    """
+    Euclidean distance in raw BGR space (0-255 per channel).
+    """
+    return np.linalg.norm(desired_colors - detected_colors, axis=1)
+
+def delta_e76(desired_colors, detected_colors):
+    """
+    CIE76 color difference: Euclidean distance in CIELAB.
+    """
+    return np.linalg.norm(bgr_to_lab(desired_colors) - bgr_to_lab(detected_colors), axis=1)
+
+def delta_e2000(desired_colors, detected_colors):
+    """
+    CIEDE2000 color difference (kL = kC = kH = 1), following Sharma, Wu and
+    Dalal, "The CIEDE2000 Color-Difference Formula" (2005).
+    """
+    L1, a1, b1 = bgr_to_lab(desired_colors).T
+    L2, a2, b2 = bgr_to_lab(detected_colors).T
+
+    C_bar = (np.hypot(a1, b1) + np.hypot(a2, b2)) / 2
+    C_bar7 = C_bar ** 7
+    G = 0.5 * (1 - np.sqrt(C_bar7 / (C_bar7 + 25.0 ** 7)))
+    a1_prime = (1 + G) * a1
+    a2_prime = (1 + G) * a2
+    C1_prime = np.hypot(a1_prime, b1)
+    C2_prime = np.hypot(a2_prime, b2)
+    h1_prime = np.degrees(np.arctan2(b1, a1_prime)) % 360
+    h2_prime = np.degrees(np.arctan2(b2, a2_prime)) % 360
+
+    chroma_product = C1_prime * C2_prime
+    achromatic = chroma_product == 0
+
+    delta_L_prime = L2 - L1
+    delta_C_prime = C2_prime - C1_prime
+    delta_h = h2_prime - h1_prime
+    delta_h = np.where(delta_h > 180, delta_h - 360, np.where(delta_h < -180, delta_h + 360, delta_h))
+    delta_h = np.where(achromatic, 0.0, delta_h)
+    delta_H_prime = 2 * np.sqrt(chroma_product) * np.sin(np.radians(delta_h) / 2)
+
+    L_bar_prime = (L1 + L2) / 2
+    C_bar_prime = (C1_prime + C2_prime) / 2
+    h_sum = h1_prime + h2_prime
+    h_bar_prime = np.where(
+        np.abs(h1_prime - h2_prime) <= 180, h_sum / 2,
+        np.where(h_sum < 360, (h_sum + 360) / 2, (h_sum - 360) / 2)
+    )
+    h_bar_prime = np.where(achromatic, h_sum, h_bar_prime)
+
+    T = (1
+         - 0.17 * np.cos(np.radians(h_bar_prime - 30))
+         + 0.24 * np.cos(np.radians(2 * h_bar_prime))
+         + 0.32 * np.cos(np.radians(3 * h_bar_prime + 6))
+         - 0.20 * np.cos(np.radians(4 * h_bar_prime - 63)))
+    delta_theta = 30 * np.exp(-(((h_bar_prime - 275) / 25) ** 2))
+    C_bar_prime7 = C_bar_prime ** 7
+    R_C = 2 * np.sqrt(C_bar_prime7 / (C_bar_prime7 + 25.0 ** 7))
+    L_offset = (L_bar_prime - 50) ** 2
+    S_L = 1 + 0.015 * L_offset / np.sqrt(20 + L_offset)
+    S_C = 1 + 0.045 * C_bar_prime
+    S_H = 1 + 0.015 * C_bar_prime * T
+    R_T = -np.sin(np.radians(2 * delta_theta)) * R_C
+
+    L_term = delta_L_prime / S_L
+    C_term = delta_C_prime / S_C
+    H_term = delta_H_prime / S_H
+    return np.sqrt(L_term ** 2 + C_term ** 2 + H_term ** 2 + R_T * C_term * H_term)
+
+# Available metrics, by the name used in requests.
+METRICS = {
+    "bgr": bgr_euclidean,
+    "cie76": delta_e76,
+    "ciede2000": delta_e2000,
+}
+
+# Default pass/fail threshold for each metric. "bgr" keeps the historical value;
+# the CIELAB ones are starting points on the usual delta E scale, where ~2.3 is
+# a just-noticeable difference and different wire colors sit far above 20.
+DEFAULT_THRESHOLDS = {
+    "bgr": 50.0,
+    "cie76": 20.0,
+    "ciede2000": 12.0,
+}
+
+DEFAULT_METRIC = "bgr"
+
+def color_distances(desired_colors, detected_colors, metric=DEFAULT_METRIC):
+    """
+    Returns the distance of every desired/detected color pair under a metric.
+
+    Args:
+        desired_colors (np.array): (N, 3) desired BGR colors.
+        detected_colors (np.array): (N, 3) detected BGR colors.
+        metric (str): One of the names in METRICS.
+
+    Returns:
+        np.array: (N,) distances.
+    """
+    if metric not in METRICS:
+        raise ValueError(f"Unknown color metric: {metric}")
+    if desired_colors.shape != detected_colors.shape:
+        raise ValueError(f"Reference has {len(desired_colors)} colors for {len(detected_colors)} wires")
+    if len(desired_colors) == 0:
+        return np.zeros(0)
+    return METRICS[metric](desired_colors, detected_colors)
+
+def default_threshold(metric):
+    """
+    Returns the default pass/fail threshold for a metric.
+    """
+    if metric not in DEFAULT_THRESHOLDS:
+        raise ValueError(f"Unknown color metric: {metric}")
+    return DEFAULT_THRESHOLDS[metric]
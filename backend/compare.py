@@ -1,82 +1,253 @@
 import sys
 import json
-import base64
+import time
+import argparse
 import numpy as np
-import cv2
-from getsequence import get_single_sequence, get_double_sequence
-
-def base64_to_cv2_image(base64_list):
+from getsequence import get_single_sequence, get_double_sequence, quick_sequence, detection_options, face_timings, start_timer, record_phase
+from imagedecode import decode_image, EncodedImage
+from executor import map_ordered, set_worker_count
+from reference import reference_cache, as_color_array
+from roitracker import tracker_stats
+from colordistance import color_distances, default_threshold, DEFAULT_METRIC
+from diagnostics import request_trace, finish_trace
+
+def base64_to_cv2_image(base64_list, policy="full"):
+    # Each entry may also use the binary input forms handled by
+    # imagedecode.decode_image (file paths, shared memory, binary frames).
+    # An undecodable capture is an error, not a capture without wires.
     images = []
-    for base64_str in base64_list:
-        if base64_str.startswith("data:image"):
-            base64_str = base64_str.split(",")[1]
-        base64_str += "=" * (-len(base64_str) % 4)  # Fix padding
-        decoded = base64.b64decode(base64_str)
-        np_data = np.frombuffer(decoded, np.uint8)
-        img = cv2.imdecode(np_data, cv2.IMREAD_COLOR)
-        images.append(img)
+    for index, source in enumerate(base64_list):
+        image = decode_image(source, policy=policy)
+        if image is None:
+            raise ValueError(f"Could not decode input image {index}")
+        images.append(image)
     return images
 
-def compare_single(original, input_image):
+def check_decoded(images):
     """
-    Compares the detected wire sequence from an image with a desired sequence.
+    Raises ValueError if a capture with the "reduced" decode policy, which is
+    only decoded during detection, turned out to be undecodable.
+    """
+    for index, image in enumerate(images):
+        if isinstance(image, EncodedImage) and image.undecodable:
+            raise ValueError(f"Could not decode input image {index}")
+
+def bgr_tuple(color):
+    """
+    Formats one row of a color array as a tuple of ints for messages.
+    """
+    return tuple(int(value) for value in color)
+
+def compare_face(name, desired_sequence, detected_sequence):
+    """
+    Compares the wire counts of one face (one camera view) and prepares its
+    colors for comparison.
 
     Args:
-        original (tuple): A tuple where the first element is the desired number
-                          of wires (int) and the second element is a list of
-                          desired wire colors as BGR tuples (list of tuples).
-        input_image (np.array): The image (BGR format) to detect the wire sequence from.
+        name (str): The face's name, e.g. "Front".
+        desired_sequence (tuple): Desired (number of wires, colors).
+        detected_sequence (tuple): Detected (number of wires, colors).
 
     Returns:
-        dict: A dictionary with keys "match" (bool) indicating if the sequences
-              match (within threshold) and "details" (str) providing a summary
-              of the comparison, including any mismatches.
+        tuple: The face's result dict (without per-wire results yet) and the
+               (desired, detected) color arrays to compare, or None when the
+               counts differ or there are no wires.
     """
-    desired_num_wires, desired_colors = original
+    desired_num_wires, desired_colors = desired_sequence
+    detected_num_wires, detected_colors = detected_sequence
+    result = {
+        "face": name,
+        "expected_wires": desired_num_wires,
+        "detected_wires": detected_num_wires,
+        "count_match": detected_num_wires == desired_num_wires,
+        "wires": [],
+    }
+    # Only compare colors if wire counts match and are greater than 0
+    if not result["count_match"] or desired_num_wires == 0:
+        return result, None
+
+    desired_bgr = as_color_array(desired_colors)[:desired_num_wires]
+    detected_bgr = as_color_array(detected_colors)
+    if desired_bgr.shape != detected_bgr.shape:
+        raise ValueError(f"Reference has {len(desired_bgr)} colors for {len(detected_bgr)} wires")
+    return result, (desired_bgr, detected_bgr)
+
+def compare_sequences(faces, color_metric=DEFAULT_METRIC, color_threshold=None):
+    """
+    Compares detected wire sequences with desired ones for any number of faces
+    (a single view, front and back, or more angles).
 
-    # Call the function from the previous task to get detected sequence
-    detected_num_wires, detected_colors = get_single_sequence(input_image)
+    The colors of every face are scored in one vectorized color_distances call.
 
-    # Compare the number of wires
-    if detected_num_wires != desired_num_wires:
-        return {
-            "match": False,
-            "details": f"Mismatch: Expected {desired_num_wires} wires, but detected {detected_num_wires}"
-        }
+    Args:
+        faces (list): (name, desired sequence, detected sequence) per face,
+                      where each sequence is (number of wires, colors).
+        color_metric (str): Color distance metric, one of colordistance.METRICS.
+        color_threshold (float, optional): Largest distance still counted as a
+                                           match; defaults to the metric's
+                                           default threshold.
 
-    # --- Color Comparison ---
-    # Define a threshold for color difference (Euclidean distance in BGR space)
+    Returns:
+        dict: "match" (bool), "details" (str) and "faces", one dict per face
+              with "face", "expected_wires", "detected_wires", "count_match",
+              "match" and "wires": per wire its "index" (0-based), "expected"
+              and "detected" BGR, "distance" and "match".
+    """
+    # Threshold for the color difference under the chosen metric
     # This threshold value might need tuning based on image quality and color variations.
-    color_difference_threshold = 50 # Example threshold value
+    color_difference_threshold = color_threshold if color_threshold is not None else default_threshold(color_metric)
+
+    face_results = []
+    to_compare = []
+    for name, desired_sequence, detected_sequence in faces:
+        result, colors = compare_face(name, desired_sequence, detected_sequence)
+        face_results.append(result)
+        if colors is not None:
+            to_compare.append((result, colors))
+
+    if to_compare:
+        # Distance between every pair of colors, for all faces at once
+        desired_all = np.concatenate([desired for _, (desired, _) in to_compare])
+        detected_all = np.concatenate([detected for _, (_, detected) in to_compare])
+        color_differences = color_distances(desired_all, detected_all, color_metric)
+        passed = color_differences <= color_difference_threshold
+
+        offset = 0
+        for result, (desired_bgr, detected_bgr) in to_compare:
+            for i in range(len(desired_bgr)):
+                result["wires"].append({
+                    "index": i,
+                    "expected": bgr_tuple(desired_bgr[i]),
+                    "detected": bgr_tuple(detected_bgr[i]),
+                    "distance": float(color_differences[offset + i]),
+                    "match": bool(passed[offset + i]),
+                })
+            offset += len(desired_bgr)
+
+    for result in face_results:
+        result["match"] = result["count_match"] and all(wire["match"] for wire in result["wires"])
+    overall_match = all(result["match"] for result in face_results)
+
+    if len(face_results) == 1:
+        details = _single_face_details(face_results[0])
+    else:
+        details = _multi_face_details(face_results)
+    return {"match": overall_match, "details": details, "faces": face_results}
+
+def _color_mismatch_messages(face_result, difference_label):
+    return [
+        f"Wire {wire['index']+1}: Expected BGR {wire['expected']}, "
+        f"detected BGR {wire['detected']} ({difference_label}: {wire['distance']:.2f})"
+        for wire in face_result["wires"] if not wire["match"]
+    ]
+
+def _single_face_details(face_result):
+    if not face_result["count_match"]:
+        return f"Mismatch: Expected {face_result['expected_wires']} wires, but detected {face_result['detected_wires']}"
+    if face_result["match"]:
+        return "SUCCESSFUL: Number of wires and colors match within threshold."
+    return f"Number of wires match, but color mismatches found: {'; '.join(_color_mismatch_messages(face_result, 'Difference'))}"
+
+def _multi_face_details(face_results):
+    if all(result["match"] for result in face_results):
+        names = [result["face"].lower() for result in face_results]
+        if len(names) == 2:
+            return f"SUCCESSFUL: Both {names[0]} and {names[1]} sequences match within the color threshold."
+        return f"SUCCESSFUL: All {', '.join(names)} sequences match within the color threshold."
 
     mismatches = []
-    all_colors_match = True
+    for result in face_results:
+        if not result["count_match"]:
+            mismatches.append(
+                f"{result['face']} Image Mismatch: Expected {result['expected_wires']} wires, "
+                f"but detected {result['detected_wires']}"
+            )
+        elif not result["match"]:
+            mismatches.append(f"{result['face']} Image Color Mismatches: {'; '.join(_color_mismatch_messages(result, 'Diff'))}")
+    return "Mismatches found: " + " | ".join(mismatches)
 
-    # Compare detected BGR values with desired BGR values
-    # Assuming the detected_colors are already sorted left to right from get_single_sequence
-    for i in range(desired_num_wires):
-        desired_bgr = np.array(desired_colors[i])
-        detected_bgr = np.array(detected_colors[i])
+def quick_compare(faces, images, fingerprints, color_metric=DEFAULT_METRIC, color_threshold=None, trace=None, params=None):
+    """
+    Tries the fingerprint fast path (see getsequence.quick_sequence) on every
+    face.
 
-        # Calculate Euclidean distance between the two BGR tuples
-        color_difference = np.linalg.norm(desired_bgr - detected_bgr)
+    Only a clean pass is trusted: if any face does not line up with its
+    fingerprint or any wire fails, the caller runs full detection, so every
+    failure is reported from the full pipeline.
 
-        if color_difference > color_difference_threshold:
-            all_colors_match = False
-            mismatches.append(
-                f"Wire {i+1}: Expected BGR {tuple(desired_bgr)}, "
-                f"detected BGR {tuple(detected_bgr)} (Difference: {color_difference:.2f})"
-            )
+    Args:
+        faces (list): (name, desired sequence) per face.
+        images (list): The image of each face.
+        fingerprints (list): The stored fingerprint of each face.
+        color_metric (str): Color distance metric, one of colordistance.METRICS.
+        color_threshold (float, optional): As for compare_sequences.
+        trace (diagnostics.Trace, optional): Collects the "quick" phase of
+                                             each face.
+        params (dict, optional): Detection parameters the fingerprints were
+                                 taken with.
 
-    if all_colors_match:
-        return {"match": True, "details": "SUCCESSFUL: Number of wires and colors match within threshold."}
-    else:
-        return {
-            "match": False,
-            "details": f"Number of wires match, but color mismatches found: {'; '.join(mismatches)}"
-        }
+    Returns:
+        dict: The comparison result (see compare_sequences) if every face
+              matched, otherwise None.
+    """
+    if not fingerprints or len(fingerprints) != len(faces):
+        return None
+    compared_faces = []
+    for (name, desired_sequence), image, fingerprint in zip(faces, images, fingerprints):
+        if not fingerprint:
+            return None
+        detected_sequence = quick_sequence(image, fingerprint, timings=face_timings(trace, name.lower()), params=params)
+        if detected_sequence is None:
+            return None
+        compared_faces.append((name, desired_sequence, detected_sequence))
+    start = start_timer(trace)
+    result = compare_sequences(compared_faces, color_metric, color_threshold)
+    record_phase(trace, "comparison", start)
+    return result if result["match"] else None
+
+def compare_single(original, input_image, color_metric=DEFAULT_METRIC, color_threshold=None, fingerprint=None, trace=None, **detect_options):
+    """
+    Compares the detected wire sequence from an image with a desired sequence.
+
+    Args:
+        original (tuple): A tuple where the first element is the desired number
+                          of wires (int) and the second element is a list of
+                          desired wire colors as BGR tuples (list of tuples).
+        input_image (np.array): The image (BGR format) to detect the wire sequence from.
+        color_metric (str): Color distance metric, one of colordistance.METRICS.
+        color_threshold (float, optional): Largest distance still counted as a
+                                           match; defaults to the metric's
+                                           default threshold.
+        fingerprint (list, optional): The reference's stored fingerprint (one
+                                      entry). If given, the fast path is tried
+                                      before full detection (see quick_compare).
+        trace (diagnostics.Trace, optional): Collects the detection phases in
+                                             its "front" face and the
+                                             "comparison" phase.
+        **detect_options: Detection settings passed on to get_single_sequence.
 
-def compare_double(original, input_image):
+    Returns:
+        dict: A dictionary with keys "match" (bool) indicating if the sequences
+              match (within threshold), "details" (str) providing a summary
+              of the comparison, including any mismatches, and "faces" with the
+              structured per-wire results (see compare_sequences). With a
+              fingerprint, "fast_path" tells whether the fast path decided.
+    """
+    if fingerprint:
+        result = quick_compare([("Front", original)], [input_image], fingerprint, color_metric, color_threshold, trace, detect_options.get("params"))
+        if result is not None:
+            result["fast_path"] = True
+            return result
+
+    detected = get_single_sequence(input_image, timings=face_timings(trace, "front"), **detect_options)
+    start = start_timer(trace)
+    result = compare_sequences([("Front", original, detected)], color_metric, color_threshold)
+    record_phase(trace, "comparison", start)
+    if fingerprint:
+        result["fast_path"] = False
+    return result
+
+def compare_double(original, input_image, color_metric=DEFAULT_METRIC, color_threshold=None, fingerprint=None, trace=None, **detect_options):
     """
     Compares the detected wire sequences from front and back images with desired sequences.
 
@@ -88,110 +259,208 @@ def compare_double(original, input_image):
                           list of BGR tuples).
         input_image (tuple): A tuple containing the front image (np.array) and
                              the back image (np.array).
+        color_metric (str): Color distance metric, one of colordistance.METRICS.
+        color_threshold (float, optional): Largest distance still counted as a
+                                           match, for both sides; defaults to
+                                           the metric's default threshold.
+        fingerprint (list, optional): The reference's stored fingerprints
+                                      (front, back), see compare_single.
+        trace (diagnostics.Trace, optional): As for compare_single, with a
+                                             "front" and a "back" face.
+        **detect_options: Detection settings passed on to get_double_sequence.
 
     Returns:
-        dict: A dictionary indicating the overall match status ("match": bool)
-              and details of any mismatches ("details": str).
+        dict: A dictionary indicating the overall match status ("match": bool),
+              details of any mismatches ("details": str) and the structured
+              per-wire results ("faces", see compare_sequences), plus
+              "fast_path" as in compare_single.
     """
     desired_front_seq, desired_back_seq = original
     front_image, back_image = input_image
 
-    # Call get_double_sequence to get detected results for both images
-    detected_front_seq, detected_back_seq = get_double_sequence(front_image, back_image)
+    if fingerprint:
+        result = quick_compare(
+            [("Front", desired_front_seq), ("Back", desired_back_seq)],
+            [front_image, back_image], fingerprint, color_metric, color_threshold, trace,
+            detect_options.get("params")
+        )
+        if result is not None:
+            result["fast_path"] = True
+            return result
 
-    detected_front_num_wires, detected_front_colors = detected_front_seq
-    detected_back_num_wires, detected_back_colors = detected_back_seq
+    # Call get_double_sequence to get detected results for both images
+    detected_front_seq, detected_back_seq = get_double_sequence(front_image, back_image, trace=trace, **detect_options)
+
+    start = start_timer(trace)
+    result = compare_sequences([
+        ("Front", desired_front_seq, detected_front_seq),
+        ("Back", desired_back_seq, detected_back_seq),
+    ], color_metric, color_threshold)
+    record_phase(trace, "comparison", start)
+    if fingerprint:
+        result["fast_path"] = False
+    return result
+
+def comparison_options(data):
+    """
+    Extracts the optional color matching settings from a request.
 
-    desired_front_num_wires, desired_front_colors = desired_front_seq
-    desired_back_num_wires, desired_back_colors = desired_back_seq
+    Args:
+        data (dict): A request that may carry "color_metric", "color_threshold"
+                     and "fingerprint" (the reference's stored fingerprints,
+                     as a list or its JSON string).
 
-    mismatches = []
-    overall_match = True
-
-    # --- Compare Front Image Sequence ---
-    if detected_front_num_wires != desired_front_num_wires:
-        overall_match = False
-        mismatches.append(
-            f"Front Image Mismatch: Expected {desired_front_num_wires} wires, "
-            f"but detected {detected_front_num_wires}"
-        )
-    elif desired_front_num_wires > 0: # Only compare colors if wire counts match and are greater than 0
-         # Define a threshold for color difference (Euclidean distance in BGR space)
-        color_difference_threshold = 50 # Using the same threshold as compare_single
-
-        front_color_mismatches = []
-        for i in range(desired_front_num_wires):
-            desired_bgr = np.array(desired_front_colors[i])
-            detected_bgr = np.array(detected_front_colors[i])
-            color_difference = np.linalg.norm(desired_bgr - detected_bgr)
-
-            if color_difference > color_difference_threshold:
-                overall_match = False
-                front_color_mismatches.append(
-                    f"Wire {i+1}: Expected BGR {tuple(desired_bgr)}, "
-                    f"detected BGR {tuple(detected_bgr)} (Diff: {color_difference:.2f})"
-                )
-        if front_color_mismatches:
-            mismatches.append(f"Front Image Color Mismatches: {'; '.join(front_color_mismatches)}")
-    elif desired_front_num_wires == 0 and detected_front_num_wires == 0:
-         # Explicitly state success if both are empty
-         pass # No mismatch
-
-    # --- Compare Back Image Sequence ---
-    if detected_back_num_wires != desired_back_num_wires:
-        overall_match = False
-        mismatches.append(
-            f"Back Image Mismatch: Expected {desired_back_num_wires} wires, "
-            f"but detected {detected_back_num_wires}"
-        )
-    elif desired_back_num_wires > 0: # Only compare colors if wire counts match and are greater than 0
-        color_difference_threshold = 50 # Using the same threshold
-
-        back_color_mismatches = []
-        for i in range(desired_back_num_wires):
-            desired_bgr = np.array(desired_back_colors[i])
-            detected_bgr = np.array(detected_back_colors[i])
-            color_difference = np.linalg.norm(desired_bgr - detected_bgr)
-
-            if color_difference > color_difference_threshold:
-                overall_match = False
-                back_color_mismatches.append(
-                    f"Wire {i+1}: Expected BGR {tuple(desired_bgr)}, "
-                    f"detected BGR {tuple(detected_bgr)} (Diff: {color_difference:.2f})"
-                )
-        if back_color_mismatches:
-            mismatches.append(f"Back Image Color Mismatches: {'; '.join(back_color_mismatches)}")
-    elif desired_back_num_wires == 0 and detected_back_num_wires == 0:
-         # Explicitly state success if both are empty
-         pass # No mismatch
-
-    # --- Construct Result Dictionary ---
-    if overall_match:
-        details = "SUCCESSFUL: Both front and back sequences match within the color threshold."
+    Returns:
+        dict: Keyword arguments for compare_single and compare_double.
+    """
+    fingerprint = data.get("fingerprint")
+    if isinstance(fingerprint, str):
+        fingerprint = json.loads(fingerprint)
+    return {
+        "color_metric": data.get("color_metric", DEFAULT_METRIC),
+        "color_threshold": data.get("color_threshold"),
+        "fingerprint": fingerprint,
+    }
+
+def compare_images(wire_type, reference, test_images, **options):
+    """
+    Dispatches to compare_single or compare_double depending on the wire type.
+    """
+    if wire_type == "singlewire":
+        return compare_single(reference[0], test_images[0], **options)
+    elif wire_type == "doublewire":
+        return compare_double([reference[0], reference[1]], test_images, **options)
     else:
-        details = "Mismatches found: " + " | ".join(mismatches) if mismatches else "Unknown mismatch" # Should not happen if overall_match is False but no mismatches were added
+        raise ValueError("Invalid wire type")
 
-    return {"match": overall_match, "details": details}
+def handle_request(data):
+    """
+    Runs a comparison for a single decoded request.
+
+    Args:
+        data (dict): Request with "wire_count", "sequence" (the stringified
+                     reference sequence as stored in the database), optionally
+                     "wire_id" (the reference's database ID), "input"
+                     (list of base64 images), "wireType" and optionally
+                     the settings read by detection_options and
+                     comparison_options. "decode" selects the decode policy
+                     ("full" or "reduced", see imagedecode.DECODE_POLICIES).
+                     "trace" and "trace_file" work as for get-sequence.
+
+    Returns:
+        dict: The comparison result ("match" and "details").
+    """
+    trace = request_trace(data)
+    reference = reference_cache.get(data["wire_count"], data["sequence"], data.get("wire_id"))
+    start = start_timer(trace)
+    test_images = base64_to_cv2_image(data["input"], data.get("decode", "full"))
+    record_phase(trace, "input_decode", start)
+    result = compare_images(data["wireType"], reference, test_images, trace=trace, **detection_options(data), **comparison_options(data))
+    check_decoded(test_images)
+    return finish_trace(result, trace, data)
+
+def _compare_batch_item(indexed_request):
+    index, request = indexed_request
+    result = {"index": index, "id": request.get("id")}
+    start = time.perf_counter()
+    trace = request_trace(request)
+    try:
+        # Items usually share one stored reference; parse it only once.
+        reference = reference_cache.get(request["wire_count"], request["sequence"], request.get("wire_id"))
+
+        # With the "reduced" decode policy most decoding is deferred to the
+        # detector, so it is counted under "compare".
+        test_images = base64_to_cv2_image(request["input"], request.get("decode", "full"))
+        decoded = time.perf_counter()
+        result.update(compare_images(request["wireType"], reference, test_images, trace=trace, **detection_options(request), **comparison_options(request)))
+        check_decoded(test_images)
+        del test_images
+        compared = time.perf_counter()
+
+        result["timings"] = {
+            "decode": round((decoded - start) * 1000, 2),
+            "compare": round((compared - decoded) * 1000, 2),
+            "total": round((compared - start) * 1000, 2),
+        }
+    except Exception as e:
+        result.update({"match": False, "details": "", "error": str(e)})
+        result["timings"] = {"total": round((time.perf_counter() - start) * 1000, 2)}
+    return finish_trace(result, trace, request)
+
+def compare_batch(items, defaults=None):
+    """
+    Compares many captures against their references, spread across the worker
+    pool (see executor.py).
+
+    Items are consumed lazily and only a bounded number are decoded and in flight
+    at any time, so memory stays bounded no matter how long the batch is.
+
+    Args:
+        items (iterable): Request dicts shaped like the single-comparison
+                          request. Keys missing from an item ("wireType",
+                          "wire_count", "sequence") are taken from defaults.
+        defaults (dict, optional): Shared values, e.g. one stored reference that
+                                   every item is checked against.
+
+    Yields:
+        dict: One result per item, in input order, with "index", the item's
+              "id" (if any), "match", "details" and "timings" in milliseconds
+              ("decode", "compare", "total"). An item that cannot be processed
+              yields "match": False and an "error" message instead of stopping
+              the batch. Items (or defaults) with "trace" also carry their
+              trace (see diagnostics.request_trace).
+    """
+    defaults = defaults or {}
+    requests = ((index, {**defaults, **item}) for index, item in enumerate(items))
+    yield from map_ordered(_compare_batch_item, requests)
+
+def handle_batch_request(data):
+    """
+    Runs a batch comparison for a request of the form
+    {"items": [...], "wireType": ..., "wire_count": ..., "sequence": ...}
+    where the top-level keys are optional defaults shared by every item.
+
+    The request is already in memory and all results are collected into one
+    response, so memory grows with the batch; images are still decoded one
+    item at a time. Only the streaming mode (compare.py --batch) is bounded.
+
+    Returns:
+        dict: {"results": [...]} with one entry per item, in input order.
+    """
+    defaults = {key: value for key, value in data.items() if key != "items"}
+    return {"results": list(compare_batch(data["items"], defaults))}
+
+def read_batch_lines(stream):
+    """
+    Yields one item per non-empty line of newline-delimited JSON.
+    """
+    for line in stream:
+        if line.strip():
+            yield json.loads(line)
 
 def main():
+    parser = argparse.ArgumentParser(description="Compare captured wire images against a stored sequence.")
+    parser.add_argument("--batch", action="store_true", help="read one item per stdin line and write one result per line")
+    parser.add_argument("--workers", type=int, help="number of worker threads (default: BACKEND_WORKERS or CPU count)")
+    parser.add_argument("--track-roi", metavar="NAME", help="in batch mode, reuse the connector region across items (see track_roi)")
+    args = parser.parse_args()
+
     try:
+        if args.workers:
+            set_worker_count(args.workers)
+
+        if args.batch:
+            # Streaming batch mode: one item per stdin line, one result per stdout line.
+            defaults = {"track_roi": args.track_roi} if args.track_roi else None
+            for result in compare_batch(read_batch_lines(sys.stdin), defaults):
+                print(json.dumps(result), flush=True)
+            if args.track_roi:
+                print(json.dumps({"roi_tracking": tracker_stats()}), file=sys.stderr)
+            return
+
         raw_input = sys.stdin.read()
         data = json.loads(raw_input)
-        
-        wire_count = data["wire_count"]
-        sequence = data["sequence"]
-        stringified_rgb_list = json.loads(sequence)
-        sequence = [json.loads(rgb) for rgb in stringified_rgb_list]
-        test_images = base64_to_cv2_image(data["input"])
-        wire_type = data["wireType"]
-
-        if wire_type == "singlewire":
-            result = compare_single([wire_count[0], sequence[0]], test_images[0])
-        elif wire_type == "doublewire":
-            result = compare_double([[wire_count[0], sequence[0]], [wire_count[1], sequence[1]]], test_images)
-        else:
-            raise ValueError("Invalid wire type")
-
+        result = handle_request(data)
         print(json.dumps(result))
 
     except Exception as e:
@@ -199,4 +468,4 @@ def main():
         sys.exit(1)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,109 @@
+import json
+import base64
+import threading
+import cv2
+
+# Width that debug images are downscaled to before encoding.
+DEBUG_IMAGE_WIDTH = 320
+
+_trace_file_lock = threading.Lock()
+
+class Trace(dict):
+    """
+    Opt-in instrumentation for one request.
+
+    A Trace is a timings dict (phase -> milliseconds), so it can be passed
+    wherever a timings dict is accepted, and additionally collects counts and
+    sizes of intermediate results, optional downsampled debug images, and one
+    child trace per face (camera view) of the request.
+
+    Instrumented code only does work for it behind a "timings is not None"
+    check (see note and debug_image), so a request without a trace pays
+    nothing.
+    """
+
+    def __init__(self, capture_images=False, image_width=DEBUG_IMAGE_WIDTH):
+        super().__init__()
+        self.capture_images = capture_images
+        self.image_width = image_width
+        self.counts = {}
+        self.images = {}
+        self.faces = {}
+
+    def face(self, name):
+        """
+        Returns the child trace of one face (e.g. "front"), creating it.
+        """
+        if name not in self.faces:
+            self.faces[name] = Trace(self.capture_images, self.image_width)
+        return self.faces[name]
+
+    def as_dict(self):
+        """
+        Returns the trace as a JSON-serialisable dict with "timings" and,
+        where collected, "counts", "images" and "faces".
+        """
+        result = {"timings": {phase: round(milliseconds, 3) for phase, milliseconds in self.items()}}
+        if self.counts:
+            result["counts"] = self.counts
+        if self.images:
+            result["images"] = self.images
+        if self.faces:
+            result["faces"] = {name: face.as_dict() for name, face in self.faces.items()}
+        return result
+
+def note(trace, name, value):
+    """
+    Records an intermediate count or size in trace, if it is a Trace.
+    """
+    if isinstance(trace, Trace):
+        trace.counts[name] = value
+
+def debug_image(trace, name, image):
+    """
+    Adds a downsampled PNG (base64) of image to trace, if it is a Trace that
+    captures images. Nothing is resized or encoded otherwise.
+    """
+    if not isinstance(trace, Trace) or not trace.capture_images or image is None or image.size == 0:
+        return
+    height, width = image.shape[:2]
+    if width > trace.image_width:
+        image = cv2.resize(image, (trace.image_width, max(1, height * trace.image_width // width)), interpolation=cv2.INTER_AREA)
+    ok, png = cv2.imencode(".png", image)
+    if ok:
+        trace.images[name] = base64.b64encode(png.tobytes()).decode("ascii")
+
+def request_trace(data):
+    """
+    Creates the trace asked for by a request, or returns None.
+
+    Args:
+        data (dict): A request that may carry "trace": true, or
+                     "trace": {"images": true, "image_width": 320} to also
+                     capture debug images.
+
+    Returns:
+        Trace: A new trace, or None if the request did not ask for one.
+    """
+    options = data.get("trace")
+    if not options:
+        return None
+    if isinstance(options, dict):
+        return Trace(options.get("images", False), options.get("image_width", DEBUG_IMAGE_WIDTH))
+    return Trace()
+
+def finish_trace(response, trace, data):
+    """
+    Adds the trace to a response as "trace" or, if the request named a
+    "trace_file", appends it to that file as one JSON line instead.
+    """
+    if trace is None:
+        return response
+    trace_dict = trace.as_dict()
+    if data.get("trace_file"):
+        with _trace_file_lock:
+            with open(data["trace_file"], "a") as f:
+                f.write(json.dumps({"id": data.get("id"), "trace": trace_dict}) + "\n")
+    else:
+        response["trace"] = trace_dict
+    return response
@@ -0,0 +1,121 @@
+import os
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# A thread pool is enough here: the heavy OpenCV calls (GaussianBlur,
+# adaptiveThreshold, morphologyEx, Canny, imdecode) release the GIL, and threads
+# share the decoded images without pickling them across processes.
+WORKERS_ENV_VAR = "BACKEND_WORKERS"
+
+_executor = None
+_worker_count = None
+_lock = threading.Lock()
+_local = threading.local()
+
+def default_worker_count():
+    """
+    Returns the worker count from the BACKEND_WORKERS environment variable, or
+    the number of CPU cores when it is not set.
+    """
+    value = os.environ.get(WORKERS_ENV_VAR)
+    if value:
+        return max(1, int(value))
+    return os.cpu_count() or 1
+
+def get_worker_count():
+    """
+    Returns the number of workers the shared pool uses.
+    """
+    global _worker_count
+    if _worker_count is None:
+        _worker_count = default_worker_count()
+    return _worker_count
+
+def set_worker_count(count):
+    """
+    Sets the number of workers. A count of 1 disables parallelism entirely and
+    runs everything on the calling thread.
+
+    Args:
+        count (int): The number of worker threads, at least 1.
+    """
+    global _executor, _worker_count
+    if count < 1:
+        raise ValueError("Worker count must be at least 1")
+    with _lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True)
+            _executor = None
+        _worker_count = count
+
+def get_executor():
+    """
+    Returns the shared thread pool, creating it on first use.
+    """
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=get_worker_count(), thread_name_prefix="backend-worker")
+        return _executor
+
+def _run_in_worker(function, args):
+    _local.in_worker = True
+    try:
+        return function(*args)
+    finally:
+        _local.in_worker = False
+
+def _run_inline():
+    # Work submitted from inside a pool worker runs inline, otherwise a saturated
+    # pool would wait on itself.
+    return get_worker_count() <= 1 or getattr(_local, "in_worker", False)
+
+def run_all(calls):
+    """
+    Runs several independent calls concurrently and returns their results in the
+    order the calls were given.
+
+    Args:
+        calls (list): (function, args tuple) pairs.
+
+    Returns:
+        list: The return value of each call, in order.
+    """
+    if _run_inline() or len(calls) < 2:
+        return [function(*args) for function, args in calls]
+    executor = get_executor()
+    futures = [executor.submit(_run_in_worker, function, args) for function, args in calls]
+    return [future.result() for future in futures]
+
+def map_ordered(function, iterable, max_pending=None):
+    """
+    Applies function to every item across the pool and yields results in input
+    order.
+
+    The iterable is consumed lazily and at most max_pending items are in flight
+    at once, so a long stream of images is never held in memory all at once.
+
+    Args:
+        function (callable): Called with one item at a time.
+        iterable (iterable): The items to process.
+        max_pending (int, optional): The in-flight limit; defaults to twice the
+                                     worker count.
+
+    Yields:
+        The result for each item, in the order the items were consumed.
+    """
+    if _run_inline():
+        for item in iterable:
+            yield function(item)
+        return
+
+    executor = get_executor()
+    max_pending = max_pending or 2 * get_worker_count()
+    pending = deque()
+    for item in iterable:
+        pending.append(executor.submit(_run_in_worker, function, (item,)))
+        if len(pending) >= max_pending:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
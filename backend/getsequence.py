@@ -1,240 +1,966 @@
 import sys
 import json
-import base64
+import time
+import math
+import functools
 import numpy as np
 import cv2
+from executor import run_all
+from imagedecode import decode_image, EncodedImage
+from roitracker import get_tracker
+from diagnostics import note, debug_image, request_trace, finish_trace
+from profiles import load_profile
 
-def base64_to_cv2_image(base64_str):
-    if base64_str.startswith("data:image"):
-        base64_str = base64_str.split(",")[1]
-    base64_str += "=" * (-len(base64_str) % 4)  # Fix padding
-    decoded = base64.b64decode(base64_str)
-    np_data = np.frombuffer(decoded, np.uint8)
-    img = cv2.imdecode(np_data, cv2.IMREAD_COLOR)
-    return img
+# Default vertical distance, in pixels of the cropped region, between the rows
+# sampled in multi-scanline mode.
+SCANLINE_SPACING = 6
 
+# Parameters from the executed detect_wires_by_edge_on_line call
+SAMPLING_LINE_Y = 200 # From executed code
+CANNY_THRESH_LOW = 30  # From executed code
+CANNY_THRESH_HIGH = 90 # From executed code
+MIN_SEGMENT_WIDTH = 1 # From executed code
+SAMPLE_OFFSET = 3 # From executed code
+SAMPLE_WIDTH = 7 # From executed code
+SAMPLE_STRIP_HEIGHT = 7 # From executed code
+MIN_WIRE_BODY_WIDTH = 8 # From executed code
+MIN_WIRE_SPACING = 2 # From executed code
 
-def get_single_sequence(image):
+# Connector segmentation kernels and threshold offset, tuned for full
+# resolution (see scale_kernel_size), and how far the connector's bounding box
+# is expanded (relative to its size) to include the wires above it.
+BLUR_SIZE = 7
+THRESHOLD_BLOCK_SIZE = 21
+THRESHOLD_OFFSET = 5
+MORPH_SIZE = 7
+EXPAND_FACTOR_Y_UP = 2.5 # From executed code
+EXPAND_FACTOR_Y_DOWN = 0.5 # From executed code
+EXPAND_FACTOR_X = 0.3 # From executed code
+
+# The constants above as detection parameters. A connector type can override
+# any of them with a profile (see profiles.py and tuner.py).
+DEFAULT_PARAMS = {
+    "sampling_line_y": SAMPLING_LINE_Y,
+    "canny_thresh_low": CANNY_THRESH_LOW,
+    "canny_thresh_high": CANNY_THRESH_HIGH,
+    "min_segment_width": MIN_SEGMENT_WIDTH,
+    "sample_offset": SAMPLE_OFFSET,
+    "sample_width": SAMPLE_WIDTH,
+    "sample_strip_height": SAMPLE_STRIP_HEIGHT,
+    "min_wire_body_width": MIN_WIRE_BODY_WIDTH,
+    "min_wire_spacing": MIN_WIRE_SPACING,
+    "blur_size": BLUR_SIZE,
+    "threshold_block_size": THRESHOLD_BLOCK_SIZE,
+    "threshold_offset": THRESHOLD_OFFSET,
+    "morph_size": MORPH_SIZE,
+    "expand_factor_y_up": EXPAND_FACTOR_Y_UP,
+    "expand_factor_y_down": EXPAND_FACTOR_Y_DOWN,
+    "expand_factor_x": EXPAND_FACTOR_X,
+}
+
+# Detection parameters measured in pixels of the capture, which have to grow
+# and shrink with the camera resolution (see scale_params), with the smallest
+# value each may take. The kernel sizes among them stay odd.
+PIXEL_PARAMS = {
+    "sampling_line_y": 0,
+    "sample_offset": 0,
+    "sample_width": 1,
+    "sample_strip_height": 1,
+    "min_wire_body_width": 1,
+    "min_wire_spacing": 0,
+}
+KERNEL_PARAMS = {
+    "blur_size": 1,
+    "threshold_block_size": 3,
+    "morph_size": 1,
+}
+
+# Fast path (see quick_sequence): largest shift, in pixels, of a wire's sample
+# window from its fingerprinted position, and the rows above and below the
+# sampling line that are edge-detected.
+FINGERPRINT_TOLERANCE = 4
+FINGERPRINT_BAND = 16
+
+def detection_params(overrides=None):
     """
-    Detects the number of wires and their color sequence from left to right in the input image.
+    Returns the full set of detection parameters: DEFAULT_PARAMS with the
+    given overrides applied.
 
     Args:
-        image (np.array): Input image in BGR format.
+        overrides (dict, optional): Parameter values to use instead of the
+                                    defaults, e.g. a profile's "params".
 
     Returns:
-        tuple: A tuple containing the number of detected wires (int) and a list
-               of their BGR color values (list of tuples).
-               Returns (0, []) if no wires are detected or processing fails.
+        dict: Every key of DEFAULT_PARAMS.
     """
-    # Ensure image is valid
-    if image is None or image.size == 0:
-        print("Error: Input image is None or empty.", file=sys.stderr)
-        return 0, []
+    if not overrides:
+        return DEFAULT_PARAMS
+    unknown = overrides.keys() - DEFAULT_PARAMS.keys()
+    if unknown:
+        raise ValueError(f"Unknown detection parameters: {', '.join(sorted(unknown))}")
+    return {**DEFAULT_PARAMS, **overrides}
 
-    # --- Phase 1: Preprocessing (Adapted from load_and_preprocess_image) ---
-    # The input 'image' is already the original color image.
-    original_image = image.copy() # Work on a copy
-    gray_image = cv2.cvtColor(original_image, cv2.COLOR_BGR2GRAY)
-    blurred_gray = cv2.GaussianBlur(gray_image, (7, 7), 0)
+def base64_to_cv2_image(base64_str, policy="full"):
+    # Also accepts the binary input forms handled by imagedecode.decode_image
+    # (file paths, shared memory, binary frames).
+    return decode_image(base64_str, policy=policy)
+
+
+def find_edge_segments(edge_row, min_segment_width=1):
+    """
+    Finds the runs of edge pixels along one row of a Canny edge map.
+
+    Args:
+        edge_row (np.array): One row of the edge map (non-zero means edge).
+        min_segment_width (int): Runs narrower than this are dropped.
+
+    Returns:
+        tuple: Two int arrays holding the first and last x of each run, sorted
+               left to right.
+    """
+    is_edge = np.empty(edge_row.shape[0] + 2, dtype=np.int8)
+    is_edge[0] = is_edge[-1] = 0
+    np.greater(edge_row, 0, out=is_edge[1:-1])
+    transitions = np.diff(is_edge)
+    starts = np.flatnonzero(transitions == 1)
+    ends = np.flatnonzero(transitions == -1) - 1
+    if min_segment_width > 1:
+        keep = ends - starts + 1 >= min_segment_width
+        starts, ends = starts[keep], ends[keep]
+    return starts, ends
+
+
+def find_edge_segments_rows(edge_rows, min_segment_width=1):
+    """
+    Same as find_edge_segments for several rows of the edge map at once, using
+    one run-length pass over the whole (rows, width) block.
+
+    Returns:
+        list: (starts, ends) arrays for each row, in row order.
+    """
+    num_rows, width = edge_rows.shape
+    is_edge = np.zeros((num_rows, width + 2), dtype=np.int8)
+    np.greater(edge_rows, 0, out=is_edge[:, 1:-1])
+    transitions = np.diff(is_edge, axis=1)
+    start_rows, starts = np.nonzero(transitions == 1)
+    end_rows, ends = np.nonzero(transitions == -1)
+    ends = ends - 1
+    if min_segment_width > 1:
+        keep = ends - starts + 1 >= min_segment_width
+        start_rows, starts, ends = start_rows[keep], starts[keep], ends[keep]
+    # np.nonzero is row-major, so each row's runs form one sorted slice.
+    bounds = np.searchsorted(start_rows, np.arange(num_rows + 1))
+    return [(starts[bounds[row]:bounds[row + 1]], ends[bounds[row]:bounds[row + 1]]) for row in range(num_rows)]
+
+
+def pair_edge_segments(starts, ends, img_width, min_wire_body_width, min_wire_spacing, sample_offset, sample_width):
+    """
+    Pairs left and right wire edges along the scanline and picks the horizontal
+    range to sample each wire's color from.
+
+    For each left edge the matching right edge is the first segment starting
+    more than min_wire_body_width - 1 and less than 3 * min_wire_body_width
+    pixels after it. Segments are sorted, so that candidate is found for every
+    edge at once with a binary search; the remaining left-to-right pass only
+    enforces the spacing between consecutive wires and runs in linear time.
+
+    Args:
+        starts (np.array): First x of each edge segment, sorted.
+        ends (np.array): Last x of each edge segment.
+        img_width (int): Width of the image the segments come from.
+        min_wire_body_width (int): Minimum width of a wire between its edges.
+        min_wire_spacing (int): Minimum gap between a wire and the previous one.
+        sample_offset (int): Offset from the left edge for the fallback sample.
+        sample_width (int): Width of the color sample.
+
+    Returns:
+        list: (sample_start_x, sample_end_x) for each wire, left to right.
+    """
+    num_segments = len(starts)
+    if num_segments < 2:
+        return []
+
+    # Right-edge candidate for every left edge: first start >= end + min body width.
+    right_index = np.searchsorted(starts, ends + min_wire_body_width, side="left")
+    has_right = right_index < num_segments
+    right_index = np.minimum(right_index, num_segments - 1)
+    right_starts = starts[right_index]
+    right_ends = ends[right_index]
+    has_right &= right_starts - ends - 1 < min_wire_body_width * 3
+
+    centers = (starts + right_ends) // 2
+    sample_starts = np.maximum(ends + 1, centers - sample_width // 2)
+    sample_ends = np.minimum(right_starts - 1, centers + sample_width // 2)
+
+    # Wire too narrow for a centred sample: sample just right of the left edge.
+    fallback = sample_starts > sample_ends
+    sample_starts = np.where(fallback, ends + sample_offset, sample_starts)
+    sample_ends = np.where(fallback, np.minimum(sample_starts + sample_width, img_width - 1), sample_ends)
+
+    sample_starts = np.maximum(0, sample_starts)
+    sample_ends = np.minimum(img_width - 1, sample_ends)
+    can_sample = sample_starts < sample_ends
+
+    has_right = has_right.tolist()
+    can_sample = can_sample.tolist()
+    right_index = right_index.tolist()
+    right_ends = right_ends.tolist()
+    starts_list = starts.tolist()
+    sample_starts = sample_starts.tolist()
+    sample_ends = sample_ends.tolist()
+
+    sample_ranges = []
+    last_sampled_wire_end_x = -min_wire_spacing
+    i = 0
+    while i < num_segments:
+        if not has_right[i] or starts_list[i] <= last_sampled_wire_end_x + min_wire_spacing:
+            i += 1
+            continue
+        if can_sample[i]:
+            sample_ranges.append((sample_starts[i], sample_ends[i]))
+            last_sampled_wire_end_x = right_ends[i]
+        i = right_index[i] + 1
+
+    return sample_ranges
+
+
+def sample_wire_colors(img, sample_top_y, sample_bottom_y, sample_ranges):
+    """
+    Averages the color of each sample range over the rows sample_top_y to
+    sample_bottom_y (inclusive).
+
+    Returns:
+        list: One BGR tuple (uint8 values) per sample range.
+    """
+    if not sample_ranges:
+        return []
+    strip = img[sample_top_y : sample_bottom_y + 1]
+    # Column sums of the strip, then a prefix sum over x so every range is two lookups.
+    column_sums = strip.sum(axis=0, dtype=np.int64)
+    prefix = np.zeros((column_sums.shape[0] + 1, column_sums.shape[1]), dtype=np.int64)
+    np.cumsum(column_sums, axis=0, out=prefix[1:])
+
+    ranges = np.asarray(sample_ranges)
+    totals = prefix[ranges[:, 1] + 1] - prefix[ranges[:, 0]]
+    pixel_counts = (ranges[:, 1] - ranges[:, 0] + 1) * strip.shape[0]
+    average_colors = (totals / pixel_counts[:, None]).astype(np.uint8)
+    return [tuple(color) for color in average_colors.tolist()]
+
+
+def start_timer(timings):
+    """
+    Returns the current time if timings are being collected, otherwise None.
+    """
+    return time.perf_counter() if timings is not None else None
+
+def record_phase(timings, phase, start):
+    """
+    Adds the milliseconds elapsed since start to timings[phase] and returns the
+    current time, so consecutive phases can be chained. Does nothing when
+    timings is None.
+    """
+    if timings is None:
+        return None
+    now = time.perf_counter()
+    timings[phase] = timings.get(phase, 0.0) + (now - start) * 1000
+    return now
+
+def scale_kernel_size(size, scale, minimum=1, odd=True):
+    """
+    Scales a kernel size tuned for full resolution down to a pyramid level.
+
+    Args:
+        size (int): The kernel size at full resolution.
+        scale (int): The downscale factor of the pyramid level.
+        minimum (int): The smallest size to return.
+        odd (bool): Round to the nearest odd size (needed by GaussianBlur and
+                    adaptiveThreshold, and keeps morphology kernels centred
+                    so the mask does not shift on coarse levels).
+
+    Returns:
+        int: The scaled kernel size.
+    """
+    scaled = size / scale
+    if odd:
+        scaled = 2 * int(round((scaled - 1) / 2)) + 1
+    else:
+        scaled = int(round(scaled))
+    return max(minimum, scaled)
+
+def scale_params(params=None, factor=1.0):
+    """
+    Scales the pixel-sized detection parameters (PIXEL_PARAMS and
+    KERNEL_PARAMS) for captures whose connector appears factor times as large
+    as in the captures the parameters were tuned on.
+
+    Args:
+        params (dict, optional): Detection parameters (see detection_params).
+        factor (float): Size of the connector relative to the tuned captures.
+
+    Returns:
+        dict: The scaled detection parameters.
+    """
+    params = detection_params(params)
+    if factor == 1:
+        return params
+    scaled = dict(params)
+    for name, minimum in PIXEL_PARAMS.items():
+        scaled[name] = max(minimum, int(round(params[name] * factor)))
+    for name, minimum in KERNEL_PARAMS.items():
+        scaled[name] = scale_kernel_size(params[name], 1 / factor, minimum)
+    return scaled
+
+def segment_connector(gray_image, scale=1, timings=None, params=None):
+    """
+    Segments the connector on a grayscale image and returns its bounding box.
+
+    Args:
+        gray_image (np.array): The grayscale image, possibly downscaled by
+                               scale (a pyramid level).
+        scale (int): The downscale factor of gray_image. Kernel sizes are
+                     scaled to match.
+        timings (dict, optional): As for locate_connector_roi.
+        params (dict, optional): Detection parameters (see detection_params).
+
+    Returns:
+        tuple: The connector's (x, y, width, height) box in gray_image (see
+               scale_box to map it to full resolution), or None if no
+               connector was found.
+    """
+    params = detection_params(params)
+    start = start_timer(timings)
+
+    # Kernel sizes tuned for full resolution, scaled to the pyramid level
+    blur_size = scale_kernel_size(params["blur_size"], scale)
+    threshold_block_size = scale_kernel_size(params["threshold_block_size"], scale, minimum=3)
+    morph_size = scale_kernel_size(params["morph_size"], scale)
+
+    blurred_gray = cv2.GaussianBlur(gray_image, (blur_size, blur_size), 0)
+    start = record_phase(timings, "gray_blur", start)
+    note(timings, "segment_size", gray_image.shape[:2])
 
     # --- Phase 2: Segment Connector (Adapted from segment_connector) ---
     # Use the blurred_gray image
     binary_image = cv2.adaptiveThreshold(
         blurred_gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
-        cv2.THRESH_BINARY, 21, 5
+        cv2.THRESH_BINARY, threshold_block_size, params["threshold_offset"]
     )
+    start = record_phase(timings, "threshold", start)
 
-    kernel = np.ones((7, 7), np.uint8)
+    kernel = np.ones((morph_size, morph_size), np.uint8)
     closed_mask = cv2.morphologyEx(binary_image, cv2.MORPH_CLOSE, kernel, iterations=2)
     opened_mask = cv2.morphologyEx(closed_mask, cv2.MORPH_OPEN, kernel, iterations=1)
+    start = record_phase(timings, "morphology", start)
 
-    # Check the "whiteness" of the initial opened_mask
-    mean_opened_mask_val = np.mean(opened_mask)
+    # Check the "whiteness" of the initial opened_mask. The mask only holds 0
+    # and 255, so its mean follows from the non-zero pixel count.
+    mean_opened_mask_val = 255.0 * cv2.countNonZero(opened_mask) / opened_mask.size
     #print(f"Initial opened_mask mean value (0-255): {mean_opened_mask_val:.2f}") # Removed print
+    note(timings, "threshold_inverted", mean_opened_mask_val > 127)
 
     # If the mask is mostly white, invert
     if mean_opened_mask_val > 127:
         #print("Mask is predominantly white, inverting thresholding.") # Removed print
-        binary_image = cv2.adaptiveThreshold(
-            blurred_gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
-            cv2.THRESH_BINARY_INV, 21, 5
-        )
+        # THRESH_BINARY_INV is exactly the complement of THRESH_BINARY, so the
+        # threshold result is inverted instead of being computed again.
+        binary_image = cv2.bitwise_not(binary_image, dst=binary_image)
+        start = record_phase(timings, "threshold", start)
         closed_mask = cv2.morphologyEx(binary_image, cv2.MORPH_CLOSE, kernel, iterations=2)
         opened_mask = cv2.morphologyEx(closed_mask, cv2.MORPH_OPEN, kernel, iterations=1)
+        start = record_phase(timings, "morphology", start)
         #print(f"Inverted opened_mask mean value: {np.mean(opened_mask):.2f}") # Removed print
 
     # Final check: Ensure the largest contour is white against black
     contours, _ = cv2.findContours(opened_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
     if contours:
         largest_contour = max(contours, key=cv2.contourArea)
-        temp_mask_for_contour_check = np.zeros(opened_mask.shape, dtype=np.uint8)
-        cv2.drawContours(temp_mask_for_contour_check, [largest_contour], -1, 255, cv2.FILLED)
-        mean_val_in_contour = cv2.mean(opened_mask, mask=temp_mask_for_contour_check)[0]
+        # Measure the mask inside the filled contour on its bounding box only,
+        # rather than rasterising the contour into a full-frame mask.
+        bx, by, bw, bh = cv2.boundingRect(largest_contour)
+        contour_fill = np.zeros((bh, bw), dtype=np.uint8)
+        cv2.drawContours(contour_fill, [largest_contour], -1, 255, cv2.FILLED, offset=(-bx, -by))
+        mean_val_in_contour = cv2.mean(opened_mask[by : by + bh, bx : bx + bw], mask=contour_fill)[0]
         if mean_val_in_contour < 127:
             #print("Largest contour is dark, inverting final mask.") # Removed print
             connector_mask = cv2.bitwise_not(opened_mask)
+            contours_for_bbox, _ = cv2.findContours(connector_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
         else:
+            # Same mask, so the contours found above are reused as they are.
             connector_mask = opened_mask
+            contours_for_bbox = contours
     else:
         # No connector found
         print("No contours found for the connector after mask generation.", file=sys.stderr)
-        return 0, []
-
-    # --- Phase 3: Crop Connector and Wires (Adapted from crop_connector_and_wires) ---
-    contours_for_bbox, _ = cv2.findContours(connector_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        note(timings, "failure", "no_contours")
+        debug_image(timings, "mask", opened_mask)
+        return None
+    start = record_phase(timings, "contours", start)
+    note(timings, "contours", len(contours_for_bbox))
+    debug_image(timings, "mask", connector_mask)
     if not contours_for_bbox:
         print("No contours found after segmentation. Cropping aborted.", file=sys.stderr)
-        return 0, []
+        note(timings, "failure", "no_contours")
+        return None
+
+    largest_contour_for_bbox = largest_contour if contours_for_bbox is contours else max(contours_for_bbox, key=cv2.contourArea)
+    return cv2.boundingRect(largest_contour_for_bbox)
+
+def scale_box(box, from_shape, to_shape):
+    """
+    Maps a box found on a pyramid level back to full resolution. The top-left
+    corner is rounded down and the bottom-right corner up, so the mapped box
+    covers every full-resolution pixel of the coarse one (including the
+    remainder rows and columns dropped by the downscale), clipped to the image.
+
+    Args:
+        box (tuple): The (x, y, width, height) box in the coarse image.
+        from_shape (tuple): Shape of the coarse image.
+        to_shape (tuple): Shape of the full-resolution image.
+
+    Returns:
+        tuple: The (x, y, width, height) box in the full-resolution image.
+    """
+    x, y, w, h = box
+    from_height, from_width = from_shape[:2]
+    to_height, to_width = to_shape[:2]
+    if (from_height, from_width) == (to_height, to_width):
+        return x, y, w, h
+    scale_x = to_width / from_width
+    scale_y = to_height / from_height
+    x0 = max(0, math.floor(x * scale_x))
+    y0 = max(0, math.floor(y * scale_y))
+    x1 = min(to_width, math.ceil((x + w) * scale_x))
+    y1 = min(to_height, math.ceil((y + h) * scale_y))
+    return x0, y0, x1 - x0, y1 - y0
 
-    largest_contour_for_bbox = max(contours_for_bbox, key=cv2.contourArea)
-    x, y, w, h = cv2.boundingRect(largest_contour_for_bbox)
+def expand_connector_box(box, image_shape, params=None):
+    """
+    Expands the connector's bounding box to the region where the wires are
+    visible, clipped to the image.
+
+    Args:
+        box (tuple): The connector's (x, y, width, height).
+        image_shape (tuple): Shape of the full-resolution image.
+        params (dict, optional): Detection parameters (see detection_params).
 
-    # Expansion factors (Matching values from executed code)
-    expand_factor_y_up = 2.5
-    expand_factor_y_down = 0.5
-    expand_factor_x = 0.3
+    Returns:
+        tuple: The region's (x, y, width, height).
+    """
+    params = detection_params(params)
+    x, y, w, h = box
+    image_height, image_width = image_shape[:2]
 
-    new_y = max(0, int(y - h * expand_factor_y_up))
-    new_height = min(original_image.shape[0], int(y + h + h * expand_factor_y_down)) - new_y
-    new_x = max(0, int(x - w * expand_factor_x))
-    new_width = min(original_image.shape[1], int(x + w + w * expand_factor_x)) - new_x
+    new_y = max(0, int(y - h * params["expand_factor_y_up"]))
+    new_height = min(image_height, int(y + h + h * params["expand_factor_y_down"])) - new_y
+    new_x = max(0, int(x - w * params["expand_factor_x"]))
+    new_width = min(image_width, int(x + w + w * params["expand_factor_x"])) - new_x
 
     new_x = max(0, new_x)
     new_y = max(0, new_y)
-    new_width = min(new_width, original_image.shape[1] - new_x)
-    new_height = min(new_height, original_image.shape[0] - new_y)
+    new_width = min(new_width, image_width - new_x)
+    new_height = min(new_height, image_height - new_y)
 
     if new_width <= 0 or new_height <= 0:
         print(f"Calculated crop dimensions are invalid: w={new_width}, h={new_height}. Using full image.", file=sys.stderr)
-        cropped_image_roi = original_image
-        cropped_y = 0 # Offset is 0 if full image is used
+        return (0, 0, image_width, image_height)
+    return (new_x, new_y, new_width, new_height)
+
+def locate_connector_roi(image, pyramid_level=0, timings=None, params=None):
+    """
+    Finds the connector in the input image and crops the region around it where
+    the wires are visible.
+
+    With pyramid_level > 0 the connector is segmented on a copy downscaled by
+    2 ** pyramid_level, with the blur, threshold and morphology kernels scaled
+    to match. Only the bounding box is mapped back, so the crop (and everything
+    that samples colors from it) stays at full resolution.
+
+    An EncodedImage (decode policy "reduced") is segmented on a grayscale
+    decode made directly at the pyramid level's resolution, and its color
+    image is only decoded once a connector has been found.
+
+    Args:
+        image (np.array | EncodedImage): Input image in BGR format.
+        pyramid_level (int): How many times to halve the image before segmenting.
+        timings (dict, optional): If given, the milliseconds spent in the
+                                  "gray_blur", "threshold", "morphology",
+                                  "contours" and "crop" phases (plus "decode"
+                                  for an EncodedImage) are added to it. A
+                                  diagnostics.Trace also receives intermediate
+                                  sizes and counts, a "failure" reason, and
+                                  the "mask" and "roi" debug images.
+        params (dict, optional): Detection parameters (see detection_params).
+
+    Returns:
+        tuple: The cropped BGR region and its (x, y, width, height) box in the
+               full-resolution image, or (None, None) if no connector was found.
+    """
+    # Ensure image is valid
+    if image is None or image.size == 0:
+        print("Error: Input image is None or empty.", file=sys.stderr)
+        return None, None
+
+    # --- Phase 1: Preprocessing (Adapted from load_and_preprocess_image) ---
+    start = start_timer(timings)
+    scale = 2 ** pyramid_level
+    if isinstance(image, EncodedImage):
+        # Decode straight to grayscale at the pyramid level's resolution; the
+        # color image is decoded in phase 3, and only if a connector is found.
+        original_image = None
+        gray_image = image.gray(scale)
+        if gray_image is None:
+            print("Error: Input image could not be decoded.", file=sys.stderr)
+            note(timings, "failure", "decode")
+            return None, None
     else:
-        cropped_image_roi = original_image[new_y : new_y + new_height, new_x : new_x + new_width]
-        cropped_y = new_y # Keep track of the Y offset from the original image
+        # The input 'image' is already the original color image. It is only
+        # read (the crop below is a view into it), so no copy is needed.
+        original_image = image
+        if scale > 1:
+            coarse_image = cv2.resize(
+                original_image,
+                (max(1, original_image.shape[1] // scale), max(1, original_image.shape[0] // scale)),
+                interpolation=cv2.INTER_AREA
+            )
+        else:
+            coarse_image = original_image
+        gray_image = cv2.cvtColor(coarse_image, cv2.COLOR_BGR2GRAY)
+    record_phase(timings, "gray_blur", start)
+
+    box = segment_connector(gray_image, scale, timings, params)
+    if box is None:
+        return None, None
+
+    # --- Phase 3: Crop Connector and Wires (Adapted from crop_connector_and_wires) ---
+    start = start_timer(timings)
+    if original_image is None:
+        original_image = image.color()
+        start = record_phase(timings, "decode", start)
+        if original_image is None:
+            print("Error: Input image could not be decoded.", file=sys.stderr)
+            note(timings, "failure", "decode")
+            return None, None
+
+    box = scale_box(box, gray_image.shape, original_image.shape)
+    roi_box = expand_connector_box(box, original_image.shape, params)
+    new_x, new_y, new_width, new_height = roi_box
+    cropped_image_roi = original_image[new_y : new_y + new_height, new_x : new_x + new_width]
 
     if cropped_image_roi is None or cropped_image_roi.size == 0:
         print("Failed to crop image ROI.", file=sys.stderr)
-        return 0, []
+        note(timings, "failure", "empty_roi")
+        return None, None
+    record_phase(timings, "crop", start)
+    note(timings, "connector_box", box)
+    note(timings, "roi_box", roi_box)
+    debug_image(timings, "roi", cropped_image_roi)
 
-    # --- Phase 4: Detect Wires and Sample Colors (Adapted from detect_wires_by_edge_on_line) ---
-    img = cropped_image_roi
-    img_height, img_width = img.shape[:2]
+    return cropped_image_roi, roi_box
+
+def crop_connector_roi(image, pyramid_level=0, timings=None, params=None):
+    """
+    Same as locate_connector_roi, but returns only the cropped region (or None).
+    """
+    return locate_connector_roi(image, pyramid_level, timings, params)[0]
+
+
+def detect_wires(img, num_scanlines=1, scanline_spacing=SCANLINE_SPACING, timings=None, params=None, fingerprint=None):
+    """
+    Detects the wires crossing the sampling line of a cropped connector region
+    and samples their colors.
 
-    # Parameters from the executed detect_wires_by_edge_on_line call
-    sampling_line_y = 200 # From executed code
-    canny_thresh_low = 30  # From executed code
-    canny_thresh_high = 90 # From executed code
-    min_segment_width = 1 # From executed code
-    sample_offset = 3 # From executed code
-    sample_width = 7 # From executed code
-    sample_strip_height = 7 # From executed code
-    min_wire_body_width = 8 # From executed code
-    min_wire_spacing = 2 # From executed code
+    With num_scanlines > 1 the edge/segment pipeline runs on that many rows
+    around the sampling line, spaced scanline_spacing pixels apart. All rows are
+    taken from one Canny edge map in a single vectorized run-length pass, the
+    wire count is decided by majority vote across rows and each wire's color is
+    the per-channel median over the agreeing rows. A glare streak or loose
+    strand crossing one row is then outvoted instead of changing the count.
+
+    Args:
+        img (np.array): The cropped connector region in BGR format.
+        num_scanlines (int): Number of rows to sample.
+        scanline_spacing (int): Vertical distance between sampled rows.
+        timings (dict, optional): If given, the milliseconds spent in the
+                                  "canny", "pairing" and "sampling" phases are
+                                  added to it. A diagnostics.Trace also
+                                  receives the edge segment and wire counts
+                                  of each scanline and the "edges" image.
+        params (dict, optional): Detection parameters (see detection_params).
+        fingerprint (dict, optional): If given, the "line_y" and "windows" of
+                                      the region's fingerprint (see
+                                      sequence_fingerprint) are added to it,
+                                      taken from the same edge map.
+
+    Returns:
+        tuple: The number of wires (int), their BGR colors (list of tuples) and
+               a confidence score in [0, 1]: the fraction of sampled rows that
+               agree with the chosen wire count.
+    """
+    params = detection_params(params)
+    start = start_timer(timings)
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    edges = cv2.Canny(gray, params["canny_thresh_low"], params["canny_thresh_high"])
+    record_phase(timings, "canny", start)
+    debug_image(timings, "edges", edges)
+    if fingerprint is not None:
+        line_y = max(0, min(params["sampling_line_y"], img.shape[0] - 1))
+        fingerprint["line_y"] = line_y
+        fingerprint["windows"] = [list(window) for window in edge_row_windows(edges[line_y], params)]
+    return wires_from_edges(img, edges, num_scanlines, scanline_spacing, timings, params)
+
+def wires_from_edges(img, edges, num_scanlines=1, scanline_spacing=SCANLINE_SPACING, timings=None, params=None):
+    """
+    The part of detect_wires after edge detection: pairs the edges along the
+    sampled rows of the edge map and samples the wires' colors from img.
+
+    Returns:
+        tuple: As for detect_wires.
+    """
+    params = detection_params(params)
+    img_height, img_width = img.shape[:2]
 
     # Ensure sampling line is within cropped image bounds
-    sampling_line_y = max(0, min(sampling_line_y, img_height - 1))
+    sampling_line_y = max(0, min(params["sampling_line_y"], img_height - 1))
     #print(f"Using sampling line at Y-coordinate: {sampling_line_y} (relative to cropped image top).") # Removed print
 
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    edges = cv2.Canny(gray, canny_thresh_low, canny_thresh_high)
-
-    is_on_edge_segment = False
-    segment_start_x = -1
-    detected_edge_segments_x = []
-
-    for x in range(img_width):
-        edge_pixel_value = edges[sampling_line_y, x]
-        if edge_pixel_value > 0:
-            if not is_on_edge_segment:
-                is_on_edge_segment = True
-                segment_start_x = x
-        else:
-            if is_on_edge_segment:
-                segment_end_x = x - 1
-                segment_width = segment_end_x - segment_start_x + 1
-                if segment_width >= min_segment_width:
-                    detected_edge_segments_x.append((segment_start_x, segment_end_x))
-                is_on_edge_segment = False
-                segment_start_x = -1
-
-    if is_on_edge_segment:
-        segment_end_x = img_width - 1
-        segment_width = segment_end_x - segment_start_x + 1
-        if segment_width >= min_segment_width:
-            detected_edge_segments_x.append((segment_start_x, segment_end_x))
-
-    detected_edge_segments_x.sort(key=lambda item: item[0])
-
-    wire_count = 0
-    detected_wires_info = [] # Store wire details (color, approximate position)
-    last_sampled_wire_end_x = -min_wire_spacing
+    # Rows centred on the sampling line, clipped to the image and deduplicated;
+    # the single-line case is just the sampling line itself.
+    offsets = (np.arange(num_scanlines) - (num_scanlines - 1) / 2) * scanline_spacing
+    line_ys = np.unique(np.clip(np.round(sampling_line_y + offsets).astype(int), 0, img_height - 1))
 
-    i = 0
-    while i < len(detected_edge_segments_x):
-        left_edge_start, left_edge_end = detected_edge_segments_x[i]
-        potential_right_edge_index = -1
-        for j in range(i + 1, len(detected_edge_segments_x)):
-            right_edge_start, right_edge_end = detected_edge_segments_x[j]
-            distance_between_edges = right_edge_start - left_edge_end - 1
-            potential_wire_body_width = right_edge_start - left_edge_end + 1
-
-            if (right_edge_start > left_edge_end and
-                distance_between_edges >= 0 and distance_between_edges < min_wire_body_width * 3 and
-                potential_wire_body_width > min_wire_body_width and
-                left_edge_start > last_sampled_wire_end_x + min_wire_spacing):
-                potential_right_edge_index = j
-                break
-
-        if potential_right_edge_index != -1:
-            right_edge_start, right_edge_end = detected_edge_segments_x[potential_right_edge_index]
-            wire_body_center_x = (left_edge_start + right_edge_end) // 2
-            sample_start_x = max(left_edge_end + 1, wire_body_center_x - sample_width // 2)
-            sample_end_x = min(right_edge_start - 1, wire_body_center_x + sample_width // 2)
-
-            if sample_start_x > sample_end_x:
-                 sample_start_x = left_edge_end + sample_offset
-                 sample_end_x = sample_start_x + sample_width
-                 sample_end_x = min(sample_end_x, img_width - 1)
-                 if sample_start_x > sample_end_x:
-                     i = potential_right_edge_index + 1
-                     continue
-
-            sample_start_x = max(0, sample_start_x)
-            sample_end_x = min(img_width - 1, sample_end_x)
-            sample_top_y = max(0, sampling_line_y - sample_strip_height)
-            sample_bottom_y = min(img_height - 1, sampling_line_y + sample_strip_height)
-
-            if sample_top_y >= sample_bottom_y or sample_start_x >= sample_end_x:
-                #print(f"Warning: Invalid sample region calculated for potential wire at edges {left_edge_start}-{left_edge_end} and {right_edge_start}-{right_edge_end}. Skipping color sampling.") # Removed print
-                i = potential_right_edge_index + 1
-                continue
-
-            color_sample_region = img[sample_top_y : sample_bottom_y + 1, sample_start_x : sample_end_x + 1]
-
-            if color_sample_region.size > 0:
-                average_color_bgr = np.mean(color_sample_region, axis=(0, 1)).astype(np.uint8).tolist()
-                detected_wires_info.append(tuple(average_color_bgr)) # Store BGR tuple directly
-                wire_count += 1
-
-                last_sampled_wire_end_x = right_edge_end
-                i = potential_right_edge_index + 1
-            else:
-                 #print(f"Warning: Sample region size is zero for potential wire at edges {left_edge_start}-{left_edge_end} and {right_edge_start}-{right_edge_end}. Skipping color sampling.", file=sys.stderr) # Removed print
-                 i = potential_right_edge_index + 1
+    start = start_timer(timings)
+    line_results = []
+    line_segments = find_edge_segments_rows(edges[line_ys], params["min_segment_width"])
+    if timings is not None:
+        note(timings, "scanlines", line_ys.tolist())
+        note(timings, "edge_segments", [len(starts) for starts, _ in line_segments])
+    strip_height = params["sample_strip_height"]
+    for line_y, (segment_starts, segment_ends) in zip(line_ys.tolist(), line_segments):
+        sample_top_y = max(0, line_y - strip_height)
+        sample_bottom_y = min(img_height - 1, line_y + strip_height)
+        if sample_top_y >= sample_bottom_y:
+            # Degenerate strip (ROI one pixel tall): nothing can be sampled.
+            line_results.append([])
+            continue
 
-        else:
-            i += 1
-        
+        sample_ranges = pair_edge_segments(
+            segment_starts, segment_ends, img_width,
+            params["min_wire_body_width"], params["min_wire_spacing"], params["sample_offset"], params["sample_width"]
+        )
+        start = record_phase(timings, "pairing", start)
+        line_results.append(sample_wire_colors(img, sample_top_y, sample_bottom_y, sample_ranges))
+        start = record_phase(timings, "sampling", start)
+
+    if timings is not None:
+        note(timings, "wires_per_line", [len(colors) for colors in line_results])
+
+    if len(line_results) == 1:
+        detected_wires_info = line_results[0]
+        return len(detected_wires_info), detected_wires_info, 1.0
+
+    return vote_wire_sequences(line_results)
+
+def vote_wire_sequences(line_results):
+    """
+    Combines the wires detected on several scanlines.
+
+    The wire count seen on most rows wins; ties go to the larger count, since a
+    missed wire (edge lost in glare) is more common than a phantom one. Colors
+    are the per-wire, per-channel median over the rows that saw that count.
+
+    Args:
+        line_results (list): One list of BGR tuples per scanline.
+
+    Returns:
+        tuple: (number of wires, list of BGR tuples, confidence in [0, 1]).
+    """
+    counts = np.array([len(colors) for colors in line_results])
+    values, votes = np.unique(counts, return_counts=True)
+    best = np.flatnonzero(votes == votes.max())[-1]
+    wire_count = int(values[best])
+    confidence = float(votes[best]) / len(line_results)
+
+    if wire_count == 0:
+        return 0, [], confidence
+
+    agreeing = np.array([colors for colors in line_results if len(colors) == wire_count], dtype=np.uint8)
+    median_colors = np.median(agreeing, axis=0).astype(np.uint8)
+    return wire_count, [tuple(color) for color in median_colors.tolist()], confidence
 
+def get_single_sequence(image, num_scanlines=1, pyramid_level=0, timings=None, track_roi=None, params=None):
+    """
+    Detects the number of wires and their color sequence from left to right in the input image.
+
+    Args:
+        image (np.array | EncodedImage): Input image in BGR format, or an
+                                         encoded one decoded on demand.
+        num_scanlines (int): Number of rows to sample and vote over (see
+                             detect_wires). 1 samples only the sampling line.
+        pyramid_level (int): Segment the connector on an image downscaled by
+                             2 ** pyramid_level (see crop_connector_roi).
+        timings (dict, optional): Filled with per-phase milliseconds (see
+                                  crop_connector_roi and detect_wires).
+        track_roi (str, optional): Name of the RoiTracker (one per camera)
+                                   whose remembered connector region is tried
+                                   before segmenting (see tracked_connector_roi).
+        params (dict, optional): Detection parameters, e.g. a connector
+                                 type's profile (see detection_params).
+
+    Returns:
+        tuple: A tuple containing the number of detected wires (int) and a list
+               of their BGR color values (list of tuples).
+               Returns (0, []) if no wires are detected or processing fails.
+    """
+    wire_count, detected_wires_info, _ = get_single_sequence_with_confidence(image, num_scanlines, pyramid_level, timings, track_roi, params)
     return wire_count, detected_wires_info
 
-def get_double_sequence(front_image, back_image):
+def get_single_sequence_with_confidence(image, num_scanlines=1, pyramid_level=0, timings=None, track_roi=None, params=None, fingerprint=None):
+    """
+    Same as get_single_sequence, but also returns the confidence score of the
+    scanline vote (see detect_wires).
+
+    Args:
+        fingerprint (dict, optional): If given, filled with the capture's
+                                      fingerprint (see sequence_fingerprint),
+                                      built from the region and edge map the
+                                      detection itself used. It stays empty
+                                      if no connector was found.
+
+    Returns:
+        tuple: (number of wires, list of BGR tuples, confidence in [0, 1]).
+               Returns (0, [], 0.0) if processing fails.
+    """
+    # Ensure image is valid
+    if image is None or image.size == 0:
+        print("Error: Input image is None or empty.", file=sys.stderr)
+        return 0, [], 0.0
+
+    if track_roi is None:
+        cropped_image_roi, roi_box = locate_connector_roi(image, pyramid_level, timings, params)
+    else:
+        cropped_image_roi, roi_box = locate_tracked_connector_roi(image, get_tracker(track_roi), pyramid_level, timings, params)
+    if cropped_image_roi is None:
+        return 0, [], 0.0
+
+    if fingerprint is not None:
+        # The color image is already decoded (and cached) by the crop.
+        pixels = image.color() if isinstance(image, EncodedImage) else image
+        fingerprint["frame"] = list(pixels.shape[:2])
+        fingerprint["roi"] = [int(value) for value in roi_box]
+    return detect_wires(cropped_image_roi, num_scanlines, timings=timings, params=params, fingerprint=fingerprint)
+
+def locate_tracked_connector_roi(image, tracker, pyramid_level=0, timings=None, params=None):
+    """
+    Same as locate_connector_roi, but first checks whether the connector is
+    still where tracker last saw it (see roitracker.RoiTracker). Only on a
+    miss is the image segmented, and the region found is remembered for next
+    time.
+
+    An EncodedImage is decoded in color up front, since the check needs it.
+
+    Args:
+        image (np.array | EncodedImage): Input image in BGR format.
+        tracker (RoiTracker): The tracker of the camera the image comes from.
+        pyramid_level (int): Passed on to locate_connector_roi on a miss.
+        timings (dict, optional): As for crop_connector_roi, plus the "track"
+                                  phase.
+        params (dict, optional): Passed on to locate_connector_roi on a miss.
+
+    Returns:
+        tuple: The cropped BGR region and its (x, y, width, height) box, or
+               (None, None) if no connector was found.
+    """
+    start = start_timer(timings)
+    pixels = image.color() if isinstance(image, EncodedImage) else image
+    if pixels is None:
+        return None, None
+    box = tracker.track(pixels)
+    record_phase(timings, "track", start)
+    if box is not None:
+        x, y, width, height = box
+        return pixels[y : y + height, x : x + width], box
+
+    cropped_image_roi, box = locate_connector_roi(image, pyramid_level, timings, params)
+    tracker.update(pixels, box)
+    return cropped_image_roi, box
+
+def tracked_connector_roi(image, tracker, pyramid_level=0, timings=None, params=None):
+    """
+    Same as locate_tracked_connector_roi, but returns only the cropped region
+    (or None).
+    """
+    return locate_tracked_connector_roi(image, tracker, pyramid_level, timings, params)[0]
+
+def find_wire_windows(img, line_y, params=None):
+    """
+    Returns the sample window of every wire crossing row line_y of img, found
+    with the same edge detection and pairing as detect_wires.
+
+    Returns:
+        list: (sample_start_x, sample_end_x) for each wire, left to right.
+    """
+    params = detection_params(params)
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    edges = cv2.Canny(gray, params["canny_thresh_low"], params["canny_thresh_high"])
+    return edge_row_windows(edges[line_y], params)
+
+def edge_row_windows(edge_row, params=None):
+    """
+    Returns the sample window of every wire crossing one row of an edge map,
+    paired as detect_wires pairs them.
+
+    Returns:
+        list: (sample_start_x, sample_end_x) for each wire, left to right.
+    """
+    params = detection_params(params)
+    segment_starts, segment_ends = find_edge_segments(edge_row, params["min_segment_width"])
+    return pair_edge_segments(
+        segment_starts, segment_ends, len(edge_row),
+        params["min_wire_body_width"], params["min_wire_spacing"], params["sample_offset"], params["sample_width"]
+    )
+
+def sequence_fingerprint(image, pyramid_level=0, params=None):
+    """
+    Records where the wires of a reference capture are, so later captures of
+    the same connector can be checked without segmenting them (see
+    quick_sequence).
+
+    Detection already finds everything a fingerprint holds, so requests that
+    detect and fingerprint the same image pass a dict to
+    get_single_sequence_with_confidence instead of calling this.
+
+    Args:
+        image (np.array | EncodedImage): The reference image in BGR format.
+        pyramid_level (int): Passed on to locate_connector_roi.
+        params (dict, optional): Detection parameters (see detection_params).
+
+    Returns:
+        dict: "frame" (image height and width), "roi" (x, y, width, height of
+              the cropped region), "line_y" (the sampling line within the
+              region) and "windows" (each wire's sample range along it), or
+              None if no connector was found.
+    """
+    fingerprint = {}
+    get_single_sequence_with_confidence(image, pyramid_level=pyramid_level, params=params, fingerprint=fingerprint)
+    return fingerprint or None
+
+def quick_sequence(image, fingerprint, tolerance=FINGERPRINT_TOLERANCE, timings=None, params=None):
+    """
+    Fast path for captures expected to match a fingerprinted reference.
+
+    Skips connector segmentation: the fingerprint's region is cropped as it is,
+    only a narrow band around its sampling line is edge-detected, and the wires
+    found there must line up with the fingerprinted windows. Colors are then
+    sampled exactly as detect_wires samples them.
+
+    Args:
+        image (np.array | EncodedImage): The capture in BGR format.
+        fingerprint (dict): As returned by sequence_fingerprint.
+        tolerance (int): Largest shift, in pixels, of any window edge.
+        timings (dict, optional): If given, the milliseconds spent are added to
+                                  it as the "quick" phase.
+        params (dict, optional): Detection parameters; must be the ones the
+                                 fingerprint was taken with.
+
+    Returns:
+        tuple: (number of wires, list of BGR tuples), or None when the capture
+               does not line up with the fingerprint (or the fingerprint is
+               malformed) and needs full detection.
+    """
+    params = detection_params(params)
+    start = start_timer(timings)
+    try:
+        if isinstance(image, EncodedImage):
+            image = image.color()
+        try:
+            expected_windows = np.asarray(fingerprint["windows"], dtype=int).reshape(-1, 2)
+            frame = [int(value) for value in fingerprint["frame"]]
+            x, y, width, height = (int(value) for value in fingerprint["roi"])
+            line_y = int(fingerprint["line_y"])
+        except (KeyError, TypeError, ValueError):
+            return None
+        if image is None or image.size == 0 or len(expected_windows) == 0:
+            return None
+        if list(image.shape[:2]) != frame:
+            return None
+        if x < 0 or y < 0 or width <= 0 or height <= 0 or x + width > frame[1] or y + height > frame[0]:
+            return None
+        if not 0 <= line_y < height:
+            return None
+
+        cropped_image_roi = image[y : y + height, x : x + width]
+        band_top = max(0, line_y - FINGERPRINT_BAND)
+        band_bottom = min(height, line_y + FINGERPRINT_BAND + 1)
+        windows = find_wire_windows(cropped_image_roi[band_top:band_bottom], line_y - band_top, params)
+        if len(windows) != len(expected_windows):
+            return None
+        if np.abs(np.asarray(windows) - expected_windows).max() > tolerance:
+            return None
+
+        sample_top_y = max(0, line_y - params["sample_strip_height"])
+        sample_bottom_y = min(height - 1, line_y + params["sample_strip_height"])
+        colors = sample_wire_colors(cropped_image_roi, sample_top_y, sample_bottom_y, windows)
+        return len(colors), colors
+    finally:
+        record_phase(timings, "quick", start)
+
+def request_params(data):
+    """
+    Returns the detection parameters asked for by a request: those of its
+    "profile" (a connector type, see profiles.load_profile) with its "params"
+    overrides on top, or None for the defaults.
+    """
+    overrides = {}
+    if data.get("profile"):
+        overrides.update(load_profile(data["profile"]))
+    if data.get("params"):
+        overrides.update(data["params"])
+    return detection_params(overrides) if overrides else None
+
+def detection_options(data):
+    """
+    Extracts the optional detection settings from a request.
+
+    Args:
+        data (dict): A request that may carry "scanlines", "pyramid_level",
+                     "track_roi" (a tracker name, e.g. the station's),
+                     "profile" and "params" (see request_params).
+
+    Returns:
+        dict: Keyword arguments for get_single_sequence and friends.
+    """
+    return {
+        "num_scanlines": data.get("scanlines", 1),
+        "pyramid_level": data.get("pyramid_level", 0),
+        "track_roi": data.get("track_roi"),
+        "params": request_params(data),
+    }
+
+def face_tracker(track_roi, face):
+    """
+    Returns the tracker name for one face of a double wire, since the front
+    and back cameras see the connector in different places.
+    """
+    return None if track_roi is None else f"{track_roi}/{face}"
+
+def face_timings(trace, face):
+    """
+    Returns the child trace of one face, or None without a trace.
+    """
+    return None if trace is None else trace.face(face)
+
+def get_double_sequence(front_image, back_image, track_roi=None, trace=None, **detect_options):
     """
     Detects the wire sequence (number of wires and BGR colors) for both the front and back sides of a connector.
 
     Args:
         front_image (np.array): The image (BGR format) of the front side.
         back_image (np.array): The image (BGR format) of the back side.
+        track_roi (str, optional): Tracker name; each side gets its own
+                                   tracker (see face_tracker).
+        trace (diagnostics.Trace, optional): Collects the phases of each side
+                                             in its "front" and "back" face.
+        **detect_options: Passed on to get_single_sequence for both images.
 
     Returns:
         tuple: A tuple containing two elements. The first element is the result
@@ -243,8 +969,11 @@ def get_double_sequence(front_image, back_image):
                (number of wires, list of BGR tuples). Returns ((0, []), (0, []))
                if processing fails for either image.
     """
-    front_result = get_single_sequence(front_image)
-    back_result = get_single_sequence(back_image)
+    # Front and back are independent, so they are processed concurrently.
+    front_result, back_result = run_all([
+        (functools.partial(get_single_sequence, timings=face_timings(trace, "front"), track_roi=face_tracker(track_roi, "front"), **detect_options), (front_image,)),
+        (functools.partial(get_single_sequence, timings=face_timings(trace, "back"), track_roi=face_tracker(track_roi, "back"), **detect_options), (back_image,)),
+    ])
 
     # Ensure results are in the expected format even if get_single_sequence failed
     if not isinstance(front_result, tuple) or len(front_result) != 2:
@@ -254,25 +983,82 @@ def get_double_sequence(front_image, back_image):
 
     return front_result, back_result
 
+def handle_request(data):
+    """
+    Runs sequence detection for a single decoded request.
+
+    Args:
+        data (dict): Request with "input" (list of base64 images), "wireType"
+                     and optionally the detection settings read by
+                     detection_options. With more than one scanline the
+                     response also carries the vote confidence of each image,
+                     and with "timings": true the per-phase milliseconds.
+                     "decode" selects the decode policy ("full" or "reduced",
+                     see imagedecode.DECODE_POLICIES). With "fingerprint": true
+                     the response carries one fingerprint per image (see
+                     sequence_fingerprint), to be stored with the reference.
+                     With "trace" the response carries a diagnostics trace
+                     (see diagnostics.request_trace), or the trace is
+                     appended to "trace_file".
+
+    Returns:
+        dict: The JSON-serialisable response for the request.
+    """
+    images = data["input"]
+    wire_type = data["wireType"]
+    detect_options = detection_options(data)
+    num_scanlines = detect_options["num_scanlines"]
+    collect_timings = data.get("timings", False)
+    decode_policy = data.get("decode", "full")
+    # Fingerprints are filled in by the detection itself (see
+    # get_single_sequence_with_confidence); None when not asked for.
+    fingerprints = [{}, {}] if data.get("fingerprint", False) else [None, None]
+    trace = request_trace(data)
+
+    if wire_type == "singlewire":
+        timings = face_timings(trace, "front") if trace is not None else ({} if collect_timings else None)
+        start = start_timer(trace)
+        image_cv2 = base64_to_cv2_image(images[0], decode_policy)
+        record_phase(trace, "input_decode", start)
+        result = get_single_sequence_with_confidence(image_cv2, timings=timings, fingerprint=fingerprints[0], **detect_options)
+        response = {"type": "singlewire", "sequence": result[1]}
+        if num_scanlines > 1:
+            response["confidence"] = result[2]
+        if collect_timings:
+            response["timings"] = dict(timings)
+        if fingerprints[0] is not None:
+            response["fingerprint"] = [fingerprints[0] or None]
+        return finish_trace(response, trace, data)
+    elif wire_type == "doublewire":
+        front_timings = face_timings(trace, "front") if trace is not None else ({} if collect_timings else None)
+        back_timings = face_timings(trace, "back") if trace is not None else ({} if collect_timings else None)
+        start = start_timer(trace)
+        front_cv2 = base64_to_cv2_image(images[0], decode_policy)
+        back_cv2 = base64_to_cv2_image(images[1], decode_policy)
+        record_phase(trace, "input_decode", start)
+        track_roi = detect_options.pop("track_roi")
+        front_result, back_result = run_all([
+            (functools.partial(get_single_sequence_with_confidence, timings=front_timings, track_roi=face_tracker(track_roi, "front"), fingerprint=fingerprints[0], **detect_options), (front_cv2,)),
+            (functools.partial(get_single_sequence_with_confidence, timings=back_timings, track_roi=face_tracker(track_roi, "back"), fingerprint=fingerprints[1], **detect_options), (back_cv2,)),
+        ])
+        response = {"type": "doublewire", "sequence_front": front_result[1], "sequence_back": back_result[1]}
+        if num_scanlines > 1:
+            response["confidence_front"] = front_result[2]
+            response["confidence_back"] = back_result[2]
+        if collect_timings:
+            response["timings_front"] = dict(front_timings)
+            response["timings_back"] = dict(back_timings)
+        if fingerprints[0] is not None:
+            response["fingerprint"] = [fingerprint or None for fingerprint in fingerprints]
+        return finish_trace(response, trace, data)
+    else:
+        raise ValueError("Invalid wire type")
+
 def main():
     try:
         raw_input = sys.stdin.read()
         data = json.loads(raw_input)
-
-        images = data["input"]
-        wire_type = data["wireType"]
-
-        if wire_type == "singlewire":
-            image_cv2 = base64_to_cv2_image(images[0])
-            result = get_single_sequence(image_cv2)
-            print(json.dumps({"type": "singlewire", "sequence": result[1]}))
-        elif wire_type == "doublewire":
-            front_cv2 = base64_to_cv2_image(images[0])
-            back_cv2 = base64_to_cv2_image(images[1])
-            front_result, back_result = get_double_sequence(front_cv2, back_cv2)
-            print(json.dumps({"type": "doublewire", "sequence_front": front_result[1], "sequence_back": back_result[1]}))
-        else:
-            raise ValueError("Invalid wire type")
+        print(json.dumps(handle_request(data)))
     except Exception as e:
         print(str(e), file=sys.stderr)
         sys.exit(1)
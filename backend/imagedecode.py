@@ -0,0 +1,241 @@
+import os
+import base64
+import numpy as np
+import cv2
+from multiprocessing import shared_memory, resource_tracker
+
+# Decode policies: "full" decodes the whole color image up front (the default);
+# "reduced" returns an EncodedImage, so connector segmentation reads a reduced
+# grayscale decode and the full color image is decoded only once a connector
+# has been found.
+DECODE_POLICIES = ("full", "reduced")
+
+# imdecode flags for each supported grayscale reduction factor.
+GRAYSCALE_FLAGS = {
+    1: cv2.IMREAD_GRAYSCALE,
+    2: cv2.IMREAD_REDUCED_GRAYSCALE_2,
+    4: cv2.IMREAD_REDUCED_GRAYSCALE_4,
+    8: cv2.IMREAD_REDUCED_GRAYSCALE_8,
+}
+
+class EncodedImage:
+    """
+    An encoded capture that is decoded lazily, at the resolution each stage of
+    the detector asks for.
+
+    JPEG decoders scale down during decoding, so a reduced grayscale decode for
+    segmentation costs a fraction of a full color decode and needs 1/(3*N*N)
+    of its memory. OpenCV cannot decode just a sub-rectangle, so the color
+    image is still decoded in full, but only when colors are actually sampled.
+    """
+
+    def __init__(self, buffer):
+        self.data = np.frombuffer(buffer, np.uint8)
+        self.undecodable = False
+        self._color = None
+        self._gray = {}
+
+    @property
+    def size(self):
+        return self.data.size
+
+    def color(self):
+        """
+        Returns the full-resolution BGR image, decoding it on first use.
+        """
+        if self._color is None:
+            self._color = cv2.imdecode(self.data, cv2.IMREAD_COLOR)
+            self.undecodable = self._color is None
+        return self._color
+
+    def gray(self, scale=1):
+        """
+        Returns the grayscale image downscaled by scale (a power of two),
+        decoded directly at that resolution where the decoder supports it.
+        """
+        if scale not in self._gray:
+            if self._color is not None or scale == 1:
+                # The full color decode is needed anyway (or already done);
+                # derive from it rather than decoding the data twice.
+                color = self.color()
+                gray = None if color is None else cv2.cvtColor(color, cv2.COLOR_BGR2GRAY)
+                decoded_scale = 1
+            else:
+                decoded_scale = min(scale, max(GRAYSCALE_FLAGS))
+                gray = cv2.imdecode(self.data, GRAYSCALE_FLAGS[decoded_scale])
+                self.undecodable = gray is None
+            if gray is not None and scale > decoded_scale:
+                factor = scale // decoded_scale
+                gray = cv2.resize(gray, (max(1, gray.shape[1] // factor), max(1, gray.shape[0] // factor)), interpolation=cv2.INTER_AREA)
+            self._gray[scale] = gray
+        return self._gray[scale]
+
+def decode_image_buffer(buffer, policy="full"):
+    """
+    Decodes an encoded image (JPEG, PNG, ...) held in any bytes-like object.
+
+    The buffer is wrapped with np.frombuffer, so bytes, bytearrays, memoryviews
+    and shared memory reach cv2.imdecode without being copied first.
+
+    Args:
+        buffer: The encoded image bytes.
+        policy (str): One of DECODE_POLICIES. With "reduced" nothing is decoded
+                      yet and an EncodedImage wrapping the buffer is returned.
+
+    Returns:
+        np.array: The decoded BGR image (or an EncodedImage), or None if there
+                  is nothing to decode.
+    """
+    if policy not in DECODE_POLICIES:
+        raise ValueError(f"Unknown decode policy: {policy}")
+    np_data = np.frombuffer(buffer, np.uint8)
+    if np_data.size == 0:
+        return None
+    if policy == "reduced":
+        return EncodedImage(buffer)
+    return cv2.imdecode(np_data, cv2.IMREAD_COLOR)
+
+def decode_base64_image(base64_str, policy="full"):
+    """
+    Decodes a base64 string or data URL, as sent by the renderer.
+    """
+    if base64_str.startswith("data:image"):
+        base64_str = base64_str.split(",")[1]
+    base64_str += "=" * (-len(base64_str) % 4)  # Fix padding
+    return decode_image_buffer(base64.b64decode(base64_str), policy)
+
+def decode_image_file(path, policy="full"):
+    """
+    Decodes an image file. np.fromfile reads the file in one go and, unlike
+    cv2.imread, copes with non-ASCII paths on Windows.
+    """
+    return decode_image_buffer(np.fromfile(path, dtype=np.uint8), policy)
+
+def _attach_shared_memory(name):
+    # The block belongs to the producer. Before Python 3.13, attaching also
+    # registers it with this process's resource tracker, which would unlink it
+    # when the server exits, so it is unregistered again.
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        block = shared_memory.SharedMemory(name=name)
+        if os.name == "posix":
+            resource_tracker.unregister(block._name, "shared_memory")
+        return block
+
+def decode_shared_memory(name, size=None, offset=0, policy="full"):
+    """
+    Decodes an image placed in a named shared memory block by another process.
+
+    Args:
+        name (str): The shared memory block's name.
+        size (int, optional): Number of encoded bytes; defaults to the rest of
+                              the block.
+        offset (int): Where the encoded bytes start in the block.
+        policy (str): One of DECODE_POLICIES. A "reduced" image keeps its own
+                      copy of the bytes, as the block is closed on return.
+    """
+    block = _attach_shared_memory(name)
+    try:
+        end = block.size if size is None else offset + size
+        view = block.buf[offset:end]
+        try:
+            if policy == "reduced":
+                return decode_image_buffer(bytes(view), policy)
+            return decode_image_buffer(view, policy)
+        finally:
+            view.release()
+    finally:
+        block.close()
+
+class BinaryFrame:
+    """
+    A {"frame": i} image reference bound to the binary frames of its request
+    (see read_frame_buffers). The frame is only decoded when decode_image
+    reaches it, so every batch item decodes its own captures and a batch sent
+    as frames never holds all of them decoded at once.
+    """
+
+    def __init__(self, buffers, index):
+        self.buffers = buffers
+        self.index = index
+
+    def buffer(self):
+        """
+        Returns the frame's encoded bytes.
+
+        Raises:
+            ValueError: If the request has no frame with this index.
+        """
+        index = self.index
+        if isinstance(index, bool) or not isinstance(index, int) or not 0 <= index < len(self.buffers):
+            raise ValueError(f"Image refers to binary frame {index!r}, but the request has {len(self.buffers)} frame(s)")
+        return self.buffers[index]
+
+def decode_image(source, frames=None, policy="full"):
+    """
+    Decodes one image from any of the supported input forms.
+
+    Args:
+        source: One of
+                - a base64 string or data URL,
+                - {"path": "..."} for an image file,
+                - {"shm": "name", "size": n, "offset": 0} for shared memory,
+                - {"frame": i} for the i-th binary frame sent with the request,
+                  or a BinaryFrame,
+                - an already decoded image (np.array or EncodedImage),
+                  returned as it is.
+        frames (list, optional): The request's binary frames, as read by
+                                 read_frame_buffers.
+        policy (str): One of DECODE_POLICIES.
+
+    Returns:
+        np.array: The decoded BGR image, or None if it could not be decoded.
+    """
+    if isinstance(source, (np.ndarray, EncodedImage)):
+        return source
+    if isinstance(source, BinaryFrame):
+        return decode_image_buffer(source.buffer(), policy)
+    if isinstance(source, str):
+        return decode_base64_image(source, policy)
+    if isinstance(source, dict):
+        if "path" in source:
+            return decode_image_file(source["path"], policy)
+        if "shm" in source:
+            return decode_shared_memory(source["shm"], source.get("size"), source.get("offset", 0), policy)
+        if "frame" in source:
+            if frames is None:
+                raise ValueError("Image refers to a binary frame, but the request has none")
+            return decode_image_buffer(BinaryFrame(frames, source["frame"]).buffer(), policy)
+    raise ValueError(f"Unsupported image input: {type(source).__name__}")
+
+def read_frame_buffers(stream, frame_sizes):
+    """
+    Reads length-prefixed binary frames from a binary stream without decoding
+    them, so a request's frames are always consumed in full, even when the
+    request turns out to be invalid. They are decoded later, by the request's
+    handler, one image at a time (see BinaryFrame).
+
+    Each frame is read straight into its own bytearray with readinto, which
+    is later handed to imdecode without further copies.
+
+    Args:
+        stream: A binary stream (e.g. sys.stdin.buffer).
+        frame_sizes (list): The byte length of each frame, in order.
+
+    Returns:
+        list: The encoded frames, in order.
+    """
+    buffers = []
+    for size in frame_sizes:
+        buffer = bytearray(size)
+        view = memoryview(buffer)
+        received = 0
+        while received < size:
+            count = stream.readinto(view[received:])
+            if not count:
+                raise EOFError(f"Input closed after {received} of {size} frame bytes")
+            received += count
+        view.release()
+        buffers.append(buffer)
+    return buffers
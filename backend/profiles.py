@@ -0,0 +1,76 @@
+import os
+import sys
+import json
+import threading
+
+# Environment variable naming the folder that holds the connector profiles.
+PROFILE_DIR_ENV = "BACKEND_PROFILE_DIR"
+
+_profiles = {}
+_profiles_lock = threading.Lock()
+
+def profile_dir():
+    """
+    Returns the folder profiles are looked up in: BACKEND_PROFILE_DIR if set,
+    otherwise "profiles" next to the backend executable (or script).
+    """
+    configured = os.environ.get(PROFILE_DIR_ENV)
+    if configured:
+        return configured
+    base = os.path.dirname(sys.executable) if getattr(sys, "frozen", False) else os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(base, "profiles")
+
+def profile_path(name):
+    """
+    Returns the file of a profile: name itself if it is a path to a .json
+    file, otherwise <profile_dir>/<name>.json.
+    """
+    if name.endswith(".json") or "/" in name or "\\" in name:
+        return name
+    return os.path.join(profile_dir(), f"{name}.json")
+
+def load_profile(name):
+    """
+    Returns the detection parameters stored in a connector type's profile.
+
+    Profiles are read once and kept until the file changes, so requests can
+    name one every time.
+
+    Args:
+        name (str): The connector type (see profile_path).
+
+    Returns:
+        dict: The profile's "params" (overrides of getsequence.DEFAULT_PARAMS).
+    """
+    path = profile_path(name)
+    try:
+        modified = os.path.getmtime(path)
+    except OSError:
+        raise ValueError(f"Unknown connector profile: {name}")
+    with _profiles_lock:
+        cached = _profiles.get(path)
+        if cached is not None and cached[0] == modified:
+            return cached[1]
+
+    with open(path) as f:
+        params = json.load(f)["params"]
+    with _profiles_lock:
+        _profiles[path] = (modified, params)
+    return params
+
+def save_profile(path, connector_type, params, **info):
+    """
+    Writes a profile as loaded by load_profile.
+
+    Args:
+        path (str): The file to write.
+        connector_type (str): The connector type the parameters were tuned for.
+        params (dict): The detection parameters.
+        **info: Further keys stored alongside, e.g. the tuning score.
+    """
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump({"connector_type": connector_type, "params": params, **info}, f, indent=2)
+        f.write("\n")
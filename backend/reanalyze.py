@@ -0,0 +1,336 @@
+import os
+import sys
+import json
+import time
+import sqlite3
+import argparse
+import pathlib
+from getsequence import get_single_sequence, get_double_sequence, detection_options
+from compare import compare_images, compare_sequences, comparison_options
+from imagedecode import decode_image, DECODE_POLICIES
+from executor import map_ordered, set_worker_count
+from reference import reference_cache, as_color_array
+from colordistance import METRICS, DEFAULT_METRIC
+
+# Rows fetched from the database at a time. Rows only hold image paths, so
+# this bounds memory together with the executor's in-flight limit.
+DEFAULT_FETCH_SIZE = 256
+
+TABLES = ("results", "mismatch")
+
+def open_database(path):
+    """
+    Opens the app's database.sqlite read-only, so it can be analysed while the
+    app is running.
+    """
+    if not os.path.exists(path):
+        raise ValueError(f"Database not found: {path}")
+    connection = sqlite3.connect(pathlib.Path(path).resolve().as_uri() + "?mode=ro", uri=True)
+    connection.row_factory = sqlite3.Row
+    return connection
+
+def has_column(connection, table, column):
+    return any(row["name"] == column for row in connection.execute(f"PRAGMA table_info({table})"))
+
+def build_query(connection, table, since=None, until=None, wire_id=None, limit=None):
+    """
+    Returns the SELECT statement and parameters for the rows of one table.
+
+    Args:
+        connection (sqlite3.Connection): The open database.
+        table (str): "results" (joined with the wire's stored reference) or
+                     "mismatch".
+        since (str, optional): Earliest timestamp, e.g. "2024-01-01".
+        until (str, optional): Timestamp before which rows must lie.
+        wire_id (int, optional): Only rows of this wire ("results" only).
+        limit (int, optional): Most rows to read.
+
+    Returns:
+        tuple: (sql, parameters).
+    """
+    if table == "results":
+        # Databases created before fingerprints were stored lack the column.
+        fingerprint = "w.fingerprint" if has_column(connection, "wires", "fingerprint") else "NULL"
+        sql = (
+            "SELECT r.id, r.wire_type, r.wire_id, r.wire_name, r.result, r.details, "
+            "r.compared_at AS timestamp, r.image_front, r.image_back, "
+            f"w.sequence, {fingerprint} AS fingerprint "
+            "FROM results r LEFT JOIN wires w ON w.id = r.wire_id"
+        )
+        time_column = "r.compared_at"
+        id_column = "r.id"
+    elif table == "mismatch":
+        sql = (
+            "SELECT id, wire_type, wire_name, sequence, date AS timestamp, image_front, image_back "
+            "FROM mismatch"
+        )
+        time_column = "date"
+        id_column = "id"
+    else:
+        raise ValueError(f"Unknown table: {table}")
+
+    conditions, parameters = [], []
+    if since:
+        conditions.append(f"{time_column} >= ?")
+        parameters.append(since)
+    if until:
+        conditions.append(f"{time_column} < ?")
+        parameters.append(until)
+    if wire_id is not None and table == "results":
+        conditions.append("r.wire_id = ?")
+        parameters.append(wire_id)
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    sql += f" ORDER BY {id_column}"
+    if limit:
+        sql += " LIMIT ?"
+        parameters.append(limit)
+    return sql, parameters
+
+def iterate_rows(connection, sql, parameters, fetch_size=DEFAULT_FETCH_SIZE):
+    """
+    Yields the rows of a query as dicts, fetching fetch_size rows at a time so
+    the table is never read into memory as a whole.
+    """
+    cursor = connection.execute(sql, parameters)
+    try:
+        while True:
+            rows = cursor.fetchmany(fetch_size)
+            if not rows:
+                return
+            for row in rows:
+                yield dict(row)
+    finally:
+        cursor.close()
+
+def image_source(value, table, wire_type, image_root=None):
+    """
+    Turns a stored image column into an input for imagedecode.decode_image.
+
+    The app stores the path of the saved capture (older rows may hold the
+    base64 image itself). With image_root, a path that does not exist on this
+    machine is looked up as image_root/<table>/<wire type>/<file name>, i.e.
+    in a copy of the app's data folder.
+    """
+    if not value:
+        return None
+    if value.startswith("data:image"):
+        return value
+    if os.path.exists(value):
+        return {"path": value}
+    if image_root:
+        moved = os.path.join(image_root, table, wire_type, os.path.basename(value.replace("\\", "/")))
+        if os.path.exists(moved):
+            return {"path": moved}
+    if os.sep in value or "/" in value or "\\" in value:
+        raise ValueError(f"Image not found: {value}")
+    return value
+
+def load_images(row, table, image_root=None, policy="full"):
+    """
+    Decodes the front (and, for double wires, back) image of a row.
+    """
+    columns = ["image_front"] if row["wire_type"] == "singlewire" else ["image_front", "image_back"]
+    images = []
+    for column in columns:
+        source = image_source(row[column], table, row["wire_type"], image_root)
+        if source is None:
+            raise ValueError(f"Row has no {column}")
+        image = decode_image(source, policy=policy)
+        if image is None:
+            raise ValueError(f"Could not decode {column}")
+        images.append(image)
+    return images
+
+def stored_mismatch_sequence(sequence):
+    """
+    Parses the sequence column of a mismatch row: the detected per-side color
+    lists, joined with commas by the app (e.g. "[[0,0,200]],[[0,180,0]]").
+
+    Returns:
+        list: One (number of wires, (N, 3) color array) pair per side.
+    """
+    sides = json.loads("[" + sequence + "]")
+    return [(len(colors), as_color_array(colors)) for colors in sides]
+
+def reanalyze_result(row, options):
+    """
+    Repeats the comparison of a "results" row against the wire's stored
+    reference.
+
+    Returns:
+        dict: "match" under the new settings and "changed" when it differs
+              from the stored verdict, plus the new "details".
+    """
+    if row["sequence"] is None:
+        raise ValueError(f"Reference wire {row['wire_id']} no longer exists")
+    wire_count = [len(json.loads(side)) for side in json.loads(row["sequence"])]
+    reference = reference_cache.get(wire_count, row["sequence"], row["wire_id"])
+    test_images = load_images(row, "results", options["image_root"], options["decode"])
+    fingerprint = options["use_fingerprint"] and row["fingerprint"] and json.loads(row["fingerprint"])
+    result = compare_images(
+        row["wire_type"], reference, test_images,
+        fingerprint=fingerprint or None, **options["detect"], **options["compare"]
+    )
+    stored_match = bool(row["result"])
+    return {
+        "stored_match": stored_match,
+        "match": bool(result["match"]),
+        "changed": bool(result["match"]) != stored_match,
+        "stored_details": row["details"],
+        "details": result["details"],
+    }
+
+def reanalyze_mismatch(row, options):
+    """
+    Detects the sequence of a "mismatch" row again and compares it with the
+    sequence detected when the row was recorded.
+
+    Returns:
+        dict: The new "sequence" (per side) and "changed" when it no longer
+              matches the recorded one within the color threshold.
+    """
+    stored = stored_mismatch_sequence(row["sequence"])
+    images = load_images(row, "mismatch", options["image_root"], options["decode"])
+    if row["wire_type"] == "singlewire":
+        detected = [get_single_sequence(images[0], **options["detect"])]
+    else:
+        detected = list(get_double_sequence(images[0], images[1], **options["detect"]))
+    names = ["Front", "Back"]
+    result = compare_sequences(
+        [(names[index], stored[index], detected[index]) for index in range(len(detected))],
+        options["compare"]["color_metric"], options["compare"]["color_threshold"]
+    )
+    return {
+        "sequence": [[tuple(int(value) for value in color) for color in colors] for _, colors in detected],
+        "changed": not result["match"],
+        "details": result["details"],
+    }
+
+def _reanalyze_row(item):
+    table, row, options = item
+    report = {
+        "table": table,
+        "id": row["id"],
+        "wire_type": row["wire_type"],
+        "wire_name": row["wire_name"],
+        "timestamp": row["timestamp"],
+    }
+    if table == "results":
+        report["wire_id"] = row["wire_id"]
+    try:
+        if table == "results":
+            report.update(reanalyze_result(row, options))
+        else:
+            report.update(reanalyze_mismatch(row, options))
+    except Exception as e:
+        report.update({"changed": False, "error": str(e)})
+    return report
+
+def reanalyze(connection, tables=("results",), options=None, fetch_size=DEFAULT_FETCH_SIZE, **filters):
+    """
+    Re-runs detection on the recorded history, spread across the worker pool
+    (see executor.py).
+
+    Rows are streamed from the database and processed as they are read, so the
+    history is never loaded as a whole; each worker decodes the images of its
+    own row.
+
+    Args:
+        connection (sqlite3.Connection): See open_database.
+        tables (tuple): Any of TABLES.
+        options (dict): "detect" (see getsequence.detection_options),
+                        "compare" (color_metric and color_threshold),
+                        "decode" (a decode policy), "image_root" (see
+                        image_source) and "use_fingerprint" (replay the stored
+                        fingerprint fast path, as the app does).
+        fetch_size (int): Rows fetched from the database at a time.
+        **filters: since, until, wire_id and limit, see build_query.
+
+    Yields:
+        dict: One report per row, in table and id order, with "changed" set
+              if the verdict differs under the new settings. A row that cannot
+              be processed carries an "error" message instead.
+    """
+    for table in tables:
+        sql, parameters = build_query(connection, table, **filters)
+        rows = ((table, row, options) for row in iterate_rows(connection, sql, parameters, fetch_size))
+        yield from map_ordered(_reanalyze_row, rows)
+
+def summarize(reports):
+    """
+    Counts processed, changed and failed rows, and the direction of changed
+    "results" verdicts.
+    """
+    summary = {"rows": 0, "changed": 0, "errors": 0, "pass_to_fail": 0, "fail_to_pass": 0}
+    for report in reports:
+        summary["rows"] += 1
+        if "error" in report:
+            summary["errors"] += 1
+        elif report["changed"]:
+            summary["changed"] += 1
+            if report["table"] == "results":
+                summary["pass_to_fail" if report["stored_match"] else "fail_to_pass"] += 1
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-run recorded tests from database.sqlite under new settings and report changed verdicts.")
+    parser.add_argument("database", help="path to the app's database.sqlite")
+    parser.add_argument("--table", choices=TABLES + ("all",), default="results", help="history to re-analyse (default: results)")
+    parser.add_argument("--image-root", help="copy of the app's data folder, for image paths recorded on another machine")
+    parser.add_argument("--since", help="only rows recorded at or after this time (e.g. 2024-01-01)")
+    parser.add_argument("--until", help="only rows recorded before this time")
+    parser.add_argument("--wire-id", type=int, help="only results of this reference wire")
+    parser.add_argument("--limit", type=int, help="most rows per table")
+    parser.add_argument("--color-metric", choices=METRICS, default=DEFAULT_METRIC, help="color distance metric (see compare)")
+    parser.add_argument("--color-threshold", type=float, help="largest color distance still counted as a match")
+    parser.add_argument("--scanlines", type=int, default=1, help="scanlines per image (see get-sequence)")
+    parser.add_argument("--pyramid-level", type=int, default=0, help="pyramid level for segmentation (see get-sequence)")
+    parser.add_argument("--profile", help="connector type whose tuned detection parameters to use (see tuner.py)")
+    parser.add_argument("--decode", choices=DECODE_POLICIES, default="full", help="decode policy (see get-sequence)")
+    parser.add_argument("--fingerprint", action="store_true", help="try the stored fingerprint fast path first, as the app does")
+    parser.add_argument("--all", action="store_true", help="report every row, not only changed ones")
+    parser.add_argument("--output", help="write the report to this file instead of stdout")
+    parser.add_argument("--workers", type=int, help="number of worker threads (default: BACKEND_WORKERS or CPU count)")
+    parser.add_argument("--fetch-size", type=int, default=DEFAULT_FETCH_SIZE, help="rows read from the database at a time")
+    args = parser.parse_args()
+
+    try:
+        if args.workers:
+            set_worker_count(args.workers)
+        options = {
+            "detect": detection_options({"scanlines": args.scanlines, "pyramid_level": args.pyramid_level, "profile": args.profile}),
+            "compare": {
+                key: value for key, value in comparison_options({"color_metric": args.color_metric, "color_threshold": args.color_threshold}).items()
+                if key != "fingerprint"
+            },
+            "decode": args.decode,
+            "image_root": args.image_root,
+            "use_fingerprint": args.fingerprint,
+        }
+        tables = TABLES if args.table == "all" else (args.table,)
+        connection = open_database(args.database)
+        output = open(args.output, "w") if args.output else sys.stdout
+        start = time.perf_counter()
+        try:
+            def reports():
+                for report in reanalyze(connection, tables, options, args.fetch_size,
+                                        since=args.since, until=args.until, wire_id=args.wire_id, limit=args.limit):
+                    if args.all or report["changed"] or "error" in report:
+                        output.write(json.dumps(report) + "\n")
+                        output.flush()
+                    yield report
+
+            summary = summarize(reports())
+        finally:
+            connection.close()
+            if output is not sys.stdout:
+                output.close()
+        summary["seconds"] = round(time.perf_counter() - start, 1)
+        print(json.dumps(summary), file=sys.stderr)
+    except Exception as e:
+        print(str(e), file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+
+DEFAULT_CACHE_SIZE = 128
+
+def as_color_array(colors):
+    """
+    Returns colors as a contiguous (N, 3) float64 array. Arrays that are already
+    in that form are returned as they are, without copying.
+    """
+    return np.ascontiguousarray(colors, dtype=np.float64).reshape(-1, 3)
+
+def parse_reference(wire_count, sequence):
+    """
+    Converts the stored reference into per-side (number of wires, colors) pairs.
+
+    Args:
+        wire_count (list): Number of wires per side.
+        sequence (str): The stringified sequence as stored in the database, a
+                        JSON list holding one JSON-encoded color list per side.
+
+    Returns:
+        list: One [number of wires, (N, 3) color array] entry per side.
+    """
+    stringified_rgb_list = json.loads(sequence)
+    colors = [json.loads(rgb) for rgb in stringified_rgb_list]
+    return [[count, as_color_array(side_colors)] for count, side_colors in zip(wire_count, colors)]
+
+def reference_hash(wire_count, sequence):
+    """
+    Returns a content hash identifying a stored reference.
+    """
+    content = json.dumps(list(wire_count)) + "\n" + sequence
+    return hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+class ReferenceCache:
+    """
+    LRU cache of parsed references, keyed by wire ID and content hash.
+
+    The hash makes an edited reference (same wire ID, new sequence) a different
+    entry, so stale colors are never served. Entries hold the parsed colors as
+    contiguous (N, 3) arrays ready for vectorized comparison; they are shared
+    between callers and must not be modified.
+    """
+
+    def __init__(self, maxsize=DEFAULT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, wire_count, sequence, wire_id=None):
+        """
+        Returns the parsed reference, parsing and caching it on a miss.
+
+        Args:
+            wire_count (list): Number of wires per side.
+            sequence (str): The stringified sequence as stored in the database.
+            wire_id (int, optional): The wire's database ID.
+
+        Returns:
+            list: The output of parse_reference.
+        """
+        key = (wire_id, reference_hash(wire_count, sequence))
+        with self._lock:
+            reference = self._entries.get(key)
+            if reference is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return reference
+            self.misses += 1
+
+        reference = parse_reference(wire_count, sequence)
+        with self._lock:
+            self._entries[key] = reference
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return reference
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """
+        Returns the number of entries, hits and misses.
+        """
+        with self._lock:
+            return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+# Shared by the server and batch comparisons so references survive across requests.
+reference_cache = ReferenceCache()
@@ -0,0 +1,183 @@
+import threading
+import numpy as np
+import cv2
+
+# Search range around the last box, in full-resolution pixels.
+DEFAULT_MAX_SHIFT = 24
+# Lowest normalised correlation at which the connector counts as found again.
+DEFAULT_MIN_CORRELATION = 0.8
+# Consecutive hits after which the box is segmented again anyway, so slow
+# drift of the fixture cannot accumulate.
+DEFAULT_REFRESH_EVERY = 50
+# Downscale factor of the template and the search window.
+MATCH_SCALE = 4
+
+def _to_gray(image):
+    return image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+def _shrink(gray):
+    return cv2.resize(
+        gray,
+        (max(1, gray.shape[1] // MATCH_SCALE), max(1, gray.shape[0] // MATCH_SCALE)),
+        interpolation=cv2.INTER_AREA
+    )
+
+class RoiTracker:
+    """
+    Remembers the connector region found on the last capture of one camera and
+    checks whether the next capture still shows it there, so connector
+    segmentation can be skipped while the fixture holds the part in place.
+
+    The check correlates a downscaled grayscale template of the last region
+    with a slightly larger window around it (cv2.matchTemplate), which costs a
+    fraction of the threshold/morphology/contour pipeline. A small shift is
+    followed; a low correlation (the part moved, or a different part) is a
+    miss and the caller segments the capture again.
+
+    Trackers are shared by the threads of one server and are safe to use from
+    several of them.
+    """
+
+    def __init__(self, max_shift=DEFAULT_MAX_SHIFT, min_correlation=DEFAULT_MIN_CORRELATION, refresh_every=DEFAULT_REFRESH_EVERY):
+        self.max_shift = max_shift
+        self.min_correlation = min_correlation
+        self.refresh_every = refresh_every
+        self.hits = 0
+        self.misses = 0
+        self.last_correlation = None
+        self._box = None
+        self._template = None
+        self._image_shape = None
+        self._hits_since_update = 0
+        self._lock = threading.Lock()
+
+    def track(self, image):
+        """
+        Looks for the remembered region in a new capture.
+
+        Args:
+            image (np.array): The capture, BGR or grayscale.
+
+        Returns:
+            tuple: The (x, y, width, height) box of the region in this capture,
+                   or None on a miss (nothing remembered yet, the capture has
+                   a different size, the region is due for a refresh, or it
+                   no longer correlates).
+        """
+        with self._lock:
+            box, template, image_shape = self._box, self._template, self._image_shape
+            refresh_due = self.refresh_every and self._hits_since_update >= self.refresh_every
+        if box is None or refresh_due or image.shape[:2] != image_shape:
+            return self._record(None, None)
+
+        x, y, width, height = box
+        image_height, image_width = image.shape[:2]
+        window_x = max(0, x - self.max_shift)
+        window_y = max(0, y - self.max_shift)
+        window_right = min(image_width, x + width + self.max_shift)
+        window_bottom = min(image_height, y + height + self.max_shift)
+        window = _shrink(_to_gray(image[window_y:window_bottom, window_x:window_right]))
+        if window.shape[0] < template.shape[0] or window.shape[1] < template.shape[1]:
+            return self._record(None, None)
+
+        scores = cv2.matchTemplate(window, template, cv2.TM_CCOEFF_NORMED)
+        _, correlation, _, (match_x, match_y) = cv2.minMaxLoc(scores)
+        if not np.isfinite(correlation) or correlation < self.min_correlation:
+            return self._record(None, correlation)
+
+        # Shifts below one template pixel are not resolved; keep the box.
+        dx = window_x + match_x * MATCH_SCALE - x
+        dy = window_y + match_y * MATCH_SCALE - y
+        dx = 0 if abs(dx) < MATCH_SCALE else dx
+        dy = 0 if abs(dy) < MATCH_SCALE else dy
+        new_x = min(max(0, x + dx), image_width - width)
+        new_y = min(max(0, y + dy), image_height - height)
+        return self._record((new_x, new_y, width, height), correlation)
+
+    def _record(self, box, correlation):
+        with self._lock:
+            if box is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._hits_since_update += 1
+            self.last_correlation = None if correlation is None else float(correlation)
+        return box
+
+    def update(self, image, box):
+        """
+        Remembers the region found by full segmentation of a capture.
+
+        Args:
+            image (np.array): The capture, BGR or grayscale.
+            box (tuple): The region's (x, y, width, height), or None to forget
+                         the region (no connector found).
+        """
+        template = None
+        if box is not None:
+            x, y, width, height = box
+            template = _shrink(_to_gray(image[y : y + height, x : x + width]))
+        with self._lock:
+            self._box = box
+            self._template = template
+            self._image_shape = image.shape[:2]
+            self._hits_since_update = 0
+
+    def reset(self):
+        """
+        Forgets the region, so the next capture is segmented.
+        """
+        with self._lock:
+            self._box = None
+            self._template = None
+            self._image_shape = None
+            self._hits_since_update = 0
+
+    def stats(self):
+        """
+        Returns the hit and miss counts and the last correlation score.
+        """
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "last_correlation": self.last_correlation}
+
+_trackers = {}
+_trackers_lock = threading.Lock()
+
+def get_tracker(name):
+    """
+    Returns the tracker registered under name (one per camera, e.g.
+    "station1/front"), creating it on first use.
+    """
+    with _trackers_lock:
+        tracker = _trackers.get(name)
+        if tracker is None:
+            tracker = _trackers[name] = RoiTracker()
+        return tracker
+
+def tracker_stats():
+    """
+    Returns the stats of every registered tracker, by name.
+    """
+    with _trackers_lock:
+        trackers = dict(_trackers)
+    return {name: tracker.stats() for name, tracker in trackers.items()}
+
+def reset_trackers():
+    """
+    Drops all registered trackers and their counts.
+    """
+    with _trackers_lock:
+        _trackers.clear()
+
+def handle_stats_request(data):
+    """
+    Reports the hit and miss counts of every tracker. With "reset": true the
+    trackers are dropped afterwards, so counting starts over.
+
+    Returns:
+        dict: {"trackers": {name: stats}}.
+    """
+    stats = tracker_stats()
+    if data.get("reset", False):
+        reset_trackers()
+    return {"trackers": stats}
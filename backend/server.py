@@ -0,0 +1,138 @@
+import sys
+import json
+import time
+import argparse
+import numpy as np
+import cv2
+import compare
+import getsequence
+from executor import set_worker_count
+from imagedecode import BinaryFrame, read_frame_buffers, DECODE_POLICIES
+from roitracker import handle_stats_request
+
+# Commands understood by the server, mapped to the per-request handlers of the
+# one-shot scripts so both entry points share the exact same behaviour.
+HANDLERS = {
+    "get-sequence": getsequence.handle_request,
+    "compare": compare.handle_request,
+    "compare-batch": compare.handle_batch_request,
+    "roi-stats": handle_stats_request,
+}
+
+def warm_up():
+    """
+    Runs the OpenCV operations used by the detector once on a small blank frame
+    so the first real request does not pay for lazy library initialisation.
+    """
+    blank = np.zeros((64, 64, 3), np.uint8)
+    gray = cv2.cvtColor(blank, cv2.COLOR_BGR2GRAY)
+    blurred = cv2.GaussianBlur(gray, (7, 7), 0)
+    binary = cv2.adaptiveThreshold(blurred, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 21, 5)
+    cv2.morphologyEx(binary, cv2.MORPH_CLOSE, np.ones((7, 7), np.uint8))
+    cv2.findContours(binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    cv2.Canny(gray, 30, 90)
+    cv2.imdecode(cv2.imencode(".png", blank)[1], cv2.IMREAD_COLOR)
+
+def resolve_frames(payload, frames):
+    """
+    Replaces {"frame": i} image references in a payload (its "input" list, and
+    the "input" of each batch item) with BinaryFrames. Nothing is decoded yet,
+    and a reference to a missing frame only fails the image (or batch item)
+    that uses it.
+    """
+    def resolve(images):
+        if not isinstance(images, list):
+            return images
+        return [BinaryFrame(frames, image["frame"]) if isinstance(image, dict) and "frame" in image else image for image in images]
+
+    if "input" in payload:
+        payload["input"] = resolve(payload["input"])
+    for item in payload.get("items", []):
+        if isinstance(item, dict) and "input" in item:
+            item["input"] = resolve(item["input"])
+    return payload
+
+def handle_line(line, input_stream=None):
+    """
+    Handles one newline-delimited JSON request.
+
+    A request may be followed by binary image frames: its "frames" key lists
+    their byte lengths, the raw encoded images follow the line back to back,
+    and the payload refers to them as {"frame": i}. All frames are read before
+    the request is validated, so an invalid request cannot leave image bytes
+    behind to be read as the next request. The handler decodes each image when
+    it needs it (see resolve_frames). If the handler returns a trace (see
+    diagnostics.py), the time spent reading the frames is added to it as
+    "read_frames".
+
+    Args:
+        line (bytes): A JSON object with "id", "command" and "payload" keys,
+                      and optionally "frames".
+        input_stream: The binary stream the frames are read from.
+
+    Returns:
+        dict: A response carrying the same "id", with "ok" set and either a
+              "result" or an "error" message.
+    """
+    request_id = None
+    try:
+        request = json.loads(line)
+        request_id = request.get("id")
+        # Frames have to be consumed before anything else is checked,
+        # otherwise the next request would be read from image bytes.
+        start = time.perf_counter()
+        buffers = read_frame_buffers(input_stream, request.get("frames") or [])
+        frames_time = (time.perf_counter() - start) * 1000 if buffers else None
+        payload = request["payload"]
+        policy = payload.get("decode", "full")
+        if policy not in DECODE_POLICIES:
+            raise ValueError(f"Unknown decode policy: {policy}")
+        if buffers:
+            payload = resolve_frames(payload, buffers)
+        handler = HANDLERS.get(request.get("command"))
+        if handler is None:
+            raise ValueError(f"Unknown command: {request.get('command')}")
+        result = handler(payload)
+        if frames_time is not None and isinstance(result.get("trace"), dict):
+            result["trace"]["timings"]["read_frames"] = round(frames_time, 3)
+        return {"id": request_id, "ok": True, "result": result}
+    except EOFError:
+        raise
+    except Exception as e:
+        print(str(e), file=sys.stderr)
+        return {"id": request_id, "ok": False, "error": str(e)}
+
+def serve(input_stream, output_stream):
+    """
+    Reads requests line by line from a binary stream until it is closed,
+    writing one response line per request.
+    """
+    while True:
+        line = input_stream.readline()
+        if not line:
+            break
+        if not line.strip():
+            continue
+        try:
+            response = handle_line(line, input_stream)
+        except EOFError as e:
+            print(str(e), file=sys.stderr)
+            break
+        output_stream.write(json.dumps(response) + "\n")
+        output_stream.flush()
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve wire sequence requests over stdin/stdout.")
+    parser.add_argument("--workers", type=int, help="number of worker threads (default: BACKEND_WORKERS or CPU count)")
+    args = parser.parse_args()
+    if args.workers:
+        set_worker_count(args.workers)
+
+    warm_up()
+    # Let the parent know it can start sending requests.
+    sys.stdout.write(json.dumps({"event": "ready"}) + "\n")
+    sys.stdout.flush()
+    serve(sys.stdin.buffer, sys.stdout)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+import sys
+import json
+import time
+import argparse
+import threading
+import numpy as np
+import cv2
+from getsequence import tracked_connector_roi, detect_wires, request_params, SCANLINE_SPACING
+from roitracker import RoiTracker
+from reference import as_color_array
+from colordistance import color_distances
+
+# Largest BGR distance between the colors of one wire on two frames that still
+# counts as the same sequence.
+AGREEMENT_THRESHOLD = 40.0
+
+def open_capture(source):
+    """
+    Opens a frame source for cv2.VideoCapture.
+
+    Args:
+        source (str): A camera device index ("0", "1", ...), a video file, or
+                      an image sequence pattern such as "captures/%04d.png"
+                      (a local stand-in for the camera in tests).
+
+    Returns:
+        cv2.VideoCapture: The opened capture.
+    """
+    capture = cv2.VideoCapture(int(source)) if source.isdigit() else cv2.VideoCapture(source)
+    if not capture.isOpened():
+        raise ValueError(f"Could not open frame source: {source}")
+    return capture
+
+class LatestFrame:
+    """
+    Hands the newest frame from the reader thread to the detector. A frame
+    that is replaced before the detector took it is dropped, so a slow
+    detection never builds up a backlog of stale frames.
+    """
+
+    def __init__(self):
+        self.dropped = 0
+        self._frame = None
+        self._closed = False
+        self._condition = threading.Condition()
+
+    def put(self, index, frame):
+        with self._condition:
+            if self._frame is not None:
+                self.dropped += 1
+            self._frame = (index, frame)
+            self._condition.notify()
+
+    def take(self):
+        """
+        Waits for the next frame and returns (index, frame), or None once the
+        source is exhausted.
+        """
+        with self._condition:
+            while self._frame is None and not self._closed:
+                self._condition.wait()
+            frame, self._frame = self._frame, None
+            return frame
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+
+def read_frames(capture, latest, realtime, stop):
+    """
+    Reads frames until the source ends or stop is set. With realtime, frames
+    of a file are released at the file's own frame rate, as a camera would
+    deliver them.
+
+    Returns:
+        int: The number of frames read.
+    """
+    source_fps = capture.get(cv2.CAP_PROP_FPS) if realtime else 0
+    frame_interval = 1.0 / source_fps if source_fps and source_fps > 0 else 0.0
+    next_frame_time = time.perf_counter()
+    index = 0
+    try:
+        while not stop.is_set():
+            ok, frame = capture.read()
+            if not ok:
+                break
+            if frame_interval:
+                next_frame_time += frame_interval
+                time.sleep(max(0.0, next_frame_time - time.perf_counter()))
+            latest.put(index, frame)
+            index += 1
+    finally:
+        latest.close()
+    return index
+
+def sequences_agree(first, second, threshold=AGREEMENT_THRESHOLD):
+    """
+    Returns True if two detected sequences have the same, non-zero number of
+    wires and every wire's color is within threshold.
+    """
+    if first[0] == 0 or first[0] != second[0]:
+        return False
+    distances = color_distances(as_color_array(first[1]), as_color_array(second[1]))
+    return bool(np.all(distances <= threshold))
+
+class SequenceStabilizer:
+    """
+    Turns per-frame detections into stable sequences: a sequence is reported
+    once required consecutive frames agree on it (see sequences_agree), and
+    only again after the detections changed. Frames without wires (connector
+    removed) reset it, so the next connector is reported even if it has the
+    same sequence.
+    """
+
+    def __init__(self, required, threshold=AGREEMENT_THRESHOLD):
+        self.required = required
+        self.threshold = threshold
+        self.run = []
+        self.reported = None
+
+    def update(self, detected):
+        """
+        Adds one frame's detection.
+
+        Args:
+            detected (tuple): (number of wires, list of BGR tuples).
+
+        Returns:
+            tuple: The stable (number of wires, list of BGR tuples) when it
+                   has just been reached, otherwise None. Colors are the
+                   per-channel median over the agreeing frames.
+        """
+        if detected[0] == 0:
+            self.run = []
+            self.reported = None
+            return None
+        if self.run and not sequences_agree(self.run[-1], detected, self.threshold):
+            self.run = []
+        self.run.append(detected)
+        if len(self.run) < self.required:
+            return None
+
+        self.run = self.run[-self.required:]
+        colors = np.median(np.array([colors for _, colors in self.run], dtype=np.uint8), axis=0).astype(np.uint8)
+        stable = (detected[0], [tuple(color) for color in colors.tolist()])
+        if self.reported is not None and sequences_agree(self.reported, stable, self.threshold):
+            return None
+        self.reported = stable
+        return stable
+
+class FrameDetector:
+    """
+    Runs detection on consecutive frames of one camera, following the
+    connector with a RoiTracker instead of segmenting every frame.
+
+    Besides the tracker's own misses (drift) and refreshes (every
+    resegment_every frames), the connector is segmented again when the tracked
+    region shows no wires or a different wire count than the frame before.
+    """
+
+    def __init__(self, num_scanlines=1, pyramid_level=0, resegment_every=30, params=None):
+        self.num_scanlines = num_scanlines
+        self.pyramid_level = pyramid_level
+        self.params = params
+        self.tracker = RoiTracker(refresh_every=resegment_every)
+        self.last_count = None
+
+    def detect(self, frame):
+        """
+        Returns (number of wires, list of BGR tuples) for one frame.
+        """
+        hits = self.tracker.hits
+        detected = self._detect(frame)
+        if self.tracker.hits > hits and (detected[0] == 0 or detected[0] != self.last_count):
+            # The tracked region no longer shows the same wires; find the
+            # connector again.
+            self.tracker.reset()
+            detected = self._detect(frame)
+        self.last_count = detected[0]
+        return detected
+
+    def _detect(self, frame):
+        cropped_image_roi = tracked_connector_roi(frame, self.tracker, self.pyramid_level, params=self.params)
+        if cropped_image_roi is None:
+            return 0, []
+        wire_count, colors, _ = detect_wires(cropped_image_roi, self.num_scanlines, SCANLINE_SPACING, params=self.params)
+        return wire_count, colors
+
+def stream_sequences(capture, output_stream, fps=10.0, stable_frames=5, realtime=True, **detector_options):
+    """
+    Runs detection on a frame stream and writes one JSON event per line.
+
+    Frames are read on a separate thread. The detector takes the newest frame
+    whenever it is free, at most fps times per second, and frames that arrive
+    in the meantime are skipped.
+
+    Events:
+        {"event": "sequence", "frame": i, "wires": n, "sequence": [...]} when
+        stable_frames consecutive processed frames agree on a new sequence,
+        and a final {"event": "end", ...} with frame counts.
+
+    Args:
+        capture (cv2.VideoCapture): The opened source (see open_capture).
+        output_stream: Text stream the events are written to.
+        fps (float): Most frames processed per second (0 for no limit).
+        stable_frames (int): Consecutive agreeing frames needed.
+        realtime (bool): Release file frames at the file's frame rate.
+        **detector_options: Passed on to FrameDetector.
+
+    Returns:
+        dict: The final "end" event.
+    """
+    latest = LatestFrame()
+    stop = threading.Event()
+    frames_read = []
+    reader = threading.Thread(
+        target=lambda: frames_read.append(read_frames(capture, latest, realtime, stop)),
+        daemon=True,
+    )
+    reader.start()
+
+    detector = FrameDetector(**detector_options)
+    stabilizer = SequenceStabilizer(stable_frames)
+    min_interval = 1.0 / fps if fps > 0 else 0.0
+    processed = 0
+    sequences = 0
+    try:
+        while True:
+            started = time.perf_counter()
+            item = latest.take()
+            if item is None:
+                break
+            index, frame = item
+            stable = stabilizer.update(detector.detect(frame))
+            processed += 1
+            if stable is not None:
+                sequences += 1
+                event = {"event": "sequence", "frame": index, "wires": stable[0], "sequence": stable[1]}
+                output_stream.write(json.dumps(event) + "\n")
+                output_stream.flush()
+            time.sleep(max(0.0, min_interval - (time.perf_counter() - started)))
+    finally:
+        stop.set()
+        reader.join()
+
+    end = {
+        "event": "end",
+        "frames_read": frames_read[0] if frames_read else 0,
+        "frames_processed": processed,
+        "frames_skipped": latest.dropped,
+        "segmentations": detector.tracker.misses,
+        "roi_hits": detector.tracker.hits,
+        "sequences": sequences,
+    }
+    output_stream.write(json.dumps(end) + "\n")
+    output_stream.flush()
+    return end
+
+def main():
+    parser = argparse.ArgumentParser(description="Report stable wire sequences from a camera or video stream.")
+    parser.add_argument("source", help="camera device index, video file or image sequence pattern")
+    parser.add_argument("--fps", type=float, default=10.0, help="most frames processed per second (0: no limit)")
+    parser.add_argument("--stable", type=int, default=5, help="consecutive agreeing frames before a sequence is reported")
+    parser.add_argument("--scanlines", type=int, default=1, help="scanlines per frame (see get-sequence)")
+    parser.add_argument("--pyramid-level", type=int, default=0, help="pyramid level for segmentation (see get-sequence)")
+    parser.add_argument("--resegment-every", type=int, default=30, help="segment the connector again after this many tracked frames")
+    parser.add_argument("--profile", help="connector type whose tuned detection parameters to use (see tuner.py)")
+    parser.add_argument("--no-realtime", action="store_true", help="read file frames as fast as possible instead of at the file's frame rate")
+    args = parser.parse_args()
+
+    try:
+        capture = open_capture(args.source)
+        try:
+            stream_sequences(
+                capture, sys.stdout, args.fps, args.stable, not args.no_realtime,
+                num_scanlines=args.scanlines, pyramid_level=args.pyramid_level,
+                resegment_every=args.resegment_every, params=request_params({"profile": args.profile}),
+            )
+        finally:
+            capture.release()
+    except Exception as e:
+        print(str(e), file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
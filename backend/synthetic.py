@@ -0,0 +1,146 @@
+import numpy as np
+import cv2
+from getsequence import scale_params
+
+WIRE_COLORS = [(0, 0, 200), (0, 180, 0), (200, 0, 0), (0, 200, 200), (200, 200, 200), (40, 40, 40)]
+
+BACKGROUND_COLOR = (150, 160, 170)
+CONNECTOR_COLOR = (25, 25, 25)
+
+# Image height the connector's size is drawn for; larger or smaller images
+# show a proportionally larger or smaller connector.
+REFERENCE_HEIGHT = 1080
+
+def connector_layout(width, height, num_wires):
+    """
+    Returns where make_synthetic_connector draws the connector and its wires.
+
+    Returns:
+        tuple: The connector's (x, y, width, height) and the (left, right) x
+               of each wire, left to right.
+    """
+    scale = height / REFERENCE_HEIGHT
+    wire_width = max(2, int(18 * scale))
+    wire_gap = max(1, int(10 * scale))
+    connector_width = num_wires * (wire_width + wire_gap) + int(60 * scale)
+    connector_x = width // 2 - connector_width // 2
+    connector_y = int(height * 0.55)
+    wire_x = connector_x + int(30 * scale) + np.arange(num_wires) * (wire_width + wire_gap)
+    wires = [(int(x), int(x) + wire_width) for x in wire_x]
+    return (connector_x, connector_y, connector_width, int(height * 0.1)), wires
+
+def lighting_gain(width, lighting=1.0, gradient=0.0):
+    """
+    Returns the brightness gain of every image column (see
+    make_synthetic_connector).
+    """
+    return lighting * np.linspace(1 - gradient, 1 + gradient, width)
+
+def make_synthetic_connector(width, height, wire_colors=WIRE_COLORS, seed=0, noise=4.0, blur=3, lighting=1.0, gradient=0.0):
+    """
+    Draws a dark connector block with vertical wires leaving it upwards, roughly
+    the way the fixture presents a connector to the camera.
+
+    Args:
+        width (int): Image width in pixels.
+        height (int): Image height in pixels.
+        wire_colors (list): BGR color of each wire, left to right.
+        seed (int): Seed for the sensor noise.
+        noise (float): Standard deviation of the Gaussian sensor noise.
+        blur (int): Size of the Gaussian blur kernel (odd), 0 or 1 for none.
+        lighting (float): Overall brightness gain (1.0 leaves colors as drawn).
+        gradient (float): Brightness falloff across the image: the gain runs
+                          from lighting * (1 - gradient) on the left to
+                          lighting * (1 + gradient) on the right.
+
+    Returns:
+        np.array: The BGR image.
+    """
+    rng = np.random.default_rng(seed)
+    image = np.full((height, width, 3), BACKGROUND_COLOR, np.uint8)
+
+    (connector_x, connector_y, connector_width, connector_height), wires = connector_layout(width, height, len(wire_colors))
+    cv2.rectangle(image, (connector_x, connector_y), (connector_x + connector_width, connector_y + connector_height), CONNECTOR_COLOR, -1)
+    for color, (left, right) in zip(wire_colors, wires):
+        cv2.rectangle(image, (left, 0), (right, connector_y), color, -1)
+
+    image = image.astype(np.float64)
+    if lighting != 1.0 or gradient:
+        image *= lighting_gain(width, lighting, gradient)[None, :, None]
+    if noise:
+        image += rng.normal(0, noise, image.shape)
+    image = np.clip(image, 0, 255).astype(np.uint8)
+    if blur and blur > 1:
+        image = cv2.GaussianBlur(image, (blur, blur), 0)
+    return image
+
+# Smallest difference in gray level between a wire and the background. The
+# detector finds wire edges on the grayscale image, so a wire as bright as the
+# background is invisible to it, on the bench as much as in these images.
+MIN_BACKGROUND_CONTRAST = 40
+
+def gray_level(color):
+    blue, green, red = color
+    return 0.114 * blue + 0.587 * green + 0.299 * red
+
+def random_wire_colors(num_wires, rng):
+    """
+    Picks num_wires BGR colors whose channels are drawn from a few
+    well-separated levels, as real wire insulation is, keeping only colors
+    that stand out from the background in grayscale.
+    """
+    levels = np.array([0, 90, 180, 230])
+    background = gray_level(BACKGROUND_COLOR)
+    colors = []
+    while len(colors) < num_wires:
+        color = tuple(int(value) for value in rng.choice(levels, 3))
+        if abs(gray_level(color) - background) >= MIN_BACKGROUND_CONTRAST:
+            colors.append(color)
+    return colors
+
+def rendered_wire_colors(width, height, wire_colors, lighting=1.0, gradient=0.0):
+    """
+    Returns the colors the wires of make_synthetic_connector appear in, after
+    the lighting and gradient gain (taken at each wire's center), which is
+    what detection on the image should find.
+    """
+    gain = lighting_gain(width, lighting, gradient)
+    _, wires = connector_layout(width, height, len(wire_colors))
+    return [
+        tuple(int(value) for value in np.clip(np.round(np.asarray(color) * gain[(left + right) // 2]), 0, 255))
+        for color, (left, right) in zip(wire_colors, wires)
+    ]
+
+def synthetic_params(height, params=None):
+    """
+    Returns detection parameters for synthetic images of the given height:
+    params (the defaults if None) with their pixel sizes scaled to the size
+    the connector is drawn at (see getsequence.scale_params).
+    """
+    return scale_params(params, height / REFERENCE_HEIGHT)
+
+def synthetic_set(count, width, height, num_wires=None, seed=0, **image_options):
+    """
+    Generates a labelled set of synthetic captures.
+
+    Args:
+        count (int): Number of images.
+        width (int): Image width in pixels.
+        height (int): Image height in pixels.
+        num_wires (int, optional): Wires per connector; random (2-8) if None.
+        seed (int): Seed for colors, wire counts and noise.
+        **image_options: noise, blur, lighting and gradient, passed on to
+                         make_synthetic_connector.
+
+    Yields:
+        tuple: (name, BGR image, list of the true BGR wire colors as they
+               appear in the image, see rendered_wire_colors).
+    """
+    rng = np.random.default_rng(seed)
+    lighting = image_options.get("lighting", 1.0)
+    gradient = image_options.get("gradient", 0.0)
+    for index in range(count):
+        wires = num_wires if num_wires is not None else int(rng.integers(2, 9))
+        colors = random_wire_colors(wires, rng)
+        image = make_synthetic_connector(width, height, colors, seed=seed + index, **image_options)
+        yield f"synthetic_{index:04d}", image, rendered_wire_colors(width, height, colors, lighting, gradient)
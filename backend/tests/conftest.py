@@ -0,0 +1,6 @@
+import os
+import sys
+
+# The backend modules import each other as top-level modules (they are bundled
+# one script at a time by PyInstaller), so the tests import them the same way.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
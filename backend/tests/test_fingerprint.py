@@ -0,0 +1,92 @@
+"""
+The fingerprint fast path (getsequence.quick_sequence, compare.quick_compare)
+may only decide a pass when full detection would have passed too; anything
+that does not line up with the fingerprint falls back to full detection.
+
+Run with: python -m pytest backend/tests
+"""
+import numpy as np
+import cv2
+import pytest
+import getsequence
+from getsequence import get_single_sequence, sequence_fingerprint, quick_sequence
+from compare import compare_single
+from synthetic import make_synthetic_connector, BACKGROUND_COLOR
+
+COLORS = [(90, 90, 90), (0, 0, 0), (230, 90, 90), (230, 230, 230)]
+
+@pytest.fixture(scope="module")
+def reference():
+    image = make_synthetic_connector(1920, 1080, COLORS)
+    wire_count, colors = get_single_sequence(image)
+    assert wire_count == len(COLORS)
+    return image, (wire_count, colors), sequence_fingerprint(image)
+
+def capture(colors=COLORS, seed=1):
+    return make_synthetic_connector(1920, 1080, colors, seed=seed)
+
+def test_fingerprint_comes_from_detection(monkeypatch):
+    calls = []
+    segment_connector = getsequence.segment_connector
+    monkeypatch.setattr(getsequence, "segment_connector", lambda *args, **kwargs: calls.append(1) or segment_connector(*args, **kwargs))
+    image = capture()
+    response = getsequence.handle_request({"input": [image], "wireType": "singlewire", "fingerprint": True})
+    assert len(calls) == 1
+    assert response["fingerprint"] == [sequence_fingerprint(image)]
+
+def test_clean_pass_matches_full_detection(reference):
+    _, expected, fingerprint = reference
+    image = capture()
+    assert quick_sequence(image, fingerprint) == get_single_sequence(image)
+    result = compare_single(expected, image, fingerprint=[fingerprint])
+    assert result["fast_path"] and result["match"]
+    assert result["match"] == compare_single(expected, image)["match"]
+
+@pytest.mark.parametrize("colors", [
+    [COLORS[1], COLORS[0]] + COLORS[2:],
+    COLORS[:2] + [BACKGROUND_COLOR] + COLORS[3:],
+])
+def test_swapped_or_missing_wire_falls_back(reference, colors):
+    _, expected, fingerprint = reference
+    result = compare_single(expected, capture(colors), fingerprint=[fingerprint])
+    assert not result["fast_path"] and not result["match"]
+
+def test_shifted_wires_fall_back(reference):
+    _, expected, fingerprint = reference
+    image = np.roll(capture(), 40, axis=1)
+    assert quick_sequence(image, fingerprint) is None
+    result = compare_single(expected, image, fingerprint=[fingerprint])
+    assert not result["fast_path"]
+    assert result["match"] == compare_single(expected, image)["match"]
+
+def test_different_frame_size_falls_back(reference):
+    _, expected, fingerprint = reference
+    image = cv2.resize(capture(), (1280, 720))
+    assert quick_sequence(image, fingerprint) is None
+    assert not compare_single(expected, image, fingerprint=[fingerprint])["fast_path"]
+
+@pytest.mark.parametrize("change", [
+    lambda fingerprint: fingerprint.pop("windows"),
+    lambda fingerprint: fingerprint.pop("roi"),
+    lambda fingerprint: fingerprint.update(roi="oops"),
+    lambda fingerprint: fingerprint.update(roi=[0, 0, 0, 0]),
+    lambda fingerprint: fingerprint.update(roi=[2000, 0, 100, 100]),
+    lambda fingerprint: fingerprint.update(line_y=None),
+    lambda fingerprint: fingerprint.update(line_y=10000),
+    lambda fingerprint: fingerprint.update(windows=[[1, 2, 3]]),
+    lambda fingerprint: fingerprint.update(frame=None),
+])
+def test_malformed_fingerprint_falls_back(reference, change):
+    _, expected, fingerprint = reference
+    fingerprint = dict(fingerprint)
+    change(fingerprint)
+    image = capture()
+    assert quick_sequence(image, fingerprint) is None
+    result = compare_single(expected, image, fingerprint=[fingerprint])
+    assert not result["fast_path"] and result["match"]
+
+def test_malformed_fingerprint_list_falls_back(reference):
+    _, expected, _ = reference
+    for fingerprint in ([None], ["oops"], [{}], [{"windows": []}]):
+        result = compare_single(expected, capture(), fingerprint=fingerprint)
+        assert not result["fast_path"] and result["match"]
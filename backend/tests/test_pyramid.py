@@ -0,0 +1,47 @@
+"""
+Coarse-to-fine detection (pyramid_level > 0) must find the same sequences as
+detection at full resolution where full-resolution segmentation is reliable,
+and must not be right less often where it is not.
+
+Run with: python -m pytest backend/tests
+"""
+import pytest
+from getsequence import get_single_sequence, scale_kernel_size, scale_box
+from synthetic import synthetic_set
+
+def test_scaled_kernels_stay_odd():
+    for size in (3, 5, 7, 9, 21):
+        for scale in (1, 2, 4, 8):
+            assert scale_kernel_size(size, scale) % 2 == 1
+
+def test_scale_box_covers_coarse_box():
+    # 1081 rows / 1921 columns downscaled by 2 drop the last row and column
+    assert scale_box((10, 20, 30, 40), (540, 960), (1081, 1921)) == (20, 40, 61, 81)
+    assert scale_box((0, 0, 960, 540), (540, 960), (1081, 1921)) == (0, 0, 1921, 1081)
+    assert scale_box((10, 20, 30, 40), (1080, 1920), (1080, 1920)) == (10, 20, 30, 40)
+
+# Conditions under which full-resolution segmentation is reliable; the
+# pyramid levels must find the same sequence there.
+CONDITIONS = [{}, {"gradient": 0.3}, {"noise": 10.0}, {"blur": 0}]
+
+# Under dim lighting segmentation is unstable at every level: full resolution
+# often keeps only part of the connector and the coarse levels sometimes fall
+# back to the whole frame. No level matches another there, so the levels are
+# only required to be right at least as often as full resolution.
+DIM_CONDITIONS = [{"lighting": 0.7}]
+
+@pytest.mark.parametrize("options", CONDITIONS)
+def test_pyramid_levels_match_full_resolution(options):
+    for _, image, colors in synthetic_set(12, 1920, 1080, **options):
+        expected = get_single_sequence(image)
+        assert expected[0] == len(colors)
+        for level in (1, 2):
+            assert get_single_sequence(image, pyramid_level=level) == expected, level
+
+@pytest.mark.parametrize("options", DIM_CONDITIONS)
+def test_pyramid_levels_are_right_as_often_in_dim_light(options):
+    images = list(synthetic_set(12, 1920, 1080, **options))
+    full_correct = sum(get_single_sequence(image)[0] == len(colors) for _, image, colors in images)
+    for level in (1, 2):
+        level_correct = sum(get_single_sequence(image, pyramid_level=level)[0] == len(colors) for _, image, colors in images)
+        assert level_correct >= full_correct, level
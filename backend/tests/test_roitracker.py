@@ -0,0 +1,83 @@
+"""
+RoiTracker must follow a connector that moved a little, and report a miss
+(so the caller segments again) when it moved too far, the capture changed
+size or the region is due for a refresh. handle_stats_request reports and
+resets the per-camera counts.
+
+Run with: python -m pytest backend/tests
+"""
+import numpy as np
+import cv2
+import pytest
+from getsequence import locate_connector_roi
+from roitracker import RoiTracker, DEFAULT_MAX_SHIFT, get_tracker, tracker_stats, reset_trackers, handle_stats_request
+from synthetic import synthetic_set
+
+@pytest.fixture(scope="module")
+def capture():
+    _, image, _ = next(iter(synthetic_set(1, 1280, 720)))
+    _, box = locate_connector_roi(image)
+    return image, box
+
+@pytest.fixture
+def trackers():
+    reset_trackers()
+    yield
+    reset_trackers()
+
+def tracker_on(image, box, **options):
+    tracker = RoiTracker(**options)
+    tracker.update(image, box)
+    return tracker
+
+def test_small_shift_is_a_hit_and_the_box_follows(capture):
+    image, (x, y, width, height) = capture
+    tracker = tracker_on(image, (x, y, width, height))
+    assert tracker.track(image) == (x, y, width, height)
+    assert tracker.track(np.roll(image, 12, axis=1)) == (x + 12, y, width, height)
+    assert (tracker.hits, tracker.misses) == (2, 0)
+    assert tracker.last_correlation >= tracker.min_correlation
+
+@pytest.mark.parametrize("shift", [2 * DEFAULT_MAX_SHIFT, 200])
+def test_large_shift_is_a_miss(capture, shift):
+    image, box = capture
+    tracker = tracker_on(image, box)
+    assert tracker.track(np.roll(image, shift, axis=1)) is None
+    assert (tracker.hits, tracker.misses) == (0, 1)
+
+def test_size_change_is_a_miss(capture):
+    image, box = capture
+    tracker = tracker_on(image, box)
+    assert tracker.track(cv2.resize(image, (960, 540))) is None
+    assert (tracker.hits, tracker.misses) == (0, 1)
+
+def test_refresh_interval_forces_a_miss(capture):
+    image, box = capture
+    tracker = tracker_on(image, box, refresh_every=3)
+    assert [tracker.track(image) for _ in range(4)] == [box, box, box, None]
+    tracker.update(image, box)
+    assert tracker.track(image) == box
+    assert (tracker.hits, tracker.misses) == (4, 1)
+
+def test_nothing_remembered_is_a_miss(capture):
+    image, box = capture
+    tracker = RoiTracker()
+    assert tracker.track(image) is None
+    tracker.update(image, box)
+    tracker.reset()
+    assert tracker.track(image) is None
+    assert (tracker.hits, tracker.misses) == (0, 2)
+
+def test_stats_request_with_reset_clears_the_counts(capture, trackers):
+    image, box = capture
+    tracker = get_tracker("station1/front")
+    assert get_tracker("station1/front") is tracker
+    tracker.track(image)
+    tracker.update(image, box)
+    tracker.track(image)
+
+    assert handle_stats_request({})["trackers"]["station1/front"]["hits"] == 1
+    stats = handle_stats_request({"reset": True})["trackers"]["station1/front"]
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+    assert tracker_stats() == {}
+    assert get_tracker("station1/front").stats() == {"hits": 0, "misses": 0, "last_correlation": None}
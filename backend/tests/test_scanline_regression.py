@@ -0,0 +1,183 @@
+"""
+Regression test for the vectorized scanline pipeline (wires_from_edges with
+find_edge_segments, pair_edge_segments and sample_wire_colors): its results
+must be identical to the original per-pixel loop of get_single_sequence, kept
+below as legacy_scanline_wires.
+
+The request asked for recorded captures, but none are checked into the
+repository, so the comparison runs on random edge rows and on synthetic
+captures (see regression_images) instead.
+
+Run with: python -m pytest backend/tests
+"""
+import numpy as np
+import cv2
+import pytest
+from getsequence import (
+    find_edge_segments, find_edge_segments_rows, wires_from_edges,
+    crop_connector_roi, get_single_sequence,
+)
+from synthetic import make_synthetic_connector, synthetic_set
+
+def legacy_scanline_wires(img, edges, sampling_line_y=200, min_segment_width=1, sample_offset=3,
+                          sample_width=7, sample_strip_height=7, min_wire_body_width=8, min_wire_spacing=2):
+    """
+    Phase 4 of get_single_sequence before it was vectorized, unchanged apart
+    from taking the edge map and parameters as arguments.
+    """
+    img_height, img_width = img.shape[:2]
+    sampling_line_y = max(0, min(sampling_line_y, img_height - 1))
+
+    is_on_edge_segment = False
+    segment_start_x = -1
+    detected_edge_segments_x = []
+
+    for x in range(img_width):
+        edge_pixel_value = edges[sampling_line_y, x]
+        if edge_pixel_value > 0:
+            if not is_on_edge_segment:
+                is_on_edge_segment = True
+                segment_start_x = x
+        else:
+            if is_on_edge_segment:
+                segment_end_x = x - 1
+                segment_width = segment_end_x - segment_start_x + 1
+                if segment_width >= min_segment_width:
+                    detected_edge_segments_x.append((segment_start_x, segment_end_x))
+                is_on_edge_segment = False
+                segment_start_x = -1
+
+    if is_on_edge_segment:
+        segment_end_x = img_width - 1
+        segment_width = segment_end_x - segment_start_x + 1
+        if segment_width >= min_segment_width:
+            detected_edge_segments_x.append((segment_start_x, segment_end_x))
+
+    detected_edge_segments_x.sort(key=lambda item: item[0])
+
+    wire_count = 0
+    detected_wires_info = []
+    last_sampled_wire_end_x = -min_wire_spacing
+
+    i = 0
+    while i < len(detected_edge_segments_x):
+        left_edge_start, left_edge_end = detected_edge_segments_x[i]
+        potential_right_edge_index = -1
+        for j in range(i + 1, len(detected_edge_segments_x)):
+            right_edge_start, right_edge_end = detected_edge_segments_x[j]
+            distance_between_edges = right_edge_start - left_edge_end - 1
+            potential_wire_body_width = right_edge_start - left_edge_end + 1
+
+            if (right_edge_start > left_edge_end and
+                distance_between_edges >= 0 and distance_between_edges < min_wire_body_width * 3 and
+                potential_wire_body_width > min_wire_body_width and
+                left_edge_start > last_sampled_wire_end_x + min_wire_spacing):
+                potential_right_edge_index = j
+                break
+
+        if potential_right_edge_index != -1:
+            right_edge_start, right_edge_end = detected_edge_segments_x[potential_right_edge_index]
+            wire_body_center_x = (left_edge_start + right_edge_end) // 2
+            sample_start_x = max(left_edge_end + 1, wire_body_center_x - sample_width // 2)
+            sample_end_x = min(right_edge_start - 1, wire_body_center_x + sample_width // 2)
+
+            if sample_start_x > sample_end_x:
+                sample_start_x = left_edge_end + sample_offset
+                sample_end_x = sample_start_x + sample_width
+                sample_end_x = min(sample_end_x, img_width - 1)
+                if sample_start_x > sample_end_x:
+                    i = potential_right_edge_index + 1
+                    continue
+
+            sample_start_x = max(0, sample_start_x)
+            sample_end_x = min(img_width - 1, sample_end_x)
+            sample_top_y = max(0, sampling_line_y - sample_strip_height)
+            sample_bottom_y = min(img_height - 1, sampling_line_y + sample_strip_height)
+
+            if sample_top_y >= sample_bottom_y or sample_start_x >= sample_end_x:
+                i = potential_right_edge_index + 1
+                continue
+
+            color_sample_region = img[sample_top_y : sample_bottom_y + 1, sample_start_x : sample_end_x + 1]
+
+            if color_sample_region.size > 0:
+                average_color_bgr = np.mean(color_sample_region, axis=(0, 1)).astype(np.uint8).tolist()
+                detected_wires_info.append(tuple(average_color_bgr))
+                wire_count += 1
+
+                last_sampled_wire_end_x = right_edge_end
+                i = potential_right_edge_index + 1
+            else:
+                i = potential_right_edge_index + 1
+
+        else:
+            i += 1
+
+    return wire_count, detected_wires_info
+
+def as_plain(sequence):
+    wire_count, colors = sequence
+    return wire_count, [tuple(int(value) for value in color) for color in colors]
+
+def random_edge_rows(count, seed):
+    rng = np.random.default_rng(seed)
+    for _ in range(count):
+        width = int(rng.integers(1, 400))
+        height = int(rng.integers(1, 40))
+        # Runs of edge pixels of random length and density, as Canny produces.
+        density = rng.uniform(0.02, 0.6)
+        row = (rng.random(width) < density).astype(np.uint8) * 255
+        if rng.random() < 0.5:
+            row = np.repeat(row, int(rng.integers(1, 4)))[:width]
+        edges = np.zeros((height, width), np.uint8)
+        line_y = int(rng.integers(0, height))
+        edges[line_y] = row
+        img = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+        params = {
+            "sampling_line_y": line_y,
+            "min_segment_width": int(rng.integers(1, 4)),
+            "sample_offset": int(rng.integers(0, 6)),
+            "sample_width": int(rng.integers(1, 12)),
+            "sample_strip_height": int(rng.integers(0, 10)),
+            "min_wire_body_width": int(rng.integers(1, 16)),
+            "min_wire_spacing": int(rng.integers(0, 6)),
+        }
+        yield img, edges, params
+
+def regression_images():
+    """
+    Synthetic captures at several sizes and conditions, their inverted
+    versions (bright connector on a dark background) and pure noise.
+    """
+    for width, height in ((640, 480), (1280, 720), (1920, 1080)):
+        for seed, options in enumerate(({}, {"noise": 10.0}, {"lighting": 0.7, "gradient": 0.3}, {"blur": 0})):
+            for name, image, _ in synthetic_set(3, width, height, seed=seed, **options):
+                yield image
+                yield cv2.bitwise_not(image)
+    rng = np.random.default_rng(0)
+    for _ in range(6):
+        yield rng.integers(0, 256, (480, 640, 3), dtype=np.uint8)
+    yield make_synthetic_connector(1920, 1080)
+
+def test_random_edge_rows_match_legacy_loop():
+    for img, edges, params in random_edge_rows(3000, seed=1):
+        wire_count, colors, _ = wires_from_edges(img, edges, params=params)
+        assert as_plain((wire_count, colors)) == as_plain(legacy_scanline_wires(img, edges, **params)), params
+
+def test_find_edge_segments_rows_matches_single_rows():
+    for img, edges, params in random_edge_rows(300, seed=2):
+        rows = find_edge_segments_rows(edges, params["min_segment_width"])
+        for row, (starts, ends) in zip(edges, rows):
+            expected_starts, expected_ends = find_edge_segments(row, params["min_segment_width"])
+            assert starts.tolist() == expected_starts.tolist()
+            assert ends.tolist() == expected_ends.tolist()
+
+@pytest.mark.parametrize("index,image", list(enumerate(regression_images())))
+def test_images_match_legacy_loop(index, image):
+    roi = crop_connector_roi(image)
+    if roi is None:
+        expected = (0, [])
+    else:
+        edges = cv2.Canny(cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY), 30, 90)
+        expected = legacy_scanline_wires(roi, edges)
+    assert as_plain(get_single_sequence(image)) == as_plain(expected)
@@ -0,0 +1,112 @@
+"""
+Regression test for connector segmentation (phases 1-3 of detection,
+getsequence.segment_connector and locate_connector_roi): the connector box
+and the cropped region must be identical to those of the original
+implementation, kept below as legacy_connector_boxes, on the same images as
+the scanline regression test plus a few that take the other polarity branches
+(see polarity_images).
+
+Run with: python -m pytest backend/tests
+"""
+import numpy as np
+import cv2
+import pytest
+from getsequence import segment_connector, locate_connector_roi
+from test_scanline_regression import regression_images
+
+def legacy_connector_boxes(image):
+    """
+    Phases 1-3 of crop_connector_roi before segmentation was restructured, at
+    full resolution and unchanged apart from returning the connector's box and
+    the cropped region's box instead of the crop.
+    """
+    original_image = image.copy()
+    gray_image = cv2.cvtColor(original_image, cv2.COLOR_BGR2GRAY)
+    blurred_gray = cv2.GaussianBlur(gray_image, (7, 7), 0)
+
+    binary_image = cv2.adaptiveThreshold(
+        blurred_gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+        cv2.THRESH_BINARY, 21, 5
+    )
+
+    kernel = np.ones((7, 7), np.uint8)
+    closed_mask = cv2.morphologyEx(binary_image, cv2.MORPH_CLOSE, kernel, iterations=2)
+    opened_mask = cv2.morphologyEx(closed_mask, cv2.MORPH_OPEN, kernel, iterations=1)
+
+    mean_opened_mask_val = np.mean(opened_mask)
+    if mean_opened_mask_val > 127:
+        binary_image = cv2.adaptiveThreshold(
+            blurred_gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+            cv2.THRESH_BINARY_INV, 21, 5
+        )
+        closed_mask = cv2.morphologyEx(binary_image, cv2.MORPH_CLOSE, kernel, iterations=2)
+        opened_mask = cv2.morphologyEx(closed_mask, cv2.MORPH_OPEN, kernel, iterations=1)
+
+    contours, _ = cv2.findContours(opened_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    if contours:
+        largest_contour = max(contours, key=cv2.contourArea)
+        temp_mask_for_contour_check = np.zeros(opened_mask.shape, dtype=np.uint8)
+        cv2.drawContours(temp_mask_for_contour_check, [largest_contour], -1, 255, cv2.FILLED)
+        mean_val_in_contour = cv2.mean(opened_mask, mask=temp_mask_for_contour_check)[0]
+        if mean_val_in_contour < 127:
+            connector_mask = cv2.bitwise_not(opened_mask)
+        else:
+            connector_mask = opened_mask
+    else:
+        return None, None
+
+    contours_for_bbox, _ = cv2.findContours(connector_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    if not contours_for_bbox:
+        return None, None
+
+    largest_contour_for_bbox = max(contours_for_bbox, key=cv2.contourArea)
+    x, y, w, h = cv2.boundingRect(largest_contour_for_bbox)
+
+    expand_factor_y_up = 2.5
+    expand_factor_y_down = 0.5
+    expand_factor_x = 0.3
+
+    new_y = max(0, int(y - h * expand_factor_y_up))
+    new_height = min(original_image.shape[0], int(y + h + h * expand_factor_y_down)) - new_y
+    new_x = max(0, int(x - w * expand_factor_x))
+    new_width = min(original_image.shape[1], int(x + w + w * expand_factor_x)) - new_x
+
+    new_x = max(0, new_x)
+    new_y = max(0, new_y)
+    new_width = min(new_width, original_image.shape[1] - new_x)
+    new_height = min(new_height, original_image.shape[0] - new_y)
+
+    if new_width <= 0 or new_height <= 0:
+        roi_box = (0, 0, original_image.shape[1], original_image.shape[0])
+    else:
+        roi_box = (new_x, new_y, new_width, new_height)
+    return (x, y, w, h), roi_box
+
+def polarity_images():
+    """
+    Images on which segmentation takes the branches the captures never take:
+    wide stripes leave the thresholded mask mostly black (no inversion), a
+    dark square outline makes the largest contour dark (final inversion), and
+    a thin one leaves no contour at all.
+    """
+    for white, black in ((8, 14), (10, 16)):
+        image = np.zeros((480, 640, 3), np.uint8)
+        for x in range(0, 640, white + black):
+            image[:, x : x + white] = 255
+        yield image
+        yield cv2.bitwise_not(image)
+    for thickness in (3, 5, 8):
+        image = np.full((480, 640, 3), 160, np.uint8)
+        cv2.rectangle(image, (150, 100), (450, 400), (30, 30, 30), thickness)
+        yield image
+
+@pytest.mark.parametrize("index,image", list(enumerate([*regression_images(), *polarity_images()])))
+def test_segmentation_matches_legacy(index, image):
+    expected_box, expected_roi_box = legacy_connector_boxes(image)
+    box = segment_connector(cv2.cvtColor(image, cv2.COLOR_BGR2GRAY))
+    roi, roi_box = locate_connector_roi(image)
+    assert box == expected_box
+    assert roi_box == expected_roi_box
+    if roi_box is not None:
+        x, y, width, height = roi_box
+        assert np.array_equal(roi, image[y : y + height, x : x + width])
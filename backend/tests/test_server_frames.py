@@ -0,0 +1,55 @@
+"""
+An invalid request followed by binary frames must still have its frames
+consumed, so the next request on the stream is read correctly.
+
+Run with: python -m pytest backend/tests
+"""
+import io
+import json
+import numpy as np
+import cv2
+import pytest
+from getsequence import get_single_sequence
+from server import serve
+from synthetic import synthetic_set
+
+def png_frame():
+    return cv2.imencode(".png", np.zeros((8, 8, 3), np.uint8))[1].tobytes()
+
+def request_with_frames(request, frames):
+    request["frames"] = [len(frame) for frame in frames]
+    return json.dumps(request).encode() + b"\n" + b"".join(frames)
+
+def run(stream_bytes):
+    output = io.StringIO()
+    serve(io.BytesIO(stream_bytes), output)
+    return [json.loads(line) for line in output.getvalue().splitlines()]
+
+@pytest.mark.parametrize("request_body", [
+    {"id": 1, "command": "get-sequence"},
+    {"id": 1, "command": "get-sequence", "payload": {"input": [{"frame": 0}, {"frame": 1}], "decode": "bogus"}},
+    {"id": 1, "command": "bogus", "payload": {"input": [{"frame": 0}, {"frame": 1}]}},
+])
+def test_invalid_request_consumes_its_frames(request_body):
+    stream = request_with_frames(request_body, [png_frame(), png_frame()])
+    stream += json.dumps({"id": 2, "command": "roi-stats", "payload": {}}).encode() + b"\n"
+    responses = run(stream)
+    assert [(response["id"], response["ok"]) for response in responses] == [(1, False), (2, True)]
+
+def test_batch_item_with_bad_frame_fails_alone():
+    _, image, colors = next(iter(synthetic_set(1, 1280, 720)))
+    wire_count, detected = get_single_sequence(image)
+    valid = cv2.imencode(".png", image)[1].tobytes()
+    request = {"id": 1, "command": "compare-batch", "payload": {
+        "wireType": "singlewire",
+        "wire_count": [wire_count],
+        "sequence": json.dumps([json.dumps([list(map(int, color)) for color in detected])]),
+        "items": [{"input": [{"frame": 0}]}, {"input": [{"frame": 9}]}, {"input": [{"frame": 1}]}],
+    }}
+    responses = run(request_with_frames(request, [valid, b"not an image"]))
+    assert wire_count == len(colors)
+    assert responses[0]["ok"]
+    results = responses[0]["result"]["results"]
+    assert results[0]["match"] and "error" not in results[0]
+    assert results[1]["error"] == "Image refers to binary frame 9, but the request has 2 frame(s)"
+    assert results[2]["error"] == "Could not decode input image 0"
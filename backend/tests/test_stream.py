@@ -0,0 +1,47 @@
+"""
+stream.py on a short image sequence of two connectors, read as fast as
+possible: each connector must be reported once as a stable sequence, followed
+by the end event with the frame counts.
+
+Run with: python -m pytest backend/tests
+"""
+import io
+import json
+import cv2
+from getsequence import get_single_sequence
+from stream import open_capture, stream_sequences, sequences_agree
+from synthetic import synthetic_set
+
+# Enough frames per connector that STABLE_FRAMES of them are processed even
+# when the reader, which runs without a frame-rate limit, gets ahead and some
+# are skipped.
+FRAMES_PER_CONNECTOR = 10
+STABLE_FRAMES = 3
+
+def test_stream_reports_each_connector_once(tmp_path):
+    connectors = [image for _, image, _ in synthetic_set(2, 1280, 720, seed=3)]
+    expected = [get_single_sequence(image) for image in connectors]
+    assert expected[0][0] > 0 and expected[1][0] > 0
+    assert not sequences_agree(expected[0], expected[1])
+    for index in range(2 * FRAMES_PER_CONNECTOR):
+        cv2.imwrite(str(tmp_path / f"{index:04d}.png"), connectors[index // FRAMES_PER_CONNECTOR])
+
+    output = io.StringIO()
+    capture = open_capture(str(tmp_path / "%04d.png"))
+    try:
+        end = stream_sequences(capture, output, fps=0, stable_frames=STABLE_FRAMES, realtime=False)
+    finally:
+        capture.release()
+
+    events = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert events[-1] == end
+    assert end["event"] == "end"
+    assert end["frames_read"] == 2 * FRAMES_PER_CONNECTOR
+    assert end["frames_processed"] + end["frames_skipped"] == end["frames_read"]
+    sequences = events[:-1]
+    assert [event["event"] for event in sequences] == ["sequence", "sequence"]
+    assert end["sequences"] == 2
+    assert sequences[0]["frame"] < FRAMES_PER_CONNECTOR <= sequences[1]["frame"]
+    for event, (wire_count, colors) in zip(sequences, expected):
+        assert event["wires"] == wire_count
+        assert sequences_agree((event["wires"], event["sequence"]), (wire_count, colors))
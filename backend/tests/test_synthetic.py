@@ -0,0 +1,34 @@
+"""
+The labels of synthetic sets must be the colors the wires appear in, and the
+scaled parameters must let the detector read every resolution the benchmark
+and the tuner generate.
+
+Run with: python -m pytest backend/tests
+"""
+import numpy as np
+import pytest
+from getsequence import get_single_sequence, DEFAULT_PARAMS
+from synthetic import synthetic_set, connector_layout, synthetic_params
+from compare import compare_sequences
+
+@pytest.mark.parametrize("options", [{}, {"lighting": 0.7}, {"lighting": 1.2, "gradient": 0.3}])
+def test_labels_are_the_rendered_colors(options):
+    for _, image, colors in synthetic_set(4, 1280, 720, noise=0, blur=0, **options):
+        (_, connector_y, _, _), wires = connector_layout(1280, 720, len(colors))
+        for color, (left, right) in zip(colors, wires):
+            center = image[connector_y // 2, (left + right) // 2].astype(int)
+            assert np.abs(center - color).max() <= 1
+
+def test_dim_set_matches_where_the_count_is_right():
+    for _, image, colors in synthetic_set(10, 1920, 1080, lighting=0.7):
+        detected = get_single_sequence(image)
+        if detected[0] == len(colors):
+            assert compare_sequences([("Front", (len(colors), colors), detected)])["match"]
+
+def test_synthetic_params_scale_with_height():
+    assert synthetic_params(1080) == DEFAULT_PARAMS
+    params = synthetic_params(2160)
+    assert params["sampling_line_y"] == 2 * DEFAULT_PARAMS["sampling_line_y"]
+    assert all(params[name] % 2 == 1 for name in ("blur_size", "threshold_block_size", "morph_size"))
+    for _, image, colors in synthetic_set(4, 3840, 2160):
+        assert get_single_sequence(image, params=params)[0] == len(colors)
@@ -0,0 +1,344 @@
+import os
+import json
+import time
+import random
+import argparse
+import itertools
+from collections import OrderedDict
+import cv2
+from getsequence import DEFAULT_PARAMS, SCANLINE_SPACING, detection_params, segment_connector, scale_box, expand_connector_box, wires_from_edges
+from compare import compare_sequences
+from executor import map_ordered, set_worker_count
+from imagedecode import decode_image_file
+from profiles import profile_dir, save_profile
+from synthetic import synthetic_set
+from benchmark import DECODE_RESOLUTIONS, IMAGE_EXTENSIONS
+
+# Candidate values of every detection parameter (see getsequence.DEFAULT_PARAMS).
+SEARCH_SPACE = {
+    "blur_size": [3, 5, 7, 9],
+    "threshold_block_size": [11, 21, 31, 41],
+    "threshold_offset": [2, 5, 8],
+    "morph_size": [5, 7, 9],
+    "expand_factor_y_up": [1.5, 2.0, 2.5, 3.0],
+    "expand_factor_y_down": [0.25, 0.5, 0.75],
+    "expand_factor_x": [0.2, 0.3, 0.4],
+    "canny_thresh_low": [10, 20, 30, 45, 60],
+    "canny_thresh_high": [60, 90, 120, 160],
+    "sampling_line_y": [120, 160, 200, 240, 280],
+    "min_segment_width": [1, 2],
+    "sample_offset": [2, 3, 4],
+    "sample_width": [3, 5, 7, 9],
+    "sample_strip_height": [3, 5, 7, 10],
+    "min_wire_body_width": [4, 6, 8, 10, 12],
+    "min_wire_spacing": [1, 2, 4],
+}
+
+# The detection pipeline in order, with the parameters each stage reads. A
+# stage's result depends on its own parameters and those of every stage before
+# it, so trials that only change a later stage reuse the earlier results.
+STAGES = (
+    ("segment", ("blur_size", "threshold_block_size", "threshold_offset", "morph_size")),
+    ("crop", ("expand_factor_y_up", "expand_factor_y_down", "expand_factor_x")),
+    ("edges", ("canny_thresh_low", "canny_thresh_high")),
+    ("wires", (
+        "sampling_line_y", "min_segment_width", "sample_offset", "sample_width",
+        "sample_strip_height", "min_wire_body_width", "min_wire_spacing",
+    )),
+)
+
+# Parameter settings kept per cached stage. Trials are ordered so that those
+# sharing earlier stages run one after the other, so a few entries suffice.
+DEFAULT_CACHE_ENTRIES = 8
+
+DEFAULT_CONNECTOR_TYPE = "default"
+
+def stage_keys(params):
+    """
+    Returns the cache key of every stage for one parameter set: the values of
+    the parameters read by that stage and all stages before it.
+    """
+    keys = []
+    values = ()
+    for _, names in STAGES:
+        values += tuple(params[name] for name in names)
+        keys.append(values)
+    return keys
+
+def label_colors(label, default_type=DEFAULT_CONNECTOR_TYPE):
+    """
+    Reads one labels.json entry: either the list of expected BGR colors or
+    {"type": connector type, "colors": [...]}.
+
+    Returns:
+        tuple: (connector type, list of BGR colors).
+    """
+    if isinstance(label, dict):
+        return label.get("type", default_type), label["colors"]
+    return default_type, label
+
+def load_labelled_set(folder, default_type=DEFAULT_CONNECTOR_TYPE):
+    """
+    Loads the labelled captures of a folder (see benchmark.load_captures),
+    grouped by connector type. Unlabelled captures are skipped.
+
+    Returns:
+        dict: Connector type -> list of (file name, BGR image, expected colors).
+    """
+    with open(os.path.join(folder, "labels.json")) as f:
+        labels = json.load(f)
+    sets = {}
+    for name in sorted(labels):
+        if not name.lower().endswith(IMAGE_EXTENSIONS):
+            continue
+        image = decode_image_file(os.path.join(folder, name))
+        if image is None:
+            print(f"Skipping unreadable capture: {name}")
+            continue
+        connector_type, colors = label_colors(labels[name], default_type)
+        sets.setdefault(connector_type, []).append((name, image, colors))
+    return sets
+
+class StageCache:
+    """
+    Runs the detection pipeline of a tuning trial on every image of a labelled
+    set, caching each stage's results by the parameters they depend on (see
+    STAGES), so a trial re-runs only the stages downstream of the first
+    parameter that differs from a cached trial.
+
+    The grayscale image at the pyramid level does not depend on any parameter
+    and is computed once.
+    """
+
+    def __init__(self, images, pyramid_level=0, max_entries=DEFAULT_CACHE_ENTRIES):
+        self.images = [image for _, image, _ in images]
+        self.scale = 2 ** pyramid_level
+        self.max_entries = max_entries
+        self.hits = {name: 0 for name, _ in STAGES[:-1]}
+        self.misses = {name: 0 for name, _ in STAGES[:-1]}
+        self._entries = {name: OrderedDict() for name, _ in STAGES[:-1]}
+        self.grays = list(map_ordered(self._gray, self.images))
+
+    def _gray(self, image):
+        if self.scale > 1:
+            image = cv2.resize(
+                image, (max(1, image.shape[1] // self.scale), max(1, image.shape[0] // self.scale)),
+                interpolation=cv2.INTER_AREA
+            )
+        return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+    def _cached(self, stage, key, compute):
+        entries = self._entries[stage]
+        if key in entries:
+            entries.move_to_end(key)
+            self.hits[stage] += 1
+            return entries[key]
+        self.misses[stage] += 1
+        entries[key] = results = compute()
+        while len(entries) > self.max_entries:
+            entries.popitem(last=False)
+        return results
+
+    def detect(self, params, num_scanlines=1):
+        """
+        Returns the (number of wires, colors) detected on every image with
+        params, as getsequence.get_single_sequence would.
+        """
+        segment_key, crop_key, edges_key, _ = stage_keys(params)
+
+        boxes = self._cached("segment", segment_key, lambda: list(map_ordered(
+            lambda gray: segment_connector(gray, self.scale, params=params), self.grays
+        )))
+
+        def crop(index):
+            if boxes[index] is None:
+                return None
+            image = self.images[index]
+            box = scale_box(boxes[index], self.grays[index].shape, image.shape)
+            x, y, width, height = expand_connector_box(box, image.shape, params)
+            roi = image[y : y + height, x : x + width]
+            return roi, cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY)
+
+        crops = self._cached("crop", crop_key, lambda: list(map_ordered(crop, range(len(self.images)))))
+
+        def edges(cropped):
+            if cropped is None:
+                return None
+            return cv2.Canny(cropped[1], params["canny_thresh_low"], params["canny_thresh_high"])
+
+        edge_maps = self._cached("edges", edges_key, lambda: list(map_ordered(edges, crops)))
+
+        def wires(index):
+            if crops[index] is None:
+                return 0, []
+            wire_count, colors, _ = wires_from_edges(crops[index][0], edge_maps[index], num_scanlines, SCANLINE_SPACING, params=params)
+            return wire_count, colors
+
+        return list(map_ordered(wires, range(len(self.images))))
+
+def score(detections, expected, color_metric=None, color_threshold=None):
+    """
+    Scores one trial against the labels.
+
+    Returns:
+        dict: "matched" (images whose wire count and every color match),
+              "count_correct" (images with the right wire count) and "images".
+    """
+    matched = count_correct = 0
+    metric_options = {"color_metric": color_metric} if color_metric else {}
+    for detected, colors in zip(detections, expected):
+        count_correct += detected[0] == len(colors)
+        matched += compare_sequences([("Front", (len(colors), colors), detected)], color_threshold=color_threshold, **metric_options)["match"]
+    return {"matched": matched, "count_correct": count_correct, "images": len(expected)}
+
+def grid_trials(names):
+    """
+    Yields every combination of the candidate values of names, varying the
+    parameters of later stages fastest so earlier stages are reused.
+    """
+    names = sorted(names, key=stage_order)
+    for values in itertools.product(*(SEARCH_SPACE[name] for name in names)):
+        yield detection_params(dict(zip(names, values)))
+
+def random_trials(names, count, seed=0):
+    """
+    Draws count random combinations of the candidate values of names, ordered
+    so that trials sharing earlier stages run one after the other.
+
+    The settings of the cached stages are drawn from a pool of about
+    sqrt(count) random settings per stage, so expensive stages such as
+    segmentation run a few times instead of once per trial, while the cheap
+    last stage is drawn freely.
+    """
+    rng = random.Random(seed)
+    pool_size = max(1, round(count ** 0.5))
+    pools = []
+    for _, stage_names in STAGES[:-1]:
+        searched = [name for name in stage_names if name in names]
+        pools.append([{name: rng.choice(SEARCH_SPACE[name]) for name in searched} for _ in range(pool_size)])
+    last_names = [name for name in STAGES[-1][1] if name in names]
+
+    trials = []
+    for _ in range(count):
+        overrides = {}
+        for pool in pools:
+            overrides.update(rng.choice(pool))
+        overrides.update({name: rng.choice(SEARCH_SPACE[name]) for name in last_names})
+        trials.append(detection_params(overrides))
+    return sorted(trials, key=lambda params: [tuple(map(str, key)) for key in stage_keys(params)])
+
+def stage_order(name):
+    for index, (_, names) in enumerate(STAGES):
+        if name in names:
+            return index
+    raise ValueError(f"Unknown detection parameter: {name}")
+
+def tune(images, trials, num_scanlines=1, pyramid_level=0, color_metric=None, color_threshold=None):
+    """
+    Runs every trial on a labelled set and returns the best parameters.
+
+    The defaults are scored first; a trial replaces the best so far only if it
+    matches more images (then gets more wire counts right), so ties keep the
+    defaults.
+
+    Args:
+        images (list): (name, BGR image, expected colors) tuples.
+        trials (iterable): Parameter sets (see grid_trials and random_trials).
+        num_scanlines (int): Scanlines per image (see get-sequence).
+        pyramid_level (int): Pyramid level for segmentation (see get-sequence).
+        color_metric (str, optional): Metric for matching colors.
+        color_threshold (float, optional): Threshold for matching colors.
+
+    Returns:
+        dict: "params" (the best parameter set), "score" and "default_score"
+              (see score), "trials" and the per-stage cache "hits" and
+              "misses".
+    """
+    expected = [colors for _, _, colors in images]
+    cache = StageCache(images, pyramid_level)
+
+    def run(params):
+        return score(cache.detect(params, num_scanlines), expected, color_metric, color_threshold)
+
+    default_score = run(DEFAULT_PARAMS)
+    best_params, best_score = DEFAULT_PARAMS, default_score
+    count = 0
+    for params in trials:
+        count += 1
+        trial_score = run(params)
+        if (trial_score["matched"], trial_score["count_correct"]) > (best_score["matched"], best_score["count_correct"]):
+            best_params, best_score = params, trial_score
+    return {
+        "params": dict(best_params),
+        "score": best_score,
+        "default_score": default_score,
+        "trials": count,
+        "cache_hits": cache.hits,
+        "cache_misses": cache.misses,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Tune the detection parameters on a labelled image set and write a profile per connector type.")
+    parser.add_argument("--captures", metavar="DIR", help="labelled captures (labels.json maps file names to colors or to {\"type\", \"colors\"})")
+    parser.add_argument("--type", default=DEFAULT_CONNECTOR_TYPE, help="connector type of synthetic images and of labels without a type")
+    parser.add_argument("--count", type=int, default=20, help="synthetic images to generate (without --captures)")
+    parser.add_argument("--resolution", default="1080p", choices=sorted(DECODE_RESOLUTIONS), help="synthetic image size")
+    parser.add_argument("--wires", type=int, help="wires per synthetic connector (default: random 2-8)")
+    parser.add_argument("--noise", type=float, default=4.0, help="sensor noise standard deviation")
+    parser.add_argument("--lighting", type=float, default=1.0, help="brightness gain")
+    parser.add_argument("--gradient", type=float, default=0.0, help="brightness falloff across the image")
+    parser.add_argument("--search", choices=("random", "grid"), default="random", help="search method (default: random)")
+    parser.add_argument("--params", help="comma-separated parameters to search (default: all; grid search needs a few)")
+    parser.add_argument("--trials", type=int, default=200, help="random search trials")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the synthetic set and the random search")
+    parser.add_argument("--scanlines", type=int, default=1, help="scanlines per image (see get-sequence)")
+    parser.add_argument("--pyramid-level", type=int, default=0, help="pyramid level for segmentation (see get-sequence)")
+    parser.add_argument("--color-metric", help="color distance metric for scoring (see compare)")
+    parser.add_argument("--color-threshold", type=float, help="color threshold for scoring (see compare)")
+    parser.add_argument("--output-dir", help="where profiles are written (default: the backend's profile folder)")
+    parser.add_argument("--workers", type=int, help="number of worker threads (default: BACKEND_WORKERS or CPU count)")
+    args = parser.parse_args()
+
+    if args.workers:
+        set_worker_count(args.workers)
+    names = args.params.split(",") if args.params else list(SEARCH_SPACE)
+    for name in names:
+        if name not in SEARCH_SPACE:
+            parser.error(f"unknown parameter: {name}")
+
+    if args.captures:
+        sets = load_labelled_set(args.captures, args.type)
+    else:
+        width, height = DECODE_RESOLUTIONS[args.resolution]
+        sets = {args.type: list(synthetic_set(
+            args.count, width, height, args.wires, args.seed,
+            noise=args.noise, lighting=args.lighting, gradient=args.gradient,
+        ))}
+
+    output_dir = args.output_dir or profile_dir()
+    for connector_type, images in sets.items():
+        trials = grid_trials(names) if args.search == "grid" else random_trials(names, args.trials, args.seed)
+        start = time.perf_counter()
+        result = tune(images, trials, args.scanlines, args.pyramid_level, args.color_metric, args.color_threshold)
+        seconds = time.perf_counter() - start
+
+        path = os.path.join(output_dir, f"{connector_type}.json")
+        save_profile(
+            path, connector_type, result["params"],
+            score=result["score"], default_score=result["default_score"],
+            search={"method": args.search, "params": names, "trials": result["trials"],
+                    "scanlines": args.scanlines, "pyramid_level": args.pyramid_level},
+            tuned_at=time.strftime("%Y-%m-%d %H:%M:%S"),
+        )
+        changed = {name: value for name, value in result["params"].items() if value != DEFAULT_PARAMS[name]}
+        print(f"{connector_type}: {result['trials']} trials on {len(images)} images in {seconds:.1f} s")
+        print(f"  matched {result['default_score']['matched']} -> {result['score']['matched']} of {len(images)}"
+              f" (wire count {result['default_score']['count_correct']} -> {result['score']['count_correct']})")
+        print(f"  changed parameters: {json.dumps(changed) if changed else 'none'}")
+        print(f"  stage cache hits/misses: " + ", ".join(
+            f"{stage} {result['cache_hits'][stage]}/{result['cache_misses'][stage]}" for stage in result["cache_hits"]
+        ))
+        print(f"  profile written to {path}")
+
+if __name__ == "__main__":
+    main()
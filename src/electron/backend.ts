@@ -0,0 +1,129 @@
+import { app } from "electron";
+import path from "path";
+import readline from "readline";
+import { spawn, ChildProcessWithoutNullStreams } from "child_process";
+import { fileURLToPath } from "url";
+
+const __filename = fileURLToPath(import.meta.url);
+const __dirname = path.dirname(__filename);
+
+type PendingRequest = {
+  server: ChildProcessWithoutNullStreams;
+  resolve: (value: any) => void;
+  reject: (reason: Error) => void;
+};
+
+let server: ChildProcessWithoutNullStreams | null = null;
+let nextRequestId = 1;
+const pending = new Map<number, PendingRequest>();
+
+function getServerPath() {
+  return app.isPackaged
+    ? path.join(process.resourcesPath, "python-bin", "server.exe")
+    : path.join(__dirname, "../python-bin/server.exe");
+}
+
+function startServer() {
+  // const pythonPath =
+  //   "C:\\Users\\Acer\\AppData\\Local\\Programs\\Python\\Python313\\python.exe";
+  // const python = spawn(pythonPath, ["backend/server.py"]);
+  const python = spawn(getServerPath());
+
+  const lines = readline.createInterface({ input: python.stdout });
+  lines.on("line", (line) => {
+    let message;
+    try {
+      message = JSON.parse(line);
+    } catch {
+      console.error(`Unexpected backend output: ${line}`);
+      return;
+    }
+    if (message.event === "ready") {
+      console.log("Backend server ready.");
+      return;
+    }
+
+    const request = pending.get(message.id);
+    if (!request) return;
+    pending.delete(message.id);
+
+    if (message.ok) {
+      request.resolve(message.result);
+    } else {
+      request.reject(new Error(`Python error: ${message.error}`));
+    }
+  });
+
+  python.stderr.on("data", (data) => {
+    console.error(`stderr: ${data}`);
+  });
+
+  // If the server dies, fail everything in flight and start fresh next time.
+  python.on("close", (code) => {
+    console.warn(`Backend server exited with code ${code}`);
+    failServer(python, `backend exited with code ${code}`);
+  });
+
+  // Spawning fails (e.g. ENOENT when server.exe is missing) and writes to a
+  // server that has died (EPIPE) surface as "error" events; without handlers
+  // they would crash the main process.
+  python.on("error", (error) => {
+    console.error(`Backend server error: ${error.message}`);
+    failServer(python, error.message);
+  });
+  python.stdin.on("error", (error) => {
+    console.error(`Backend stdin error: ${error.message}`);
+    failServer(python, error.message);
+    python.kill();
+  });
+
+  return python;
+}
+
+// Rejects the requests in flight on one server process and forgets it, so the
+// next request starts a new one. A late event from a server that was already
+// replaced leaves the new server's requests alone.
+function failServer(python: ChildProcessWithoutNullStreams, reason: string) {
+  for (const [id, request] of pending) {
+    if (request.server !== python) continue;
+    pending.delete(id);
+    request.reject(new Error(`Python error: ${reason}`));
+  }
+  if (server === python) server = null;
+}
+
+export function runBackend<T>(command: string, payload: object, frames: Buffer[] = []): Promise<T> {
+  if (!server) server = startServer();
+  const python = server;
+  const id = nextRequestId++;
+
+  return new Promise<T>((resolve, reject) => {
+    pending.set(id, { server: python, resolve, reject });
+    const request: Record<string, unknown> = { id, command, payload };
+    if (frames.length > 0) request.frames = frames.map((frame) => frame.length);
+    python.stdin.write(JSON.stringify(request) + "\n");
+    // Raw image bytes follow the request line back to back.
+    for (const frame of frames) python.stdin.write(frame);
+  });
+}
+
+// Turns base64 images / data URLs into binary frames, so the images cross the
+// pipe without the base64 overhead and the backend decodes them directly.
+export function toFrames(images: string[]) {
+  const frames = images.map((img) =>
+    Buffer.from(img.replace(/^data:image\/\w+;base64,/, ""), "base64")
+  );
+  const refs = frames.map((_frame, index) => ({ frame: index }));
+  return { refs, frames };
+}
+
+export function stopBackend() {
+  if (server) {
+    server.stdin.end();
+    server = null;
+  }
+}
+
+app.on("will-quit", () => {
+  stopBackend();
+});
@@ -23,10 +23,16 @@ export async function initializeDatabase() {
       table.text("wire_name").notNullable();
       table.text("wire_type").notNullable();
       table.text("sequence").notNullable();
+      table.text("fingerprint");
       table.text("image_front").notNullable();
       table.text("image_back");
       table.timestamp("created_at").defaultTo(db.fn.now());
     });
+  } else if (!(await db.schema.hasColumn("wires", "fingerprint"))) {
+    // Databases created before fingerprints were stored.
+    await db.schema.alterTable("wires", (table) => {
+      table.text("fingerprint");
+    });
   }
 
   const hasResults = await db.schema.hasTable("results");
@@ -4,17 +4,14 @@ import { isDev } from "./util.js";
 import { db, initializeDatabase } from "./db.js";
 import { getPreloadPath } from "./pathResolver.js";
 import fs from "fs";
-import { spawn } from "child_process";
-import { fileURLToPath } from "url";
-
-const __filename = fileURLToPath(import.meta.url);
-const __dirname = path.dirname(__filename);
+import { runBackend, toFrames } from "./backend.js";
 
 async function addItem(
   wireType: string,
   wireName: string,
   sequence: string,
-  base64Images: string[]
+  base64Images: string[],
+  fingerprint?: string
 ) {
   const imageDir = path.join(app.getPath("userData"), "images", wireType);
   if (!fs.existsSync(imageDir)) {
@@ -44,6 +41,7 @@ async function addItem(
     image_front: imagePaths[0],
     image_back: imagePaths[1] ?? null,
     sequence: sequence,
+    fingerprint: fingerprint ?? null,
   });
 
   console.log(result);
@@ -124,9 +122,9 @@ ipcMain.handle(
 //add-wire
 ipcMain.handle(
   "add-wire",
-  async (_event, { wireType, wireName, sequence, base64Images }) => {
+  async (_event, { wireType, wireName, sequence, base64Images, fingerprint }) => {
     try {
-      await addItem(wireType, wireName, sequence, base64Images);
+      await addItem(wireType, wireName, sequence, base64Images, fingerprint);
       console.log(`Inserted new item`);
     } catch (error) {
       console.error("Error inserting item:", error);
@@ -172,94 +170,28 @@ ipcMain.handle("remove-item", async (_, { table, id }) => {
 //compare item
 ipcMain.handle(
   "compare-item",
-  async (_event, { wireCount, originalSequence, imageToBeChecked, wireType }) => {
-    return new Promise((resolve, reject) => {
-      // const pythonPath =
-      //   "C:\\Users\\Acer\\AppData\\Local\\Programs\\Python\\Python313\\python.exe";
-      // const python = spawn(pythonPath, ["backend/compare.py"]);
-
-      const exePath = app.isPackaged
-        ? path.join(process.resourcesPath, "python-bin", "compare.exe")
-        : path.join(__dirname, "../python-bin/compare.exe");
-      const python = spawn(exePath);
-
-      let output = "";
-      let error = "";
-
-      // Collect stdout
-      python.stdout.on("data", (data) => {
-        output += data.toString();
-      });
-
-      // Collect stderr
-      python.stderr.on("data", (data) => {
-        error += data.toString();
-      });
-
-      // On finish
-      python.on("close", (code) => {
-        if (code === 0) {
-          const result = JSON.parse(output);
-          resolve(result); // Return Python result
-        } else {
-          reject(new Error(`Python error: ${error}`));
-        }
-      });
-
-      // Send data to Python via stdin
-      const payload = JSON.stringify({
-        wire_count: wireCount,
-        sequence: originalSequence,
-        input: imageToBeChecked,
-        wireType: wireType,
-      });
-
-      python.stdin.write(payload);
-      python.stdin.end();
-    });
+  async (_event, { wireCount, originalSequence, imageToBeChecked, wireType, wireId }) => {
+    const { refs, frames } = toFrames(imageToBeChecked);
+    // A stored fingerprint lets the backend skip full detection on clean passes.
+    const wire = wireId ? await db("wires").where({ id: wireId }).first("fingerprint") : undefined;
+    return runBackend("compare", {
+      wire_id: wireId,
+      wire_count: wireCount,
+      sequence: originalSequence,
+      fingerprint: wire?.fingerprint ?? undefined,
+      input: refs,
+      wireType: wireType,
+    }, frames);
   }
 );
 
 ipcMain.handle("get-sequence", async (_event, { wireImages, wireType }) => {
-  return new Promise((resolve, reject) => {
-    // const pythonPath =
-    //   "C:\\Users\\Acer\\AppData\\Local\\Programs\\Python\\Python313\\python.exe";
-    // const python = spawn(pythonPath, ["backend/getsequence.py"]);
-
-    const exePath = app.isPackaged
-      ? path.join(process.resourcesPath, "python-bin", "getsequence.exe")
-      : path.join(__dirname, "../python-bin/getsequence.exe");
-    const python = spawn(exePath);
-
-    let output = "";
-    let error = "";
-
-    python.stdout.on("data", (data) => {
-      output += data.toString();
-    });
-
-    python.stderr.on("data", (data) => {
-      console.error(`stderr: ${data}`);
-      error += data.toString();
-    });
-
-    python.on("close", (code) => {
-      if (code === 0) {
-        const result = JSON.parse(output);
-        resolve(result); // Return Python result
-      } else {
-        reject(new Error(`Python error: ${error}`));
-      }
-    });
-
-    const payload = JSON.stringify({
-      input: wireImages,
-      wireType: wireType,
-    });
-
-    python.stdin.write(payload);
-    python.stdin.end();
-  });
+  const { refs, frames } = toFrames(wireImages);
+  return runBackend("get-sequence", {
+    input: refs,
+    wireType: wireType,
+    fingerprint: true,
+  }, frames);
 });
 
 //add result
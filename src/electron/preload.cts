@@ -7,10 +7,10 @@ contextBridge.exposeInMainWorld("electron", {
 
   removeItem: (table: string, id: number) => ipcRenderer.invoke("remove-item", { table, id }),
 
-  addWire: (wireType: string, wireName: string, sequence: string, base64Images: string[]) => ipcRenderer.invoke("add-wire", {wireType, wireName, sequence, base64Images}),
+  addWire: (wireType: string, wireName: string, sequence: string, base64Images: string[], fingerprint?: string) => ipcRenderer.invoke("add-wire", {wireType, wireName, sequence, base64Images, fingerprint}),
   addResult: (wireType: string, wireId: number, wireName: string, result: boolean, details: string, tested_by: string, base64images: string[]) => ipcRenderer.invoke("add-result", {wireType, wireId, wireName, result, details, tested_by, base64images}),
   addMismatch: (wireType: string, wireName: string, sequence:string, base64images: string[]) => ipcRenderer.invoke("add-mismatch", {wireType, wireName, sequence, base64images}),
 
-  compareItem: (wireCount: number[], originalSequence: string, imageToBeChecked: string[], wireType: string) => ipcRenderer.invoke("compare-item", {wireCount, originalSequence, imageToBeChecked, wireType}),
+  compareItem: (wireCount: number[], originalSequence: string, imageToBeChecked: string[], wireType: string, wireId?: number) => ipcRenderer.invoke("compare-item", {wireCount, originalSequence, imageToBeChecked, wireType, wireId}),
   getSequence: (wireImages: string[], wireType: string) => ipcRenderer.invoke("get-sequence", {wireImages, wireType}),
 });
\ No newline at end of file
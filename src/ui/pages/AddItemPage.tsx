@@ -28,6 +28,7 @@ export default function AddItemPage() {
   const [isSaving, setIsSaving] = useState(false);
   const [error, setError] = useState<string | null>(null);
   const [detSequence, setDetSequence] = useState<string[]>([]);
+  const [detFingerprint, setDetFingerprint] = useState<SequenceFingerprint[] | null>(null);
   const [isDetecting, setIsDetecting] = useState<boolean>(false);
 
   const isDoubleWire = wireType === "doublewire";
@@ -94,6 +95,7 @@ export default function AddItemPage() {
       setCurrentStep("back");
     }
     setDetSequence([]);
+    setDetFingerprint(null);
     setError(null);
   };
 
@@ -120,15 +122,16 @@ export default function AddItemPage() {
           await window.electron.addWire(wireType, wireName, JSON.stringify(detSequence), [
             frontImage,
             backImage,
-          ]);
+          ], detFingerprint ? JSON.stringify(detFingerprint) : undefined);
       } else {
           await window.electron.addWire(wireType, wireName, JSON.stringify(detSequence), [
             frontImage,
-          ]);
+          ], detFingerprint ? JSON.stringify(detFingerprint) : undefined);
       }
 
       setWireName("");
       setDetSequence([]);
+      setDetFingerprint(null);
       setFrontImage(null);
       setBackImage(null);
       setCurrentStep("front");
@@ -226,6 +229,7 @@ export default function AddItemPage() {
           } else {
             setDetSequence([JSON.stringify(detected.sequence_front), JSON.stringify(detected.sequence_back)]);
           }
+          setDetFingerprint(detected.fingerprint ?? null);
         } catch (err) {
           console.error("Error detecting sequence:", err);
           setError("An error occurred while detecting the sequence.");
@@ -135,7 +135,8 @@ export default function TestItemPage() {
         wireCount,
         wireSequence,
         testImagesStripped,
-        wireTypeSafe
+        wireTypeSafe,
+        selectedWireId
       );
 
       if (result?.match === true) {
@@ -5,25 +5,59 @@ type Wire = {
   image_front: string;
   image_back: string | null;
   sequence: string;
+  fingerprint: string | null;
   created_at: string;
 }
 
+type WireComparison = {
+  index: number;
+  expected: number[];
+  detected: number[];
+  distance: number;
+  match: boolean;
+};
+
+type FaceComparison = {
+  face: string;
+  expected_wires: number;
+  detected_wires: number;
+  count_match: boolean;
+  match: boolean;
+  wires: WireComparison[];
+};
+
 type ComparisonResult = {
   match: boolean;
   details: string;
+  faces?: FaceComparison[];
+  fast_path?: boolean;
 };
 
 type RGB = [number, number, number];
 
+// Where the wires of a reference capture were found; lets later captures be
+// checked without segmenting them again.
+type SequenceFingerprint = {
+  frame: [number, number];
+  roi: [number, number, number, number];
+  line_y: number;
+  windows: [number, number][];
+} | null;
+
 type SingleWireSequence = {
   type: "singlewire";
   sequence: RGB[];
+  confidence?: number;
+  fingerprint?: SequenceFingerprint[];
 };
 
 type DoubleWireSequence = {
   type: "doublewire";
   sequence_front: RGB[];
   sequence_back: RGB[];
+  confidence_front?: number;
+  confidence_back?: number;
+  fingerprint?: SequenceFingerprint[];
 };
 
 type WireSequenceResult = SingleWireSequence | DoubleWireSequence;
@@ -54,13 +88,13 @@ interface Window {
         fetchRow<T>(tableName: string, id: number): Promise<T>;
         fetchImages: (tableName: string, wireType: string, selectedId: number) => Promise<string[] | null>;
 
-        addWire: (wireType: string, wireName: string, sequence: string, base64Images: string[]) => Promise<void>;
+        addWire: (wireType: string, wireName: string, sequence: string, base64Images: string[], fingerprint?: string) => Promise<void>;
         addResult: (wireType: string, wireId: number, wireName: string, result: boolean, details: string, tested_by: string, base64Images: string[]) => Promise<void>;
         addMismatch: (wireType: string, wireName: string, sequence: string, base64Images: string[]) => Promise<void>;
         
         removeItem: (table: string, id: number) => Promise<void>;
 
-        compareItem: (wireCount: number[], originaSequence: string, imageToBeChecked: string[], wireType: string) => Promise<ComparisonResult>;
+        compareItem: (wireCount: number[], originaSequence: string, imageToBeChecked: string[], wireType: string, wireId?: number) => Promise<ComparisonResult>;
         getSequence: (wireImages: string[], wireType: string) => Promise<WireSequenceResult>;
     }
 }
\ No newline at end of file